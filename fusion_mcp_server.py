@@ -17,6 +17,18 @@ import time
 import os
 import math
 import json
+import re
+import fnmatch
+import sys
+import socket
+import select
+import secrets
+import hmac
+import collections
+import heapq
+import itertools
+import ctypes
+import ctypes.util
 
 # --- グローバル変数 ---
 _app = None
@@ -35,17 +47,263 @@ _start_cmd_def = None
 _stop_cmd_def = None
 _start_cmd_control = None
 _stop_cmd_control = None
+# ファイル監視バックエンド ('auto', 'inotify', 'kqueue', 'win32', 'poll')
+_watcher_backend_name = os.environ.get('FUSION_MCP_WATCHER', 'auto')
+_watcher_backend_in_use = None
+_WATCHER_POLL_INTERVAL = 0.5
+# コマンドファイルの内容が JSON として不完全な間は書き込み途中とみなして待つ最大秒数
+_COMMAND_SETTLE_SECONDS = 2.0
+_pickup_latencies = collections.deque(maxlen=1000)
+# ソケット通信 (例: '127.0.0.1:8765', 'unix:/tmp/fusion_mcp.sock')。空なら無効
+_socket_address = os.environ.get('FUSION_MCP_SOCKET', '')
+_socket_server = None
+# ソケット接続の共有シークレット (所有者のみ読める 0600 のファイル)。接続ごとに最初の1行で authenticate が必要
+_socket_token_path = os.environ.get('FUSION_MCP_SOCKET_TOKEN_FILE', os.path.join(os.path.expanduser('~'), '.fusion_mcp_socket_token'))
+# ブラウザなどからの HTTP リクエスト行 (例: 'POST / HTTP/1.1')
+_HTTP_REQUEST_LINE_PATTERN = re.compile(rb'^[A-Z]+ \S+ HTTP/\d')
+# メインスレッドで連続実行するリクエストキュー
+_request_queue = collections.deque()
+_request_queue_lock = threading.Lock()
+_request_kick_pending = False
+_MAX_REQUESTS_PER_EVENT = 32
+_completion_seq = 0
+# コマンドごとの実行統計 (件数・エラー数・段階別レイテンシ)
+_server_stats = {'started_at': time.time(), 'commands': {}}
+_SERVER_STATS_STAGES = ('pickup', 'queue', 'parse', 'execute', 'serialize')
+_SERVER_STATS_SAMPLES = 1024
+_LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Prometheus テキスト形式のメトリクスファイル (空なら出力しない)
+_metrics_file_path = os.environ.get('FUSION_MCP_METRICS_FILE', '')
+_METRICS_WRITE_INTERVAL = float(os.environ.get('FUSION_MCP_METRICS_INTERVAL', '15'))
+_metrics_last_written = 0.0
+# リクエストジャーナル (受信したリクエストを NDJSON で追記。path が空なら記録しない)
+_journal_state = {'path': os.environ.get('FUSION_MCP_JOURNAL', ''), 'file': None, 'records': 0}
+_journal_default_path = os.path.join(os.path.expanduser('~'), 'Documents', 'fusion_mcp_journal.ndjson')
+# スパントレース (Chrome trace-event 形式)。FUSION_MCP_TRACE=1 で全リクエストを記録
+_trace_state = {'enabled': os.environ.get('FUSION_MCP_TRACE', '') == '1', 'active': False,
+                'events': collections.deque(maxlen=200000), 'request_events': None}
+_trace_file_path = os.path.join(os.path.expanduser('~'), 'Documents', 'fusion_mcp_trace.json')
+# ログ (レベル別・リングバッファ・パレットへのまとめ書き・任意のローテーションファイル)
+_LOG_LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+_LOG_LEVEL_NAMES = {v: k.upper() for k, v in _LOG_LEVELS.items()}
+_log_state = {'threshold': _LOG_LEVELS.get(os.environ.get('FUSION_MCP_LOG_LEVEL', 'info').lower(), 20),
+              'buffered': False, 'flush_pending': False, 'palette': [], 'file': []}
+_log_buffer = collections.deque(maxlen=2000)
+_log_lock = threading.Lock()
+_log_seq = itertools.count(1)
+_log_file_path = os.environ.get('FUSION_MCP_LOG_FILE', '')
+_LOG_FILE_MAX_BYTES = int(os.environ.get('FUSION_MCP_LOG_MAX_BYTES', str(1024 * 1024)))
+_LOG_FILE_BACKUPS = 3
+_LOG_FLUSH_INTERVAL = 0.5
+_log_flush_event_id = 'FusionMCPLogFlush'
+_log_flush_event = None
+_log_flush_handler = None
+_log_flusher_thread = None
+# マクロ実行中は adsk.doEvents() によるUI更新を最後の1回にまとめる
+_ui_refresh_deferred = False
+# ボディ名 -> エンティティの索引 (missed: 現在のリビジョンで再構築後も見つからなかった名前)
+_entity_index = {'revision': None, 'bodies': {}, 'occurrences': {}, 'missed': set()}
+_entity_index_stats = {'hits': 0, 'misses': 0, 'rebuilds': 0, 'patches': 0}
+_entity_index_txn = None
+# 一意なボディ名の割り当て (使用済み名前集合とベース名ごとの連番)
+_name_allocator = {'revision': None, 'used': set(), 'counters': {}}
+_name_allocator_stats = {'allocations': 0, 'probes': 0, 'resyncs': 0}
+# 物理プロパティのキャッシュ (デザインのリビジョンごと)
+_physical_properties_cache = {'revision': None, 'entries': {}}
+_physical_properties_stats = {'hits': 0, 'misses': 0}
+# エンティティトークン → (実体, 所属ボディ) の解決キャッシュ (エントリーごとに isValid で検証)
+_token_resolver_cache = {'root': None, 'entries': {}}
+_token_resolver_stats = {'hits': 0, 'misses': 0, 'unresolved': 0}
+# ボディ間の距離・干渉判定 (狭域判定) の結果キャッシュ (ボディの組ごと。各ボディの revisionId で検証)
+_proximity_cache = {'entries': {}}
+_proximity_stats = {'bbox': 0, 'min_distance': 0, 'boolean_intersection': 0, 'hits': 0}
+# 干渉チェック用の空間インデックス (トークン → [ボディ, バウンディングボックス]、X最小値順のトークン列)
+_spatial_index = {'revision': None, 'version': 0, 'entries': {}, 'order': []}
+_spatial_index_stats = {'rebuilds': 0, 'incremental_updates': 0, 'candidate_pairs': 0, 'bvh_builds': 0}
+# 範囲検索・近傍検索用の BVH (空間インデックスの version が変わると再構築)
+_bvh = {'version': -1, 'root': None}
+_MACRO_REF_PATTERN = re.compile(r'\$\{([^}]+)\}')
+# スプールディレクトリ (requests/ と responses/ を持つ)。/dev/shm などの tmpfs も指定可能
+_spool_root = os.environ.get('FUSION_MCP_SPOOL', os.path.join(os.path.expanduser('~'), 'Documents', 'fusion_mcp_spool'))
+_spool_request_dir = os.path.join(_spool_root, 'requests')
+_spool_response_dir = os.path.join(_spool_root, 'responses')
+# スプールのリクエストID (= ファイル名)。レスポンスファイルがスプール外を指さないよう文字種を限定する
+_SPOOL_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$')
 
-# --- 共通ヘルパー関数 ---
-def log_debug(message):
+# --- トレース ---
+class _NullSpan:
+    """トレース無効時に返す何もしないスパン (毎回の生成コストを避けるため共有)"""
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc, tb): return False
+
+_NULL_SPAN = _NullSpan()
+
+class _TraceSpan:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        # 同一スレッド上の "X" (complete) イベントは ts/dur の包含関係で入れ子として表示される
+        event = {'name': self.name, 'cat': 'fusion', 'ph': 'X', 'ts': self.start * 1e6,
+                 'dur': (end - self.start) * 1e6, 'pid': os.getpid(), 'tid': threading.get_ident()}
+        if self.args: event['args'] = self.args
+        _trace_state['events'].append(event)
+        if _trace_state['request_events'] is not None:
+            _trace_state['request_events'].append(event)
+        return False
+
+def trace_span(name: str, **args):
+    """
+    名前付きのスパンを返します (with 文で使用)。記録中でなければ共有の空スパンを返すだけです。
+    """
+    if not _trace_state['active']: return _NULL_SPAN
+    return _TraceSpan(name, args)
+
+def set_tracing(enabled: bool=True, clear: bool=False, **kwargs):
+    """
+    全リクエストのトレース記録を切り替えます。個別のリクエストはリクエストJSONの
+    "trace": true で、この設定に関わらず記録できます。
+    """
+    _trace_state['enabled'] = bool(enabled)
+    if clear: _trace_state['events'].clear()
+    return {"enabled": _trace_state['enabled'], "events": len(_trace_state['events'])}
+
+def export_trace(file_path: str=None, clear: bool=True, **kwargs):
+    """
+    記録済みのスパンを Chrome trace-event 形式の JSON に書き出します。
+    chrome://tracing や Perfetto UI でそのまま開けます。
+    """
+    path = file_path or _trace_file_path
+    events = list(_trace_state['events'])
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+    if clear: _trace_state['events'].clear()
+    return {"file_path": path, "events": len(events)}
+
+# --- ログ ---
+def _log(level: int, message, args):
+    """
+    しきい値未満のレベルは即座に捨てます。args があれば記録時にだけ % で整形するため、
+    無効なレベルへの log_debug("...%s", value) は整形コストもかかりません。
+    """
+    if level < _log_state['threshold']: return
+    if args:
+        try:
+            message = message % args
+        except Exception:
+            message = f"{message} {args}"
+    record = (next(_log_seq), time.time(), level, str(message))
+    _log_buffer.append(record)
+    with _log_lock:
+        _log_state['palette'].append(f"[MCP-PY-STABLE] [{_LOG_LEVEL_NAMES[level]}] {record[3]}")
+        if _log_file_path:
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record[1]))
+            _log_state['file'].append(f"{stamp} {_LOG_LEVEL_NAMES[level]} {record[3]}\n")
+    # フラッシュ用スレッドが動いていない間 (サーバー停止中) は従来どおりその場で書き込む
+    if not _log_state['buffered']:
+        flush_log_palette()
+        flush_log_file()
+
+def log_debug(message, *args): _log(10, message, args)
+def log_info(message, *args): _log(20, message, args)
+def log_warning(message, *args): _log(30, message, args)
+def log_error(message, *args): _log(40, message, args)
+
+def flush_log_palette():
+    """溜まったログをテキストコマンドパレットへ1回の writeText でまとめて書き込みます (メインスレッド専用)。"""
+    with _log_lock:
+        lines = _log_state['palette']
+        _log_state['palette'] = []
+        _log_state['flush_pending'] = False
+    if not lines: return
     try:
         if _ui:
             text_palette = _ui.palettes.itemById('TextCommands')
             if text_palette:
-                text_palette.writeText(f"[MCP-PY-STABLE] {message}")
+                text_palette.writeText('\n'.join(lines))
     except:
         pass
 
+def flush_log_file():
+    """溜まったログをファイルへ追記し、上限サイズを超えたらローテーションします。"""
+    with _log_lock:
+        lines = _log_state['file']
+        _log_state['file'] = []
+    if not lines or not _log_file_path: return
+    try:
+        with open(_log_file_path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+        if os.path.getsize(_log_file_path) > _LOG_FILE_MAX_BYTES:
+            for i in range(_LOG_FILE_BACKUPS - 1, 0, -1):
+                if os.path.exists(f"{_log_file_path}.{i}"):
+                    os.replace(f"{_log_file_path}.{i}", f"{_log_file_path}.{i + 1}")
+            os.replace(_log_file_path, f"{_log_file_path}.1")
+    except Exception:
+        pass
+
+def log_flusher(stop_event):
+    """
+    一定間隔でファイルへ書き出し、パレット分が溜まっていればカスタムイベントで
+    メインスレッドにまとめ書きを依頼します (イベントは未処理のものが無い場合のみ発行)。
+    """
+    while not stop_event.wait(_LOG_FLUSH_INTERVAL):
+        flush_log_file()
+        with _log_lock:
+            need_kick = bool(_log_state['palette']) and not _log_state['flush_pending']
+            if need_kick: _log_state['flush_pending'] = True
+        if need_kick:
+            try:
+                _app.fireCustomEvent(_log_flush_event_id, '')
+            except Exception:
+                pass
+    flush_log_file()
+
+def set_log_level(level: str='info', **kwargs):
+    """記録するログの最低レベル ('debug' / 'info' / 'warning' / 'error') を変更します。"""
+    key = str(level).strip().lower()
+    if key not in _LOG_LEVELS:
+        raise ValueError(f"未対応のログレベル '{level}' です。{list(_LOG_LEVELS)} のいずれかを指定してください。")
+    _log_state['threshold'] = _LOG_LEVELS[key]
+    return {"level": key}
+
+def get_recent_logs(limit: int=100, level: str='debug', since_seq: int=None, pattern: str=None, **kwargs):
+    """
+    リングバッファから最近のログを返します (古い順)。since_seq を渡すとそれより新しいものだけを返すので、
+    前回の last_seq を渡して追跡できます。pattern は正規表現でメッセージを絞り込みます。
+    """
+    min_level = _LOG_LEVELS.get(str(level).lower(), 10)
+    regex = re.compile(pattern) if pattern else None
+    entries = [r for r in list(_log_buffer)
+               if r[2] >= min_level and (since_seq is None or r[0] > since_seq) and (regex is None or regex.search(r[3]))]
+    if limit is not None: entries = entries[-int(limit):] if int(limit) > 0 else []
+    return {
+        "entries": [{"seq": seq, "time": t, "level": _LOG_LEVEL_NAMES[lv].lower(), "message": msg} for seq, t, lv, msg in entries],
+        "last_seq": _log_buffer[-1][0] if _log_buffer else since_seq,
+        "level": _LOG_LEVEL_NAMES[_log_state['threshold']].lower(),
+        "log_file": _log_file_path or None
+    }
+
+# --- 共通ヘルパー関数 ---
+
+def refresh_ui():
+    """
+    adsk.doEvents() の代わりに使用します。マクロ実行中は呼び出しを保留し、
+    マクロ終了時にまとめて1回だけ実行します。
+    """
+    if not _ui_refresh_deferred:
+        with trace_span('doEvents'):
+            adsk.doEvents()
+
 def get_fusion_unit_scale():
     return 0.1 # mmからcmへの変換係数
 
@@ -59,25 +317,109 @@ def get_unique_body_name(root: adsk.fusion.Component, base_name: str) -> str:
     指定されたベース名から一意のボディ名を生成します。
     同名が存在する場合、'_2', '_3' のようにサフィックスを追加します。
     """
-    if not base_name:
-        base_name = "Body"
+    return allocate_unique_body_names(root, [base_name])[0]
 
-    existing_names = {body.name for body in root.bRepBodies}
-    
-    if base_name not in existing_names:
-        return base_name
-    
-    counter = 2
-    while True:
-        new_name = f"{base_name}_{counter}"
-        if new_name not in existing_names:
-            return new_name
-        counter += 1
+def sync_name_allocator(root: adsk.fusion.Component):
+    """
+    デザインが外部で変更されていれば、使用済みの名前集合を作り直します。
+    実行中のコマンド自身がフィーチャーを追加しただけ (開始時は同期済みで、ボディ数が増えただけ) の場合は
+    名前集合をそのまま使います。命名前のボディの既定名との衝突は割り当て時の itemByName で確認されます。
+    """
+    revision = get_design_revision()
+    if revision is not None and revision == _name_allocator['revision']:
+        return
+    txn = _entity_index_txn
+    if (txn is not None and txn['names_in_sync'] and revision is not None
+            and revision[0] == _name_allocator['revision'][0]
+            and revision[3] >= txn['body_count'] + len(txn['registered'])):
+        return
+    _name_allocator['used'] = {body.name for body in root.bRepBodies}
+    _name_allocator['counters'] = {}
+    _name_allocator['revision'] = revision
+    _name_allocator_stats['resyncs'] += 1
+
+def allocate_unique_body_names(root: adsk.fusion.Component, base_names: list) -> list:
+    """
+    複数のベース名に対して一意のボディ名をまとめて割り当てます。
+    使用済みの名前集合とベース名ごとの連番カウンタを呼び出し間で保持するため、
+    パターンで大量のボディに名前を付けても1件あたりO(1)で割り当てられます。
+    """
+    sync_name_allocator(root)
+    used = _name_allocator['used']
+    counters = _name_allocator['counters']
+    bodies = root.bRepBodies
+    names = []
+    for base_name in base_names:
+        if not base_name:
+            base_name = "Body"
+        candidate = base_name
+        counter = counters.get(base_name, 2)
+        while True:
+            _name_allocator_stats['probes'] += 1
+            if candidate not in used:
+                # UIでの改名など、リビジョンに現れない変更に備えて実在を確認する
+                if bodies.itemByName(candidate) is None:
+                    break
+                used.add(candidate)
+            candidate = f"{base_name}_{counter}"
+            counter += 1
+        if candidate != base_name:
+            counters[base_name] = counter
+        used.add(candidate)
+        names.append(candidate)
+        _name_allocator_stats['allocations'] += 1
+    return names
 # ▲▲▲【新規追加】ここまで ▲▲▲
 
+def get_physical_properties(body, accuracy: str=None):
+    """
+    ボディの物理プロパティをキャッシュ付きで取得します。
+    キャッシュはデザインのリビジョンとボディのバウンディングボックスで無効化されるため、
+    同じコマンドやマクロ内で繰り返し参照しても再計算されません。
+    accuracy: 'low' / 'medium' / 'high' / 'very_high' (省略時は physicalProperties と同じ)
+    """
+    accuracy_key = normalize_calculation_accuracy(accuracy)
+    revision = get_design_revision()
+    if revision is None or revision != _physical_properties_cache['revision']:
+        _physical_properties_cache['revision'] = revision
+        _physical_properties_cache['entries'] = {}
+    bbox = body.boundingBox
+    extent = (bbox.minPoint.x, bbox.minPoint.y, bbox.minPoint.z, bbox.maxPoint.x, bbox.maxPoint.y, bbox.maxPoint.z)
+    key = (body.entityToken, accuracy_key)
+    entries = _physical_properties_cache['entries']
+    cached = entries.get(key)
+    if revision is not None and cached and cached[0] == extent:
+        _physical_properties_stats['hits'] += 1
+        return cached[1]
+    _physical_properties_stats['misses'] += 1
+    with trace_span('physicalProperties', accuracy=accuracy_key or 'default'):
+        if accuracy_key is None:
+            props = body.physicalProperties
+        else:
+            props = body.getPhysicalProperties(getattr(adsk.fusion.CalculationAccuracy, _CALCULATION_ACCURACY[accuracy_key]))
+    entries[key] = (extent, props)
+    return props
+
+_CALCULATION_ACCURACY = {
+    'low': 'LowCalculationAccuracy',
+    'medium': 'MediumCalculationAccuracy',
+    'high': 'HighCalculationAccuracy',
+    'very_high': 'VeryHighCalculationAccuracy',
+}
+
+def normalize_calculation_accuracy(accuracy):
+    if accuracy is None:
+        return None
+    key = str(accuracy).strip().lower().replace(' ', '_').replace('-', '_')
+    if key == 'veryhigh':
+        key = 'very_high'
+    if key not in _CALCULATION_ACCURACY:
+        raise ValueError(f"無効な精度: {accuracy} (low / medium / high / very_high のいずれかを指定してください)")
+    return key
+
 def move_body_to_absolute_position(body: adsk.fusion.BRepBody, target_cm_pt: adsk.core.Point3D):
     if not body: return
-    current_center_pt = body.physicalProperties.centerOfMass
+    current_center_pt = get_physical_properties(body).centerOfMass
     move_vec = current_center_pt.vectorTo(target_cm_pt)
     if move_vec.length < 1e-6: return
     transform = adsk.core.Matrix3D.create()
@@ -85,7 +427,8 @@ def move_body_to_absolute_position(body: adsk.fusion.BRepBody, target_cm_pt: ads
     root = _app.activeProduct.rootComponent
     move_features = root.features.moveFeatures
     move_input = move_features.createInput(adsk.core.ObjectCollection.createWithArray([body]), transform)
-    move_features.add(move_input)
+    with trace_span('move.add'):
+        move_features.add(move_input)
 
 def move_body_with_placement(body, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement, direction='positive'):
     """
@@ -96,57 +439,1043 @@ def move_body_with_placement(body, cx_cm, cy_cm, cz_cm, z_placement, x_placement
         return
 
     bbox = body.boundingBox
-    current_centroid = body.physicalProperties.centerOfMass
+    current_centroid = get_physical_properties(body).centerOfMass
     scale = get_fusion_unit_scale()
 
     log_debug(f"Intuitive placement: z_placement={z_placement}, x_placement={x_placement}, y_placement={y_placement}")
     # Note: 'direction' パラメータは、配置ロジックの直感性を高めるために意図的に無視されます。
+    target = compute_placement_target(
+        (current_centroid.x, current_centroid.y, current_centroid.z),
+        (bbox.minPoint.x, bbox.minPoint.y, bbox.minPoint.z),
+        (bbox.maxPoint.x, bbox.maxPoint.y, bbox.maxPoint.z),
+        cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement)
+    move_body_to_absolute_position(body, adsk.core.Point3D.create(*target))
 
+def compute_placement_target(centroid, bbox_min, bbox_max, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement):
+    """
+    配置基準 (x/y/z_placement) に従って、重心を移動すべき目標座標 (cm) を返します。
+    centroid, bbox_min, bbox_max は (x, y, z) のタプルです。
+    """
     # Z軸方向の配置計算 (改善版：押し出し方向に依存しない直感的なロジック)
     if z_placement == 'bottom':
         # 常にボディの底面 (min Z) が cz に揃うように移動
-        target_centroid_z = cz_cm + (current_centroid.z - bbox.minPoint.z)
+        target_z = cz_cm + (centroid[2] - bbox_min[2])
     elif z_placement == 'top':
         # 常にボディの上面 (max Z) が cz に揃うように移動
-        target_centroid_z = cz_cm + (current_centroid.z - bbox.maxPoint.z)
+        target_z = cz_cm + (centroid[2] - bbox_max[2])
     else:  # center
         # 常にボディの重心が cz に揃うように移動
-        target_centroid_z = cz_cm
+        target_z = cz_cm
 
     # X軸方向の配置計算
     if x_placement == 'left':
-        target_centroid_x = cx_cm + (current_centroid.x - bbox.minPoint.x)
+        target_x = cx_cm + (centroid[0] - bbox_min[0])
     elif x_placement == 'right':
-        target_centroid_x = cx_cm + (current_centroid.x - bbox.maxPoint.x)
+        target_x = cx_cm + (centroid[0] - bbox_max[0])
     else:  # center
-        target_centroid_x = cx_cm
+        target_x = cx_cm
 
     # Y軸方向の配置計算 (Fusion 360座標系: -YがFront, +YがBack)
     if y_placement == 'front':
-        target_centroid_y = cy_cm + (current_centroid.y - bbox.minPoint.y)
+        target_y = cy_cm + (centroid[1] - bbox_min[1])
     elif y_placement == 'back':
-        target_centroid_y = cy_cm + (current_centroid.y - bbox.maxPoint.y)
+        target_y = cy_cm + (centroid[1] - bbox_max[1])
     else:  # center
-        target_centroid_y = cy_cm
-    
-    target_point = adsk.core.Point3D.create(target_centroid_x, target_centroid_y, target_centroid_z)
-    move_body_to_absolute_position(body, target_point)
+        target_y = cy_cm
+    return (target_x, target_y, target_z)
+
+# --- 解析的な配置計算 ---
+# プリミティブの寸法から重心とバウンディングボックスを計算し、
+# 計測用の物理プロパティ計算や追加の移動フィーチャーを使わずに最終位置へ作成します。
+_IDENTITY_ROTATION = ((1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+
+def rotation_matrix(axis, angle_rad: float):
+    """軸 (x, y, z) 周りの回転行列 (3x3のタプル) を返します。"""
+    ux, uy, uz = axis
+    length = math.sqrt(ux * ux + uy * uy + uz * uz)
+    ux, uy, uz = ux / length, uy / length, uz / length
+    c, s = math.cos(angle_rad), math.sin(angle_rad)
+    t = 1 - c
+    return ((t * ux * ux + c, t * ux * uy - s * uz, t * ux * uz + s * uy),
+            (t * ux * uy + s * uz, t * uy * uy + c, t * uy * uz - s * ux),
+            (t * ux * uz - s * uy, t * uy * uz + s * ux, t * uz * uz + c))
+
+def matrix_multiply(a, b):
+    return tuple(tuple(sum(a[i][k] * b[k][j] for k in range(3)) for j in range(3)) for i in range(3))
+
+def matrix_apply(m, v):
+    return tuple(m[i][0] * v[0] + m[i][1] * v[1] + m[i][2] * v[2] for i in range(3))
+
+def matrix_transpose(m):
+    return tuple(tuple(m[j][i] for j in range(3)) for i in range(3))
+
+def compute_world_bounds(support, rotation, origin):
+    """サポート関数で表された形状を rotation / origin でワールドへ写したときのバウンディングボックス (min, max) を返します。"""
+    rotation_t = matrix_transpose(rotation)
+    bbox_min, bbox_max = [], []
+    for i in range(3):
+        axis = [0.0, 0.0, 0.0]
+        axis[i] = 1.0
+        w = matrix_apply(rotation_t, axis)
+        bbox_max.append(origin[i] + support(w))
+        bbox_min.append(origin[i] - support((-w[0], -w[1], -w[2])))
+    return bbox_min, bbox_max
+
+def compute_analytic_placement(support, centroid, rotation, origin, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement):
+    """
+    ローカル座標系で定義された形状を rotation / origin でワールドへ写したときの
+    バウンディングボックスと重心を求め、配置基準を満たすための平行移動量 (cm) を返します。
+    support(w) は方向 w に対する形状のサポート関数 (max p・w) です。
+    """
+    bbox_min, bbox_max = compute_world_bounds(support, rotation, origin)
+    world_centroid = tuple(o + c for o, c in zip(origin, matrix_apply(rotation, centroid)))
+    target = compute_placement_target(world_centroid, bbox_min, bbox_max, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement)
+    return tuple(t - c for t, c in zip(target, world_centroid))
+
+def apply_body_transform(root, body, rotation, translation):
+    """
+    回転と平行移動を1つの移動フィーチャーとしてまとめて適用します。
+    恒等変換の場合はフィーチャーを作成しません。
+    """
+    if rotation == _IDENTITY_ROTATION and all(abs(t) < 1e-9 for t in translation):
+        return
+    transform = adsk.core.Matrix3D.create()
+    transform.setWithCoordinateSystem(
+        adsk.core.Point3D.create(*translation),
+        adsk.core.Vector3D.create(rotation[0][0], rotation[1][0], rotation[2][0]),
+        adsk.core.Vector3D.create(rotation[0][1], rotation[1][1], rotation[2][1]),
+        adsk.core.Vector3D.create(rotation[0][2], rotation[1][2], rotation[2][2]))
+    move_features = root.features.moveFeatures
+    move_input = move_features.createInput(adsk.core.ObjectCollection.createWithArray([body]), transform)
+    with trace_span('move.add'):
+        move_features.add(move_input)
+    refresh_ui()
+
+def sketch_frame(sketch):
+    """スケッチ空間からモデル空間への (回転行列, 原点) を返します。"""
+    x_dir = sketch.xDirection
+    y_dir = sketch.yDirection
+    z_dir = x_dir.crossProduct(y_dir)
+    origin = sketch.origin
+    rotation = ((x_dir.x, y_dir.x, z_dir.x), (x_dir.y, y_dir.y, z_dir.y), (x_dir.z, y_dir.z, z_dir.z))
+    return rotation, (origin.x, origin.y, origin.z)
+
+def taper_growth(taper_angle: float, taper_direction: str) -> float:
+    """押し出し1cmあたりのプロファイルの外側へのオフセット量 (内側テーパーは負)。"""
+    if taper_angle == 0:
+        return 0.0
+    final_taper = abs(taper_angle) * (-1 if taper_direction.lower() == 'inward' else 1)
+    return math.tan(math.radians(final_taper))
+
+class ExtrusionProfile:
+    """
+    押し出しプリミティブの断面形状。kind は 'rect' / 'circle' / 'polygon'。
+    rect: a, b は半幅、circle: a は半径、polygon: a は外接円半径、sides は辺の数。
+    """
+    def __init__(self, kind: str, a: float, b: float=None, sides: int=0):
+        self.kind = kind
+        self.a = a
+        self.b = a if b is None else b
+        self.sides = sides
+        if kind == 'polygon':
+            self.apothem = a * math.cos(math.pi / sides)
+            self.vertices = [(math.cos(i * 2 * math.pi / sides), math.sin(i * 2 * math.pi / sides)) for i in range(sides)]
+
+    def draw(self, sketch, u: float, v: float):
+        """スケッチ座標 (u, v) を中心に断面を描きます。"""
+        if self.kind == 'rect':
+            sketch.sketchCurves.sketchLines.addTwoPointRectangle(
+                adsk.core.Point3D.create(u - self.a, v - self.b, 0), adsk.core.Point3D.create(u + self.a, v + self.b, 0))
+        elif self.kind == 'circle':
+            sketch.sketchCurves.sketchCircles.addByCenterRadius(adsk.core.Point3D.create(u, v, 0), self.a)
+        else:
+            points = [adsk.core.Point3D.create(u + self.a * cx, v + self.a * cy, 0) for cx, cy in self.vertices]
+            lines = sketch.sketchCurves.sketchLines
+            for i in range(self.sides):
+                lines.addByTwoPoints(points[i], points[(i + 1) % self.sides])
+
+    def support(self, wx: float, wy: float, offset: float=0.0) -> float:
+        """外側へ offset だけオフセットした断面の、方向 (wx, wy) に対するサポート関数。"""
+        if self.kind == 'rect':
+            return (self.a + offset) * abs(wx) + (self.b + offset) * abs(wy)
+        if self.kind == 'circle':
+            return (self.a + offset) * math.hypot(wx, wy)
+        scale = self.a * (self.apothem + offset) / self.apothem
+        return scale * max(wx * cx + wy * cy for cx, cy in self.vertices)
+
+    def half_extents(self):
+        """断面の面積が (p + d)(q + d) に比例するような (p, q) を返します (d はオフセット)。"""
+        if self.kind == 'polygon':
+            return self.apothem, self.apothem
+        return self.a, self.b
+
+def extrusion_shape(profile: ExtrusionProfile, height_cm: float, growth: float, sign: int):
+    """
+    ローカル z=0 の断面を z 方向に sign * height_cm だけテーパー付きで押し出した形状の
+    (サポート関数, 重心) を返します。
+    """
+    top_offset = height_cm * growth
+    top_z = sign * height_cm
+
+    def support(w):
+        return max(profile.support(w[0], w[1]), profile.support(w[0], w[1], top_offset) + w[2] * top_z)
+
+    # 断面積 A(t) ∝ (p + kt)(q + kt) から軸方向の重心を求める
+    p, q = profile.half_extents()
+    k, h = growth, height_cm
+    volume = p * q * h + (p + q) * k * h ** 2 / 2 + k * k * h ** 3 / 3
+    moment = p * q * h ** 2 / 2 + (p + q) * k * h ** 3 / 3 + k * k * h ** 4 / 4
+    centroid = (0.0, 0.0, sign * (moment / volume if volume > 0 else h / 2))
+    return support, centroid
+
+def plan_placed_extrusion(rotation, origin, profile: ExtrusionProfile, height_cm: float, cx_cm: float, cy_cm: float, cz_cm: float,
+                          z_placement: str, x_placement: str, y_placement: str, taper_angle: float, taper_direction: str, direction: str):
+    """
+    スケッチ座標系 (rotation, origin) 上での押し出しプリミティブの配置を計算します。
+    戻り値はスケッチ上の断面中心 (u, v)、押し出し開始オフセット、押し出し方向の符号、
+    配置後のワールド座標でのバウンディングボックスを持つ辞書です。
+    """
+    sign = 1 if direction.lower() == 'positive' else -1
+    support, centroid = extrusion_shape(profile, height_cm, taper_growth(taper_angle, taper_direction), sign)
+    translation = compute_analytic_placement(support, centroid, rotation, origin, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement)
+    u, v, start_offset = matrix_apply(matrix_transpose(rotation), translation)
+    bbox_min, bbox_max = compute_world_bounds(support, rotation, origin)
+    return {'u': u, 'v': v, 'start_offset': start_offset, 'sign': sign,
+            'bbox_min': [m + t for m, t in zip(bbox_min, translation)],
+            'bbox_max': [m + t for m, t in zip(bbox_max, translation)]}
+
+def add_extrusion(root, profiles, height_cm: float, start_offset: float, sign: int, taper_angle: float, taper_direction: str):
+    """断面 (単体または ObjectCollection) を新規ボディとして押し出し、押し出しフィーチャーを返します。"""
+    extrudes = root.features.extrudeFeatures
+    ext_input = extrudes.createInput(profiles, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+    distance = adsk.core.ValueInput.createByReal(height_cm)
+    if abs(start_offset) > 1e-9:
+        ext_input.startExtent = adsk.fusion.OffsetStartDefinition.create(adsk.core.ValueInput.createByReal(start_offset))
+    if sign > 0:
+        ext_input.setDistanceExtent(False, distance)
+    else:
+        extent_definition = adsk.fusion.DistanceExtentDefinition.create(distance)
+        ext_input.setOneSideExtent(extent_definition, adsk.fusion.ExtentDirections.NegativeExtentDirection)
+    if taper_angle != 0:
+        final_taper = abs(taper_angle) * (-1 if taper_direction.lower() == 'inward' else 1)
+        taper_angle_input = adsk.core.ValueInput.createByString(f"{final_taper} deg")
+        ext_input.taperAngle = taper_angle_input
+    with trace_span('extrude.add'):
+        return extrudes.add(ext_input)
+
+def create_placed_extrusion(root, plane: str, profile: ExtrusionProfile, height_cm: float, cx_cm: float, cy_cm: float, cz_cm: float,
+                            z_placement: str, x_placement: str, y_placement: str, taper_angle: float, taper_direction: str, direction: str):
+    """
+    配置後の位置を解析的に求め、スケッチを最終位置に描いて1回の押し出しでボディを作成します。
+    面内のずれはスケッチ上の断面位置、法線方向のずれは押し出し開始位置のオフセットで表現します。
+    """
+    with trace_span('sketch.add'):
+        sketch = root.sketches.add(get_construction_plane(root, plane))
+    rotation, origin = sketch_frame(sketch)
+    plan = plan_placed_extrusion(rotation, origin, profile, height_cm, cx_cm, cy_cm, cz_cm,
+                                 z_placement, x_placement, y_placement, taper_angle, taper_direction, direction)
+    profile.draw(sketch, plan['u'], plan['v'])
+    new_body = add_extrusion(root, sketch.profiles.item(0), height_cm, plan['start_offset'], plan['sign'],
+                             taper_angle, taper_direction).bodies.item(0)
+    sketch.isVisible = False
+    return new_body
+
+def sphere_support(radius: float):
+    return lambda w: radius * math.sqrt(w[0] ** 2 + w[1] ** 2 + w[2] ** 2)
+
+def hemisphere_support(radius: float, side: int):
+    """z=0 を平面部とし、side (+1/-1) 側にドームがある半球。"""
+    def support(w):
+        if w[2] * side >= 0:
+            return radius * math.sqrt(w[0] ** 2 + w[1] ** 2 + w[2] ** 2)
+        return radius * math.hypot(w[0], w[1])
+    return support
+
+def cone_support(radius: float, height: float):
+    """底面 (半径 radius) が z=0、頂点が z=height の円錐。"""
+    return lambda w: max(height * w[2], radius * math.hypot(w[0], w[1]))
+
+def torus_support(major_radius: float, minor_radius: float, half_side: int=0):
+    """
+    z軸周りのトーラス。half_side が +1/-1 の場合は y がその符号側の半トーラス。
+    """
+    def support(w):
+        radial = math.hypot(w[0], w[1])
+        if half_side and w[1] * half_side < 0:
+            radial = abs(w[0])
+        return major_radius * radial + minor_radius * math.sqrt(radial ** 2 + w[2] ** 2)
+    return support
+
+def half_torus_centroid_offset(major_radius: float, minor_radius: float) -> float:
+    """半トーラス (180度回転体) の重心の回転軸からの距離。"""
+    return 2 * (major_radius ** 2 + minor_radius ** 2 / 4) / (math.pi * major_radius)
+
+def sampled_support(points):
+    """点群 (形状の凸包を代表する点) からサポート関数を作ります。"""
+    return lambda w: max(p[0] * w[0] + p[1] * w[1] + p[2] * w[2] for p in points)
+
+# --- ボディ名索引 ---
+def get_design_revision():
+    """
+    デザインの変更を検知するための軽量なリビジョン値を返します。
+    タイムラインやボディ数が変わると値が変わります。取得できない場合は None。
+    """
+    try:
+        design = _app.activeProduct
+        root = design.rootComponent
+        timeline = design.timeline
+        return (root.id,
+                timeline.count if timeline else -1,
+                timeline.markerPosition if timeline else -1,
+                root.bRepBodies.count,
+                root.occurrences.count)
+    except:
+        return None
+
+def rebuild_entity_index():
+    root = _app.activeProduct.rootComponent
+    bodies = {}
+    for body in root.bRepBodies:
+        bodies.setdefault(body.name, body)
+    occurrences = {}
+    for occ in root.occurrences:
+        occurrences.setdefault(occ.name.split(':', 1)[0], occ)
+    revision = get_design_revision()
+    if revision != _entity_index['revision']:
+        _entity_index['missed'] = set()
+    _entity_index['bodies'] = bodies
+    _entity_index['occurrences'] = occurrences
+    _entity_index['revision'] = revision
+    _entity_index_stats['rebuilds'] += 1
+
+def register_entity(body):
+    """
+    自分のコマンドで作成・改名したボディを索引に反映します。
+    コマンド終了時に、索引が最新の状態のままであればリビジョンを更新して再構築を省略します。
+    """
+    bodies = _entity_index['bodies']
+    name = body.name
+    current = bodies.get(name)
+    # 改名前の古いキーは検索時の名前照合で無効と判定されるため、ここでは削除しない
+    if current is None or not current.isValid or current.name != name:
+        bodies[name] = body
+    _name_allocator['used'].add(name)
+    _entity_index_stats['patches'] += 1
+    if _entity_index_txn is not None:
+        _entity_index_txn['registered'].add(body.entityToken)
+        _entity_index_txn['created'].append((None, body))
+
+def begin_entity_index_transaction():
+    global _entity_index_txn
+    revision = get_design_revision()
+    _entity_index_txn = {
+        'in_sync': revision is not None and revision == _entity_index['revision'],
+        'names_in_sync': revision is not None and revision == _name_allocator['revision'],
+        'spatial_in_sync': revision is not None and revision == _spatial_index['revision'],
+        'body_count': revision[3] if revision else 0,
+        'registered': set(),
+        'created': [],
+        'moved': []
+    }
+
+def end_entity_index_transaction():
+    """
+    コマンドの前後で索引が同期しており、増えたボディがすべて登録済みであれば
+    新しいリビジョンを採用します。それ以外は次回の検索で再構築されます。
+    ボディ名の割り当て状態も同じ条件で引き継ぎます。
+    空間インデックスは、作成・移動したボディの差分だけを反映して引き継ぎます。
+    """
+    global _entity_index_txn
+    txn, _entity_index_txn = _entity_index_txn, None
+    if not txn or not (txn['registered'] or txn['moved']):
+        return
+    revision = get_design_revision()
+    if not revision or revision[3] != txn['body_count'] + len(txn['registered']):
+        return
+    if txn['registered']:
+        if txn['in_sync']:
+            _entity_index['revision'] = revision
+            _entity_index['missed'] = set()
+        if txn['names_in_sync']:
+            _name_allocator['revision'] = revision
+    if txn['spatial_in_sync']:
+        update_spatial_index(txn['moved'] + txn['created'])
+        _spatial_index['revision'] = revision
 
 def find_entity_by_name(name: str):
     if not name: return None
+    revision = get_design_revision()
+    if revision is None:
+        root = _app.activeProduct.rootComponent
+        entity = next((b for b in root.bRepBodies if b.name == name), None)
+        if entity: return entity
+        return next((occ for occ in root.occurrences if occ.name.split(':', 1)[0] == name), None)
+
+    rebuilt = False
+    if revision != _entity_index['revision']:
+        rebuild_entity_index()
+        rebuilt = True
+    while True:
+        entity = _entity_index['bodies'].get(name)
+        if entity is not None and entity.isValid and entity.name == name:
+            _entity_index_stats['hits'] += 1
+            return entity
+        entity = _entity_index['occurrences'].get(name)
+        if entity is not None and entity.isValid and entity.name.split(':', 1)[0] == name:
+            _entity_index_stats['hits'] += 1
+            return entity
+        # UIでの改名などリビジョンに現れない変更に備え、名前ごとにリビジョンあたり一度だけ再構築する
+        if not rebuilt and name not in _entity_index['missed']:
+            rebuild_entity_index()
+            rebuilt = True
+            continue
+        # 再構築済みの名前は itemByName で確認する (その後に改名されたボディを拾う)
+        entity = _app.activeProduct.rootComponent.bRepBodies.itemByName(name)
+        if entity is not None and entity.isValid:
+            _entity_index['bodies'][name] = entity
+            _entity_index['missed'].discard(name)
+            _entity_index_stats['hits'] += 1
+            return entity
+        _entity_index['missed'].add(name)
+        _entity_index_stats['misses'] += 1
+        return None
+
+_TOKEN_RESOLVER_MAX_ENTRIES = 20000
+
+def resolve_entity_token(token: str):
+    """
+    エンティティトークン (面・エッジ・ボディなど) を実体に解決します。見つからない場合は None。
+    解決結果はデザインの編集をまたいでキャッシュし、使う前に実体と所属ボディが有効かを確認します
+    (別のドキュメントに切り替わった場合のみ全体を破棄します)。
+    """
+    revision = get_design_revision()
+    root_id = revision[0] if revision else None
+    if root_id is None or root_id != _token_resolver_cache['root']:
+        _token_resolver_cache['root'] = root_id
+        _token_resolver_cache['entries'] = {}
+    entries = _token_resolver_cache['entries']
+    cached = entries.get(token)
+    if cached is not None:
+        entity, owner = cached
+        if entity.isValid and (owner is None or owner.isValid):
+            _token_resolver_stats['hits'] += 1
+            return entity
+    _token_resolver_stats['misses'] += 1
+    entity = None
+    try:
+        for candidate in _app.activeProduct.findEntityByToken(token):
+            if candidate.isValid:
+                entity = candidate
+                break
+    except:
+        entity = None
+    if entity is None:
+        _token_resolver_stats['unresolved'] += 1
+        entries.pop(token, None)
+        return None
+    if root_id is not None:
+        if len(entries) >= _TOKEN_RESOLVER_MAX_ENTRIES:
+            entries.clear()
+        # 面・エッジは所属ボディも確認する (ボディが削除されると面・エッジも使えなくなる)
+        entries[token] = (entity, getattr(entity, 'body', None))
+    return entity
+
+def get_cache_stats(**kwargs):
+    """
+    アドイン内部のキャッシュ (ボディ名索引、名前割り当てなど) の統計を返します。
+    """
+    return {
+        "entity_index": dict(_entity_index_stats,
+                             bodies=len(_entity_index['bodies']),
+                             occurrences=len(_entity_index['occurrences'])),
+        "name_allocator": dict(_name_allocator_stats,
+                               used_names=len(_name_allocator['used'])),
+        "physical_properties": dict(_physical_properties_stats,
+                                    entries=len(_physical_properties_cache['entries'])),
+        "token_resolver": dict(_token_resolver_stats,
+                               entries=len(_token_resolver_cache['entries'])),
+        "proximity": dict(_proximity_stats,
+                          entries=len(_proximity_cache['entries'])),
+        "spatial_index": dict(_spatial_index_stats,
+                              bodies=len(_spatial_index['entries']))
+    }
+
+# --- 距離・干渉判定 ---
+# 広域判定 (バウンディングボックス) で決まらない組み合わせだけを、
+# カーネルの最短距離計測と一時BRepのブーリアン演算 (狭域判定) で正確に判定します。
+_CONTACT_TOLERANCE = 1e-6  # cm
+_INTERFERENCE_VOLUME_TOLERANCE = 1e-9  # cm³
+_PROXIMITY_CACHE_MAX_ENTRIES = 20000
+
+def bbox_extent(body):
+    bbox = body.boundingBox
+    return (bbox.minPoint.x, bbox.minPoint.y, bbox.minPoint.z, bbox.maxPoint.x, bbox.maxPoint.y, bbox.maxPoint.z)
+
+def bbox_gap(extent1, extent2) -> float:
+    """2つのバウンディングボックス (bbox_extent の形式) の間の距離 (重なっている場合は0)。"""
+    dx = max(0, extent1[0] - extent2[3], extent2[0] - extent1[3])
+    dy = max(0, extent1[1] - extent2[4], extent2[1] - extent1[4])
+    dz = max(0, extent1[2] - extent2[5], extent2[2] - extent1[5])
+    return math.sqrt(dx*dx + dy*dy + dz*dz)
+
+def compute_body_proximity(body1, body2, clearance_cm: float=None, exact_distance: bool=True) -> dict:
+    """
+    2つのボディの最短距離と干渉を2段階で判定します。距離の単位は cm です。
+    - 広域判定: バウンディングボックスが離れていて、正確な距離が不要 (exact_distance=False)
+      またはその距離が clearance_cm より大きい場合はここで確定します ('bbox')。
+    - 狭域判定: measureMinimumDistance で最短距離を求め ('min_distance')、
+      接している場合と一方が他方に含まれている場合は一時BRepの積演算で干渉体積を求めます ('boolean_intersection')。
+    狭域判定の結果はボディの組ごとにキャッシュし、デザインのリビジョンが変わっても保持します。
+    各エントリーは両ボディの revisionId (ボディが変更されるたびに変わる) で検証し、削除されたボディの分は
+    空間インデックスの更新時に破棄します (invalidate_proximity_cache)。
+    オカレンスなどボディ以外のエンティティはバウンディングボックスだけで判定します。
+    戻り値の decided_by で、どの段階で判定したかが分かります。
+    """
+    extent1, extent2 = bbox_extent(body1), bbox_extent(body2)
+    gap = bbox_gap(extent1, extent2)
+    body_type = adsk.fusion.BRepBody.classType()
+    is_bodies = body1.objectType == body_type and body2.objectType == body_type
+    if not is_bodies or (gap > 0 and (not exact_distance or (clearance_cm is not None and gap > clearance_cm))):
+        _proximity_stats['bbox'] += 1
+        return {'distance': gap, 'distance_is_lower_bound': True, 'interference': gap == 0,
+                'interference_volume': 0.0, 'decided_by': 'bbox'}
+
+    # キャッシュはボディの組を順序によらず共有するため、トークン順に正規化して保存する
+    swapped = body2.entityToken < body1.entityToken
+    if swapped:
+        body1, body2, extent1, extent2 = body2, body1, extent2, extent1
+    key = (body1.entityToken, body2.entityToken)
+    # 反転・フィレット・穴径の変更のようにバウンディングボックスや面数が変わらない変更も revisionId で検出する
+    fingerprint = (body1.revisionId, body2.revisionId)
+    entries = _proximity_cache['entries']
+    cached = entries.get(key)
+    if cached and cached[0] == fingerprint:
+        _proximity_stats['hits'] += 1
+        result = dict(cached[1], cached=True)
+    else:
+        result = _narrow_phase_proximity(body1, body2, gap == 0)
+        if len(entries) >= _PROXIMITY_CACHE_MAX_ENTRIES:
+            entries.clear()
+        entries[key] = (fingerprint, dict(result))
+    if swapped and 'closest_points' in result:
+        result['closest_points'] = result['closest_points'][::-1]
+    return result
+
+def invalidate_proximity_cache(tokens):
+    """指定したトークンのボディを含む組のキャッシュを破棄します。"""
+    tokens = set(tokens)
+    if not tokens:
+        return
+    entries = _proximity_cache['entries']
+    for key in [key for key in entries if key[0] in tokens or key[1] in tokens]:
+        del entries[key]
+
+def _is_contained(outer, inner) -> bool:
+    """inner の表面上の1点が outer の内部にあるかを返します (表面どうしが交差しない場合の包含判定)。"""
+    faces = inner.faces
+    if faces.count == 0:
+        return False
+    return outer.pointContainment(faces.item(0).pointOnFace) == adsk.fusion.PointContainment.PointInsidePointContainment
+
+def _narrow_phase_proximity(body1, body2, bboxes_overlap: bool=True) -> dict:
+    measure = _app.measureManager.measureMinimumDistance(body1, body2)
+    distance = measure.value
+    # 一方が他方に完全に含まれていると表面間の距離は正になるため、バウンディングボックスが重なる場合は包含も確認する
+    contained = distance > _CONTACT_TOLERANCE and bboxes_overlap and (_is_contained(body1, body2) or _is_contained(body2, body1))
+    if distance > _CONTACT_TOLERANCE and not contained:
+        _proximity_stats['min_distance'] += 1
+        return {'distance': distance, 'distance_is_lower_bound': False, 'interference': False,
+                'interference_volume': 0.0, 'decided_by': 'min_distance',
+                'closest_points': [[p.x, p.y, p.z] for p in (measure.positionOne, measure.positionTwo)]}
+
+    # 接触または干渉: 一時BRepのコピー同士の積で干渉体積を求める
+    _proximity_stats['boolean_intersection'] += 1
+    temp_brep = adsk.fusion.TemporaryBRepManager.get()
+    target = temp_brep.copy(body1)
+    volume = 0.0
+    if temp_brep.booleanOperation(target, temp_brep.copy(body2), adsk.fusion.BooleanTypes.IntersectionBooleanType):
+        volume = target.volume
+    interference = volume > _INTERFERENCE_VOLUME_TOLERANCE
+    return {'distance': 0.0, 'distance_is_lower_bound': False, 'interference': interference,
+            'interference_volume': volume if interference else 0.0, 'decided_by': 'boolean_intersection'}
+
+# --- 空間インデックス (スイープ・アンド・プルーン) ---
+# 全ボディのバウンディングボックスをX軸の最小値で整列して保持し、候補ペアの列挙に使います。
+# 自分のコマンドによる作成・移動はコマンド終了時に差分だけ反映し、
+# それ以外の変更があった場合は次回の問い合わせで全ボディのボックスを読み直します
+# (前回の並び順を保つため、再整列はほぼ線形時間で終わります)。
+def refresh_spatial_index():
+    """空間インデックスを最新のデザインに合わせます。"""
+    revision = get_design_revision()
+    if revision is not None and revision == _spatial_index['revision']:
+        return
     root = _app.activeProduct.rootComponent
-    entity = next((b for b in root.bRepBodies if b.name == name), None)
-    if entity: return entity
-    return next((occ for occ in root.occurrences if occ.name.split(':', 1)[0] == name), None)
+    entries = {}
+    for body in root.bRepBodies:
+        entries[body.entityToken] = [body, bbox_extent(body)]
+    # 消えたボディ (削除・再生成でトークンが変わったもの) を含む組の判定結果は使われないため破棄する
+    invalidate_proximity_cache(token for token in _spatial_index['entries'] if token not in entries)
+    previous_order = [token for token in _spatial_index['order'] if token in entries]
+    known = set(previous_order)
+    order = previous_order + [token for token in entries if token not in known]
+    order.sort(key=lambda token: entries[token][1][0])
+    _spatial_index['entries'] = entries
+    _spatial_index['order'] = order
+    _spatial_index['revision'] = revision
+    _spatial_index['version'] += 1
+    _spatial_index_stats['rebuilds'] += 1
+
+def update_spatial_index(changes: list):
+    """
+    コマンド内で作成・移動されたボディだけをインデックスに反映します。
+    changes は (変更前のトークン または None, ボディ) のリストです。
+    """
+    entries = _spatial_index['entries']
+    order = _spatial_index['order']
+    removed = set()
+    for old_token, body in changes:
+        if old_token is not None and old_token in entries:
+            del entries[old_token]
+            removed.add(old_token)
+    invalidate_proximity_cache(removed | {body.entityToken for _, body in changes if body.isValid})
+    if removed:
+        order[:] = [token for token in order if token not in removed]
+    for old_token, body in changes:
+        if not body.isValid:
+            continue
+        token = body.entityToken
+        if token not in entries:
+            order.append(token)
+        entries[token] = [body, bbox_extent(body)]
+    order.sort(key=lambda token: entries[token][1][0])
+    _spatial_index['version'] += 1
+    _spatial_index_stats['incremental_updates'] += 1
+
+def mark_entity_moved(body):
+    """移動・回転する直前のボディを記録し、コマンド終了時に空間インデックスへ反映させます。"""
+    if _entity_index_txn is not None and body.objectType == adsk.fusion.BRepBody.classType():
+        _entity_index_txn['moved'].append((body.entityToken, body))
+
+def sweep_and_prune_pairs(clearance_cm: float=0.0) -> list:
+    """
+    バウンディングボックス同士の距離が clearance_cm 以下になり得るボディの組 (トークンの組) を列挙します。
+    """
+    entries = _spatial_index['entries']
+    pairs = []
+    active = []
+    for token in _spatial_index['order']:
+        extent = entries[token][1]
+        min_x = extent[0] - clearance_cm
+        # X方向で離れたボディを作業リストから外す
+        active = [other for other in active if entries[other][1][3] >= min_x]
+        for other in active:
+            other_extent = entries[other][1]
+            if (extent[1] - clearance_cm <= other_extent[4] and other_extent[1] - clearance_cm <= extent[4] and
+                    extent[2] - clearance_cm <= other_extent[5] and other_extent[2] - clearance_cm <= extent[5]):
+                pairs.append((other, token))
+        active.append(token)
+    _spatial_index_stats['candidate_pairs'] += len(pairs)
+    return pairs
+
+def check_interference_all(clearance: float=0.0, pattern: str=None, visible_only: bool=False, **kwargs):
+    """
+    全ボディの組み合わせについて干渉とクリアランス不足を調べます。
+    スイープ・アンド・プルーンで候補を絞り込み、残った組だけを正確に判定します。
+    clearance (mm) 以下に近接している組、または干渉している組を返します。
+    pattern (glob) や visible_only で対象ボディを絞り込めます。
+    """
+    scale = get_fusion_unit_scale()
+    clearance_cm = max(0.0, clearance) * scale
+    refresh_spatial_index()
+    entries = _spatial_index['entries']
+
+    def included(token):
+        body = entries[token][0]
+        if visible_only and not body.isVisible:
+            return False
+        return pattern is None or fnmatch.fnmatchcase(body.name, pattern)
+
+    candidates = [(a, b) for a, b in sweep_and_prune_pairs(clearance_cm) if included(a) and included(b)]
+    rows = []
+    decided = {'bbox': 0, 'min_distance': 0, 'boolean_intersection': 0}
+    for token1, token2 in candidates:
+        body1, body2 = entries[token1][0], entries[token2][0]
+        proximity = compute_body_proximity(body1, body2, clearance_cm)
+        decided[proximity['decided_by']] += 1
+        if proximity['interference'] or (not proximity['distance_is_lower_bound'] and proximity['distance'] <= clearance_cm):
+            rows.append([body1.name, body2.name, proximity['distance'] / scale, proximity['interference'],
+                         proximity['interference_volume'] * 1000])  # cm³ to mm³
+    rows.sort(key=lambda row: (not row[3], row[2]))
+    return {
+        "columns": ["body1", "body2", "distance", "interference", "interference_volume"],
+        "pairs": rows,
+        "interfering": sum(1 for row in rows if row[3]),
+        "bodies": len(entries),
+        "candidates": len(candidates),
+        "decided_by": decided
+    }
+
+# --- 空間検索 (BVH) ---
+# 空間インデックスのバウンディングボックスから BVH (境界ボリューム階層) を構築し、
+# 範囲検索と近傍検索に使います。デザインが変わった後の最初の問い合わせで再構築します。
+_BVH_LEAF_SIZE = 4
+
+def _merge_extents(extents):
+    return (min(e[0] for e in extents), min(e[1] for e in extents), min(e[2] for e in extents),
+            max(e[3] for e in extents), max(e[4] for e in extents), max(e[5] for e in extents))
+
+def _build_bvh_node(items):
+    """items は (トークン, バウンディングボックス) のリスト。ノードは (ボックス, 左, 右, 葉の要素) のタプルです。"""
+    extent = _merge_extents([item[1] for item in items])
+    if len(items) <= _BVH_LEAF_SIZE:
+        return (extent, None, None, items)
+    # 中心座標の広がりが最も大きい軸で中央値分割する
+    centers = [[(e[i] + e[i + 3]) / 2 for i in range(3)] for _, e in items]
+    spans = [max(c[i] for c in centers) - min(c[i] for c in centers) for i in range(3)]
+    axis = spans.index(max(spans))
+    items = sorted(items, key=lambda item: item[1][axis] + item[1][axis + 3])
+    middle = len(items) // 2
+    return (extent, _build_bvh_node(items[:middle]), _build_bvh_node(items[middle:]), None)
+
+def get_bvh():
+    """最新の空間インデックスに対応する BVH のルートを返します (ボディがなければ None)。"""
+    refresh_spatial_index()
+    if _bvh['version'] != _spatial_index['version']:
+        entries = _spatial_index['entries']
+        items = [(token, entry[1]) for token, entry in entries.items()]
+        _bvh['root'] = _build_bvh_node(items) if items else None
+        _bvh['version'] = _spatial_index['version']
+        _spatial_index_stats['bvh_builds'] += 1
+    return _bvh['root']
+
+def _point_extent_distance(point, extent) -> float:
+    dx = max(0, extent[0] - point[0], point[0] - extent[3])
+    dy = max(0, extent[1] - point[1], point[1] - extent[4])
+    dz = max(0, extent[2] - point[2], point[2] - extent[5])
+    return math.sqrt(dx*dx + dy*dy + dz*dz)
+
+def _exact_point_distance(body, point) -> float:
+    """カーネルで点とボディの最短距離 (cm) を計測します。"""
+    return _app.measureManager.measureMinimumDistance(adsk.core.Point3D.create(*point), body).value
+
+def _to_cm_point(values, name: str):
+    if not isinstance(values, (list, tuple)) or len(values) != 3:
+        raise ValueError(f"{name} は [x, y, z] (mm) で指定してください。")
+    scale = get_fusion_unit_scale()
+    return tuple(float(v) * scale for v in values)
+
+def find_bodies_in_box(min_point: list, max_point: list, mode: str='intersects', **kwargs):
+    """
+    指定した直方体 (min_point, max_point: [x, y, z] mm) に含まれるボディを返します。
+    mode='intersects' はバウンディングボックスが交差するボディ、'contains' は完全に内側にあるボディです。
+    """
+    if mode not in ('intersects', 'contains'):
+        raise ValueError(f"無効なモード: {mode} ('intersects' または 'contains' を指定してください)")
+    lo, hi = _to_cm_point(min_point, 'min_point'), _to_cm_point(max_point, 'max_point')
+    query = (min(lo[0], hi[0]), min(lo[1], hi[1]), min(lo[2], hi[2]), max(lo[0], hi[0]), max(lo[1], hi[1]), max(lo[2], hi[2]))
+    root = get_bvh()
+    entries = _spatial_index['entries']
+    names = []
+    stack = [root] if root else []
+    while stack:
+        extent, left, right, items = stack.pop()
+        if not all(extent[i] <= query[i + 3] and query[i] <= extent[i + 3] for i in range(3)):
+            continue
+        if items is None:
+            stack.append(left)
+            stack.append(right)
+            continue
+        for token, e in items:
+            if mode == 'contains':
+                hit = all(query[i] <= e[i] and e[i + 3] <= query[i + 3] for i in range(3))
+            else:
+                hit = all(e[i] <= query[i + 3] and query[i] <= e[i + 3] for i in range(3))
+            if hit:
+                names.append(entries[token][0].name)
+    names.sort()
+    return {"bodies": names, "count": len(names)}
+
+def find_bodies_near_point(point: list, radius: float, exact: bool=False, **kwargs):
+    """
+    点 ([x, y, z] mm) から radius (mm) 以内にあるボディを距離順に返します。
+    既定ではバウンディングボックスまでの距離で判定し、exact=True の場合は候補についてカーネルで最短距離を計測します。
+    """
+    center = _to_cm_point(point, 'point')
+    scale = get_fusion_unit_scale()
+    radius_cm = radius * scale
+    root = get_bvh()
+    entries = _spatial_index['entries']
+    found = []
+    stack = [root] if root else []
+    while stack:
+        extent, left, right, items = stack.pop()
+        if _point_extent_distance(center, extent) > radius_cm:
+            continue
+        if items is None:
+            stack.append(left)
+            stack.append(right)
+            continue
+        for token, e in items:
+            distance = _point_extent_distance(center, e)
+            if distance > radius_cm:
+                continue
+            if exact:
+                distance = _exact_point_distance(entries[token][0], center)
+                if distance > radius_cm:
+                    continue
+            found.append((distance, entries[token][0].name))
+    found.sort()
+    return {"bodies": [name for _, name in found], "distances": [distance / scale for distance, _ in found], "count": len(found)}
+
+def nearest_bodies(point: list, k: int=1, exact: bool=False, **kwargs):
+    """
+    点 ([x, y, z] mm) に近い順に k 個のボディを返します。
+    既定ではバウンディングボックスまでの距離、exact=True の場合はカーネルで計測した最短距離で順位付けします
+    (バウンディングボックスの距離を下限として使うため、計測は上位候補に限られます)。
+    """
+    center = _to_cm_point(point, 'point')
+    scale = get_fusion_unit_scale()
+    root = get_bvh()
+    entries = _spatial_index['entries']
+    results = []
+    if root is None or k <= 0:
+        return {"bodies": [], "distances": [], "count": 0}
+    # ヒープの要素: (距離の下限, 連番, 種別, 値)。種別 0=ノード, 1=ボックス距離のボディ, 2=確定距離のボディ
+    counter = itertools.count()
+    heap = [(_point_extent_distance(center, root[0]), next(counter), 0, root)]
+    while heap and len(results) < k:
+        distance, _, kind, value = heapq.heappop(heap)
+        if kind == 0:
+            extent, left, right, items = value
+            if items is None:
+                for child in (left, right):
+                    heapq.heappush(heap, (_point_extent_distance(center, child[0]), next(counter), 0, child))
+            else:
+                for token, e in items:
+                    heapq.heappush(heap, (_point_extent_distance(center, e), next(counter), 1, token))
+        elif kind == 1 and exact:
+            exact_distance = max(distance, _exact_point_distance(entries[value][0], center))
+            heapq.heappush(heap, (exact_distance, next(counter), 2, value))
+        else:
+            results.append((distance, entries[value][0].name))
+    return {"bodies": [name for _, name in results], "distances": [distance / scale for distance, _ in results], "count": len(results)}
+
+# --- 点の内外判定・レイキャスト ---
+# 大量の点やレイをまとめて処理するため、座標は平坦な配列 [x0, y0, z0, x1, ...] (mm) で受け取ります。
+# 内外判定の結果は1点1文字の文字列で返します: I=内側, O=外側, B=境界上, U=不明
+_POINT_CONTAINMENT_CODES = {
+    'PointInsidePointContainment': 'I',
+    'PointOnPointContainment': 'B',
+    'PointOutsidePointContainment': 'O',
+}
+
+def _flat_triples(values, name: str):
+    if not isinstance(values, (list, tuple)) or len(values) % 3 != 0:
+        raise ValueError(f"{name} は [x0, y0, z0, x1, y1, z1, ...] 形式の平坦な配列 (要素数は3の倍数) で指定してください。")
+    return [(values[i], values[i + 1], values[i + 2]) for i in range(0, len(values), 3)]
+
+def classify_points(body_name: str, points: list, tolerance: float=0.001, **kwargs):
+    """
+    点群 (平坦な配列、mm) がボディの内側・外側・境界上のどれにあるかを判定します。
+    バウンディングボックス (tolerance mm だけ拡大) の外にある点はカーネルを呼ばずに外側と判定します。
+    """
+    body = find_entity_by_name(body_name)
+    if not body:
+        raise ValueError(f"ボディ '{body_name}' が見つかりません。")
+    if body.objectType != adsk.fusion.BRepBody.classType():
+        raise ValueError(f"'{body_name}' はボディではありません (オカレンスの点分類には対応していません)。")
+    scale = get_fusion_unit_scale()
+    margin = tolerance * scale
+    extent = bbox_extent(body)
+    lo = (extent[0] - margin, extent[1] - margin, extent[2] - margin)
+    hi = (extent[3] + margin, extent[4] + margin, extent[5] + margin)
+    codes = {getattr(adsk.fusion.PointContainment, key): code for key, code in _POINT_CONTAINMENT_CODES.items()}
+    create_point = adsk.core.Point3D.create
+    point_containment = body.pointContainment
+
+    result = []
+    rejected = 0
+    for x, y, z in _flat_triples(points, 'points'):
+        x, y, z = x * scale, y * scale, z * scale
+        if not (lo[0] <= x <= hi[0] and lo[1] <= y <= hi[1] and lo[2] <= z <= hi[2]):
+            result.append('O')
+            rejected += 1
+            continue
+        result.append(codes.get(point_containment(create_point(x, y, z)), 'U'))
+    classes = ''.join(result)
+    return {
+        "classes": classes,
+        "count": len(classes),
+        "inside": classes.count('I'),
+        "outside": classes.count('O'),
+        "boundary": classes.count('B'),
+        "unknown": classes.count('U'),
+        "rejected_by_bbox": rejected
+    }
+
+def _ray_hits_bvh(node, origin, direction) -> bool:
+    """レイが BVH 内のいずれかのバウンディングボックスと交差するかを判定します (スラブ法)。"""
+    inverse = [1 / d if abs(d) > 1e-12 else math.copysign(1e12, d or 1.0) for d in direction]
+    stack = [node]
+    while stack:
+        extent, left, right, items = stack.pop()
+        t_near, t_far = 0.0, math.inf
+        for i in range(3):
+            t1 = (extent[i] - origin[i]) * inverse[i]
+            t2 = (extent[i + 3] - origin[i]) * inverse[i]
+            if t1 > t2:
+                t1, t2 = t2, t1
+            t_near, t_far = max(t_near, t1), min(t_far, t2)
+            if t_near > t_far:
+                break
+        else:
+            if items is not None:
+                return True
+            stack.append(left)
+            stack.append(right)
+    return False
+
+def raycast(origins: list, directions: list, body_names: list=None, visible_only: bool=True, **kwargs):
+    """
+    レイ (始点と方向、平坦な配列、mm) を飛ばし、最初に当たったボディ・距離・交点を返します。
+    directions が1本分だけの場合は全てのレイで共通の方向として使います。
+    body_names を指定した場合はそれらのボディへの命中だけを数えます。
+    どのボディのバウンディングボックスにも当たらないレイはカーネルを呼ばずに「命中なし」とします。
+    結果は列指向で、命中しなかったレイの body / distance は null、points の該当要素も null です。
+    """
+    origin_list = _flat_triples(origins, 'origins')
+    direction_list = _flat_triples(directions, 'directions')
+    if len(direction_list) == 1:
+        direction_list = direction_list * len(origin_list)
+    if len(direction_list) != len(origin_list):
+        raise ValueError("origins と directions のレイの本数が一致しません。")
+    scale = get_fusion_unit_scale()
+    targets = None
+    if body_names:
+        targets = set(body_names)
+    root = _app.activeProduct.rootComponent
+    bvh = get_bvh()
+    create_point = adsk.core.Point3D.create
+    create_vector = adsk.core.Vector3D.create
+    face_type = adsk.fusion.BRepEntityTypes.BRepFaceEntityType
+
+    hit_bodies, distances, points = [], [], []
+    rejected = 0
+    for (ox, oy, oz), (dx, dy, dz) in zip(origin_list, direction_list):
+        length = math.sqrt(dx*dx + dy*dy + dz*dz)
+        if length == 0:
+            raise ValueError("レイの方向ベクトルが0です。")
+        origin = (ox * scale, oy * scale, oz * scale)
+        direction = (dx / length, dy / length, dz / length)
+        best = None
+        if bvh is None or not _ray_hits_bvh(bvh, origin, direction):
+            rejected += 1
+        else:
+            hit_points = adsk.core.ObjectCollection.create()
+            entities = root.findBRepUsingRay(create_point(*origin), create_vector(*direction), face_type, -1, visible_only, hit_points)
+            for i in range(entities.count if entities else 0):
+                name = entities.item(i).body.name
+                if targets is not None and name not in targets:
+                    continue
+                hit = hit_points.item(i)
+                distance = math.sqrt((hit.x - origin[0]) ** 2 + (hit.y - origin[1]) ** 2 + (hit.z - origin[2]) ** 2)
+                if best is None or distance < best[0]:
+                    best = (distance, name, hit)
+        if best is None:
+            hit_bodies.append(None)
+            distances.append(None)
+            points.extend((None, None, None))
+        else:
+            hit_bodies.append(best[1])
+            distances.append(best[0] / scale)
+            points.extend((best[2].x / scale, best[2].y / scale, best[2].z / scale))
+    return {
+        "body": hit_bodies,
+        "distance": distances,
+        "points": points,
+        "count": len(hit_bodies),
+        "hits": sum(1 for name in hit_bodies if name is not None),
+        "rejected_by_bbox": rejected
+    }
+
+# --- 断面プロファイル ---
+def slice_profile(body_name: str, z_values: list, axis: str='z', include_bbox: bool=False, **kwargs):
+    """
+    ボディを複数の高さ (z_values, mm) で切断した断面積 (mm²) を一度に計算します。
+    一時BRep (TemporaryBRepManager) の平面交差で断面を求めるため、タイムラインにフィーチャーは追加されません。
+    axis で切断面の法線方向 ('x' / 'y' / 'z') を指定できます。
+    include_bbox=True の場合は各断面のバウンディングボックスも平坦な配列 [x, y, z, ...] で返します (断面がない場合は null)。
+    断面の面を作成できなかった高さの面積は null になります。
+    """
+    body = find_entity_by_name(body_name)
+    if not body:
+        raise ValueError(f"ボディ '{body_name}' が見つかりません。")
+    axis_index = {'x': 0, 'y': 1, 'z': 2}.get(str(axis).lower())
+    if axis_index is None:
+        raise ValueError(f"無効な軸: {axis} (x / y / z のいずれかを指定してください)")
+    scale = get_fusion_unit_scale()
+    extent = bbox_extent(body)
+    normal = [0.0, 0.0, 0.0]
+    normal[axis_index] = 1.0
+    normal_vector = adsk.core.Vector3D.create(*normal)
+    temp_brep = adsk.fusion.TemporaryBRepManager.get()
+    started = time.perf_counter()
+
+    areas, bbox_min, bbox_max = [], [], []
+    skipped = 0
+    for value in z_values:
+        height = value * scale
+        section = None
+        # ボディの範囲外の高さはカーネルを呼ばずに断面なしとする
+        if extent[axis_index] <= height <= extent[axis_index + 3]:
+            origin = [0.0, 0.0, 0.0]
+            origin[axis_index] = height
+            plane = adsk.core.Plane.create(adsk.core.Point3D.create(*origin), normal_vector)
+            section = temp_brep.planeIntersection(body, plane)
+        else:
+            skipped += 1
+        area = 0.0
+        if section is not None and section.wires.count > 0:
+            try:
+                sheet = temp_brep.createFaceFromPlanarWires([section])
+                area = sum(face.area for face in sheet.faces) * 100 if sheet else 0.0  # cm² to mm²
+            except Exception as e:
+                log_warning(f"Failed to build section face at {value}mm: {e}")
+                area = None
+        areas.append(area)
+        if include_bbox:
+            if area is None or area > 0:
+                bbox = section.boundingBox
+                bbox_min.extend((bbox.minPoint.x / scale, bbox.minPoint.y / scale, bbox.minPoint.z / scale))
+                bbox_max.extend((bbox.maxPoint.x / scale, bbox.maxPoint.y / scale, bbox.maxPoint.z / scale))
+            else:
+                bbox_min.extend((None, None, None))
+                bbox_max.extend((None, None, None))
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    result = {
+        "axis": str(axis).lower(),
+        "heights": list(z_values),
+        "area": areas,
+        "count": len(areas),
+        "skipped_outside_bbox": skipped,
+        "elapsed_ms": elapsed_ms,
+        "ms_per_slice": elapsed_ms / len(areas) if areas else 0.0
+    }
+    if include_bbox:
+        result["bbox_min"] = bbox_min
+        result["bbox_max"] = bbox_max
+    log_debug(f"Sliced '{body_name}' at {len(areas)} heights in {elapsed_ms:.1f}ms")
+    return result
 
 # --- デバッグ用関数 ---
-def debug_body_placement(body_name: str, **kwargs):
+def debug_body_placement(body_name: str, accuracy: str=None, **kwargs):
     body = find_entity_by_name(body_name)
     if not body:
         return f"ボディ '{body_name}' が見つかりません。"
     
     bbox = body.boundingBox
-    centroid = body.physicalProperties.centerOfMass
+    centroid = get_physical_properties(body, accuracy).centerOfMass
     scale = get_fusion_unit_scale()
     
     info = f"=== {body_name} の配置情報 ===\n"
@@ -174,30 +1503,13 @@ def create_cube(size: float=50, body_name: str=None, plane: str='xy', cx: float=
     size_cm = size * scale
     cx_cm, cy_cm, cz_cm = cx * scale, cy * scale, cz * scale
     root = _app.activeProduct.rootComponent
-    sketch = root.sketches.add(get_construction_plane(root, plane))
-    sketch.sketchCurves.sketchLines.addTwoPointRectangle(adsk.core.Point3D.create(-size_cm/2, -size_cm/2, 0), adsk.core.Point3D.create(size_cm/2, size_cm/2, 0))
-    prof = sketch.profiles.item(0)
-    extrudes = root.features.extrudeFeatures
-    ext_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    distance = adsk.core.ValueInput.createByReal(size_cm)
-    if direction.lower() == 'positive':
-        ext_input.setDistanceExtent(False, distance)
-    else:
-        extent_definition = adsk.fusion.DistanceExtentDefinition.create(distance)
-        ext_input.setOneSideExtent(extent_definition, adsk.fusion.ExtentDirections.NegativeExtentDirection)
-    if taper_angle != 0:
-        final_taper = abs(taper_angle) * (-1 if taper_direction.lower() == 'inward' else 1)
-        taper_angle_input = adsk.core.ValueInput.createByString(f"{final_taper} deg")
-        ext_input.taperAngle = taper_angle_input
-    extrude_feature = extrudes.add(ext_input)
-    new_body = extrude_feature.bodies.item(0)
-    sketch.isVisible = False
-    
-    # 【重要】Direction対応修正版の配置関数を使用
-    move_body_with_placement(new_body, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement, direction)
+    # 配置は解析的に計算し、最終位置で直接押し出す (移動フィーチャー不要)
+    new_body = create_placed_extrusion(root, plane, ExtrusionProfile('rect', size_cm / 2), size_cm, cx_cm, cy_cm, cz_cm,
+                                       z_placement, x_placement, y_placement, taper_angle, taper_direction, direction)
     
     if body_name:
         new_body.name = get_unique_body_name(root, body_name) #【修正】一意な名前を生成
+    register_entity(new_body)
     return new_body.name
 
 def create_cylinder(radius: float=25, height: float=50, body_name: str=None, plane: str='xy', cx: float=0, cy: float=0, cz: float=0, z_placement: str='center', x_placement: str='center', y_placement: str='center', taper_angle: float=0, taper_direction: str='inward', direction: str='positive', **kwargs):
@@ -205,30 +1517,12 @@ def create_cylinder(radius: float=25, height: float=50, body_name: str=None, pla
     radius_cm, height_cm = radius * scale, height * scale
     cx_cm, cy_cm, cz_cm = cx * scale, cy * scale, cz * scale
     root = _app.activeProduct.rootComponent
-    sketch = root.sketches.add(get_construction_plane(root, plane))
-    sketch.sketchCurves.sketchCircles.addByCenterRadius(adsk.core.Point3D.create(0, 0, 0), radius_cm)
-    prof = sketch.profiles.item(0)
-    extrudes = root.features.extrudeFeatures
-    ext_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    distance = adsk.core.ValueInput.createByReal(height_cm)
-    if direction.lower() == 'positive':
-        ext_input.setDistanceExtent(False, distance)
-    else:
-        extent_definition = adsk.fusion.DistanceExtentDefinition.create(distance)
-        ext_input.setOneSideExtent(extent_definition, adsk.fusion.ExtentDirections.NegativeExtentDirection)
-    if taper_angle != 0:
-        final_taper = abs(taper_angle) * (-1 if taper_direction.lower() == 'inward' else 1)
-        taper_angle_input = adsk.core.ValueInput.createByString(f"{final_taper} deg")
-        ext_input.taperAngle = taper_angle_input
-    extrude_feature = extrudes.add(ext_input)
-    new_body = extrude_feature.bodies.item(0)
-    sketch.isVisible = False
-    
-    # 【重要】Direction対応修正版の配置関数を使用
-    move_body_with_placement(new_body, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement, direction)
+    new_body = create_placed_extrusion(root, plane, ExtrusionProfile('circle', radius_cm), height_cm, cx_cm, cy_cm, cz_cm,
+                                       z_placement, x_placement, y_placement, taper_angle, taper_direction, direction)
     
     if body_name:
         new_body.name = get_unique_body_name(root, body_name) #【修正】一意な名前を生成
+    register_entity(new_body)
     return new_body.name
 
 def create_box(width: float=50, depth: float=30, height: float=20, body_name: str=None, plane: str='xy', cx: float=0, cy: float=0, cz: float=0, z_placement: str='center', x_placement: str='center', y_placement: str='center', taper_angle: float=0, taper_direction: str='inward', direction: str='positive', **kwargs):
@@ -236,27 +1530,12 @@ def create_box(width: float=50, depth: float=30, height: float=20, body_name: st
     width_cm, depth_cm, height_cm = width * scale, depth * scale, height * scale
     cx_cm, cy_cm, cz_cm = cx * scale, cy * scale, cz * scale
     root = _app.activeProduct.rootComponent
-    sketch = root.sketches.add(get_construction_plane(root, plane))
-    sketch.sketchCurves.sketchLines.addTwoPointRectangle(adsk.core.Point3D.create(-width_cm/2, -depth_cm/2, 0), adsk.core.Point3D.create(width_cm/2, depth_cm/2, 0))
-    prof = sketch.profiles.item(0)
-    extrudes = root.features.extrudeFeatures
-    ext_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    distance = adsk.core.ValueInput.createByReal(height_cm)
-    if direction.lower() == 'positive':
-        ext_input.setDistanceExtent(False, distance)
-    else:
-        extent_definition = adsk.fusion.DistanceExtentDefinition.create(distance)
-        ext_input.setOneSideExtent(extent_definition, adsk.fusion.ExtentDirections.NegativeExtentDirection)
-    if taper_angle != 0:
-        final_taper = abs(taper_angle) * (-1 if taper_direction.lower() == 'inward' else 1)
-        taper_angle_input = adsk.core.ValueInput.createByString(f"{final_taper} deg")
-        ext_input.taperAngle = taper_angle_input
-    new_body = extrudes.add(ext_input).bodies.item(0)
-    sketch.isVisible = False
-    move_body_with_placement(new_body, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement, direction)
+    new_body = create_placed_extrusion(root, plane, ExtrusionProfile('rect', width_cm / 2, depth_cm / 2), height_cm, cx_cm, cy_cm, cz_cm,
+                                       z_placement, x_placement, y_placement, taper_angle, taper_direction, direction)
     
     if body_name:
         new_body.name = get_unique_body_name(root, body_name) #【修正】一意な名前を生成
+    register_entity(new_body)
     return new_body.name
 
 def create_sphere(radius: float=25, body_name: str=None, cx: float=0, cy: float=0, cz: float=0, **kwargs):
@@ -264,7 +1543,8 @@ def create_sphere(radius: float=25, body_name: str=None, cx: float=0, cy: float=
     radius_cm = radius * scale
     cx_cm, cy_cm, cz_cm = cx * scale, cy * scale, cz * scale
     root = _app.activeProduct.rootComponent
-    sketch = root.sketches.add(root.xYConstructionPlane)
+    with trace_span('sketch.add'):
+        sketch = root.sketches.add(root.xYConstructionPlane)
     center_pt = adsk.core.Point3D.create(0, 0, 0)
     arc = sketch.sketchCurves.sketchArcs.addByCenterStartEnd(center_pt, adsk.core.Point3D.create(0, radius_cm, 0), adsk.core.Point3D.create(0, -radius_cm, 0))
     sketch.sketchCurves.sketchLines.addByTwoPoints(arc.startSketchPoint, arc.endSketchPoint)
@@ -273,10 +1553,13 @@ def create_sphere(radius: float=25, body_name: str=None, cx: float=0, cy: float=
     revolution_axis = root.yConstructionAxis
     revolve_input = revolves.createInput(prof, revolution_axis, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
     revolve_input.setAngleExtent(False, adsk.core.ValueInput.createByReal(math.pi * 2))
-    new_body = revolves.add(revolve_input).bodies.item(0)
+    with trace_span('revolve.add'):
+        new_body = revolves.add(revolve_input).bodies.item(0)
     sketch.isVisible = False
-    move_body_to_absolute_position(new_body, adsk.core.Point3D.create(cx_cm, cy_cm, cz_cm))
+    # 球の重心は原点にあるため、計測せずに中心座標へ平行移動する
+    apply_body_transform(root, new_body, _IDENTITY_ROTATION, (cx_cm, cy_cm, cz_cm))
     if body_name: new_body.name = get_unique_body_name(root, body_name)
+    register_entity(new_body)
     return new_body.name
 
 def create_hemisphere(radius: float=25, body_name: str=None, plane: str='xy', cx: float=0, cy: float=0, cz: float=0, orientation: str='positive', z_placement: str='bottom', x_placement: str='center', y_placement: str='center', **kwargs):
@@ -284,7 +1567,8 @@ def create_hemisphere(radius: float=25, body_name: str=None, plane: str='xy', cx
     radius_cm = radius * scale
     cx_cm, cy_cm, cz_cm = cx * scale, cy * scale, cz * scale
     root = _app.activeProduct.rootComponent
-    sketch = root.sketches.add(root.xYConstructionPlane)
+    with trace_span('sketch.add'):
+        sketch = root.sketches.add(root.xYConstructionPlane)
     arc = sketch.sketchCurves.sketchArcs.addByThreePoints(adsk.core.Point3D.create(-radius_cm, 0, 0), adsk.core.Point3D.create(0, radius_cm, 0), adsk.core.Point3D.create(radius_cm, 0, 0))
     axis_line = sketch.sketchCurves.sketchLines.addByTwoPoints(arc.startSketchPoint, arc.endSketchPoint)
     prof = sketch.profiles.item(0)
@@ -292,20 +1576,22 @@ def create_hemisphere(radius: float=25, body_name: str=None, plane: str='xy', cx
     revolve_input = revolves.createInput(prof, axis_line, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
     angle = adsk.core.ValueInput.createByReal(math.pi * (-1 if orientation.lower() == 'negative' else 1))
     revolve_input.setAngleExtent(False, angle)
-    new_body = revolves.add(revolve_input).bodies.item(0)
+    with trace_span('revolve.add'):
+        new_body = revolves.add(revolve_input).bodies.item(0)
     sketch.isVisible = False
-    transform = adsk.core.Matrix3D.create()
+    rotation = _IDENTITY_ROTATION
     if plane.lower() == 'xz':
-        transform.setToRotation(math.radians(90), adsk.core.Vector3D.create(1, 0, 0), adsk.core.Point3D.create(0,0,0))
+        rotation = rotation_matrix((1, 0, 0), math.radians(90))
     elif plane.lower() == 'yz':
-        transform.setToRotation(math.radians(-90), adsk.core.Vector3D.create(0, 1, 0), adsk.core.Point3D.create(0,0,0))
-    if plane.lower() != 'xy':
-        move_features = root.features.moveFeatures
-        move_input = move_features.createInput(adsk.core.ObjectCollection.createWithArray([new_body]), transform)
-        move_features.add(move_input)
-        adsk.doEvents()
-    move_body_with_placement(new_body, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement, 'positive')  # hemisphereにはdirectionパラメータなし
+        rotation = rotation_matrix((0, 1, 0), math.radians(-90))
+    # ドームの向きはバウンディングボックスの符号から判定する (物理プロパティは計算しない)
+    bbox = new_body.boundingBox
+    side = 1 if bbox.maxPoint.z + bbox.minPoint.z >= 0 else -1
+    translation = compute_analytic_placement(hemisphere_support(radius_cm, side), (0.0, 0.0, side * 3 * radius_cm / 8), rotation, (0.0, 0.0, 0.0),
+                                             cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement)
+    apply_body_transform(root, new_body, rotation, translation)
     if body_name: new_body.name = get_unique_body_name(root, body_name)
+    register_entity(new_body)
     return new_body.name
 
 def create_cone(radius: float=25, height: float=50, body_name: str=None, plane: str='xy', cx: float=0, cy: float=0, cz: float=0, z_placement: str='center', x_placement: str='center', y_placement: str='center', **kwargs):
@@ -313,10 +1599,22 @@ def create_cone(radius: float=25, height: float=50, body_name: str=None, plane:
     radius_cm, height_cm = radius * scale, height * scale
     cx_cm, cy_cm, cz_cm = cx * scale, cy * scale, cz * scale
     root = _app.activeProduct.rootComponent
-    sketch = root.sketches.add(root.xYConstructionPlane)
-    p1 = adsk.core.Point3D.create(0, 0, 0)
-    p2 = adsk.core.Point3D.create(radius_cm, 0, 0)
-    p3 = adsk.core.Point3D.create(0, 0, height_cm)
+    rotation = _IDENTITY_ROTATION
+    if plane.lower() == 'xz':
+        rotation = rotation_matrix((1, 0, 0), math.radians(-90))
+    elif plane.lower() == 'yz':
+        rotation = rotation_matrix((0, 1, 0), math.radians(90))
+    # 断面の三角形を最終位置・最終姿勢で直接描いて回転させる
+    translation = compute_analytic_placement(cone_support(radius_cm, height_cm), (0.0, 0.0, height_cm / 4), rotation, (0.0, 0.0, 0.0),
+                                             cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement)
+    def to_world(local):
+        x, y, z = matrix_apply(rotation, local)
+        return adsk.core.Point3D.create(x + translation[0], y + translation[1], z + translation[2])
+    with trace_span('sketch.add'):
+        sketch = root.sketches.add(root.xYConstructionPlane)
+    p1 = to_world((0, 0, 0))
+    p2 = to_world((radius_cm, 0, 0))
+    p3 = to_world((0, 0, height_cm))
     lines = sketch.sketchCurves.sketchLines
     lines.addByTwoPoints(p1, p2)
     lines.addByTwoPoints(p2, p3)
@@ -325,20 +1623,11 @@ def create_cone(radius: float=25, height: float=50, body_name: str=None, plane:
     revolves = root.features.revolveFeatures
     revolve_input = revolves.createInput(prof, axis_line, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
     revolve_input.setAngleExtent(False, adsk.core.ValueInput.createByReal(math.pi * 2))
-    new_body = revolves.add(revolve_input).bodies.item(0)
+    with trace_span('revolve.add'):
+        new_body = revolves.add(revolve_input).bodies.item(0)
     sketch.isVisible = False
-    transform = adsk.core.Matrix3D.create()
-    if plane.lower() == 'xz':
-        transform.setToRotation(math.radians(-90), adsk.core.Vector3D.create(1, 0, 0), adsk.core.Point3D.create(0,0,0))
-    elif plane.lower() == 'yz':
-        transform.setToRotation(math.radians(90), adsk.core.Vector3D.create(0, 1, 0), adsk.core.Point3D.create(0,0,0))
-    if plane.lower() != 'xy':
-        move_features = root.features.moveFeatures
-        move_input = move_features.createInput(adsk.core.ObjectCollection.createWithArray([new_body]), transform)
-        move_features.add(move_input)
-        adsk.doEvents()
-    move_body_with_placement(new_body, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement, 'positive')  # coneにはdirectionパラメータなし
     if body_name: new_body.name = get_unique_body_name(root, body_name)
+    register_entity(new_body)
     return new_body.name
         
 def create_polygon_prism(num_sides: int=6, radius: float=25, height: float=50, body_name: str=None, plane: str='xy', cx: float=0, cy: float=0, cz: float=0, z_placement: str='center', x_placement: str='center', y_placement: str='center', taper_angle: float=0, taper_direction: str='inward', direction: str='positive', **kwargs):
@@ -347,37 +1636,11 @@ def create_polygon_prism(num_sides: int=6, radius: float=25, height: float=50, b
     radius_cm, height_cm = radius * scale, height * scale
     cx_cm, cy_cm, cz_cm = cx * scale, cy * scale, cz * scale
     root = _app.activeProduct.rootComponent
-    sketch = root.sketches.add(get_construction_plane(root, plane))
-    points = [adsk.core.Point3D.create(radius_cm * math.cos(i * 2 * math.pi / num_sides), radius_cm * math.sin(i * 2 * math.pi / num_sides), 0) for i in range(num_sides)]
-    lines = sketch.sketchCurves.sketchLines
-    for i in range(num_sides):
-        lines.addByTwoPoints(points[i], points[(i + 1) % num_sides])
-    prof = sketch.profiles.item(0)
-    extrudes = root.features.extrudeFeatures
-    ext_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    distance = adsk.core.ValueInput.createByReal(height_cm)
-    
-    # Direction処理
-    if direction.lower() == 'positive':
-        ext_input.setDistanceExtent(False, distance)  # 非対称、+Z方向
-    else:
-        # negativeの場合は、逆方向の押し出しを実現
-        extent_definition = adsk.fusion.DistanceExtentDefinition.create(distance)
-        ext_input.setOneSideExtent(extent_definition, adsk.fusion.ExtentDirections.NegativeExtentDirection)
-    
-    # テーパー角度の処理
-    if taper_angle != 0:
-        final_taper = abs(taper_angle) * (-1 if taper_direction.lower() == 'inward' else 1)
-        taper_angle_input = adsk.core.ValueInput.createByString(f"{final_taper} deg")
-        ext_input.taperAngle = taper_angle_input
-    
-    new_body = extrudes.add(ext_input).bodies.item(0)
-    sketch.isVisible = False
-    
-    # 配置関数を使用
-    move_body_with_placement(new_body, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement, direction)
+    new_body = create_placed_extrusion(root, plane, ExtrusionProfile('polygon', radius_cm, sides=num_sides), height_cm, cx_cm, cy_cm, cz_cm,
+                                       z_placement, x_placement, y_placement, taper_angle, taper_direction, direction)
     
     if body_name: new_body.name = get_unique_body_name(root, body_name)
+    register_entity(new_body)
     return new_body.name
         
 def create_torus(major_radius=30, minor_radius=10, cx=0, cy=0, cz=0, plane='xy', z_placement='center', x_placement='center', y_placement='center', body_name=None, **kwargs):
@@ -385,41 +1648,32 @@ def create_torus(major_radius=30, minor_radius=10, cx=0, cy=0, cz=0, plane='xy',
     major_radius_cm, minor_radius_cm = major_radius * scale, minor_radius * scale
     cx_cm, cy_cm, cz_cm = cx * scale, cy * scale, cz * scale
     root = _app.activeProduct.rootComponent
-    sketch = root.sketches.add(root.xZConstructionPlane)
+    with trace_span('sketch.add'):
+        sketch = root.sketches.add(root.xZConstructionPlane)
     sketch.sketchCurves.sketchCircles.addByCenterRadius(
         adsk.core.Point3D.create(major_radius_cm, 0, 0), minor_radius_cm)
     prof = sketch.profiles.item(0)
     revolves = root.features.revolveFeatures
     revolve_input = revolves.createInput(prof, root.zConstructionAxis, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
     revolve_input.setAngleExtent(False, adsk.core.ValueInput.createByReal(math.pi * 2))
-    new_body = revolves.add(revolve_input).bodies.item(0)
+    with trace_span('revolve.add'):
+        new_body = revolves.add(revolve_input).bodies.item(0)
     sketch.isVisible = False
     
+    rotation = _IDENTITY_ROTATION
     if plane.lower() == 'xz':
-        transform = adsk.core.Matrix3D.create()
-        transform.setToRotation(math.radians(90), 
-                              adsk.core.Vector3D.create(1, 0, 0), 
-                              adsk.core.Point3D.create(0, 0, 0))
-        move_features = root.features.moveFeatures
-        move_input = move_features.createInput(
-            adsk.core.ObjectCollection.createWithArray([new_body]), transform)
-        move_features.add(move_input)
-        adsk.doEvents()
+        rotation = rotation_matrix((1, 0, 0), math.radians(90))
     elif plane.lower() == 'yz':
-        transform = adsk.core.Matrix3D.create()
-        transform.setToRotation(math.radians(90), 
-                              adsk.core.Vector3D.create(0, 1, 0), 
-                              adsk.core.Point3D.create(0, 0, 0))
-        move_features = root.features.moveFeatures
-        move_input = move_features.createInput(
-            adsk.core.ObjectCollection.createWithArray([new_body]), transform)
-        move_features.add(move_input)
-        adsk.doEvents()
+        rotation = rotation_matrix((0, 1, 0), math.radians(90))
     
-    move_body_with_placement(new_body, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement, 'positive')  # torusにはdirectionパラメータなし
+    # 回転と配置を1つの移動フィーチャーにまとめる (重心は原点)
+    translation = compute_analytic_placement(torus_support(major_radius_cm, minor_radius_cm), (0.0, 0.0, 0.0), rotation, (0.0, 0.0, 0.0),
+                                             cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement)
+    apply_body_transform(root, new_body, rotation, translation)
     
     if body_name:
         new_body.name = get_unique_body_name(root, body_name) #【修正】一意な名前を生成
+    register_entity(new_body)
     return new_body.name
 
 def create_half_torus(major_radius=30, minor_radius=10, cx=0, cy=0, cz=0, plane='xy', z_placement='center', x_placement='center', y_placement='center', body_name=None, orientation: str='back', plane_rotation_angle: float=0, opening_extrude_distance: float=0, **kwargs):
@@ -427,61 +1681,52 @@ def create_half_torus(major_radius=30, minor_radius=10, cx=0, cy=0, cz=0, plane=
     major_radius_cm, minor_radius_cm = major_radius * scale, minor_radius * scale
     cx_cm, cy_cm, cz_cm = cx * scale, cy * scale, cz * scale
     root = _app.activeProduct.rootComponent
-    move_features = root.features.moveFeatures
 
     # --- 本体作成 ---
-    sketch = root.sketches.add(root.xZConstructionPlane)
+    with trace_span('sketch.add'):
+        sketch = root.sketches.add(root.xZConstructionPlane)
     sketch.sketchCurves.sketchCircles.addByCenterRadius(
         adsk.core.Point3D.create(major_radius_cm, 0, 0), minor_radius_cm)
     prof = sketch.profiles.item(0)
     revolves = root.features.revolveFeatures
     revolve_input = revolves.createInput(prof, root.zConstructionAxis, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
     revolve_input.setAngleExtent(False, adsk.core.ValueInput.createByReal(math.pi))
-    new_body = revolves.add(revolve_input).bodies.item(0)
+    with trace_span('revolve.add'):
+        new_body = revolves.add(revolve_input).bodies.item(0)
     sketch.isVisible = False
 
     # --- 回転処理 ---
-    transform_matrix = adsk.core.Matrix3D.create()
-    plane_normal = adsk.core.Vector3D.create(0, 0, 1)
+    base_rotation = _IDENTITY_ROTATION
+    plane_normal = (0, 0, 1)
     
     plane_lower = plane.lower()
     if plane_lower == 'xz':
-        transform_matrix.setToRotation(math.pi / 2, adsk.core.Vector3D.create(1, 0, 0), adsk.core.Point3D.create(0,0,0))
-        plane_normal = adsk.core.Vector3D.create(0, 1, 0)
+        base_rotation = rotation_matrix((1, 0, 0), math.pi / 2)
+        plane_normal = (0, 1, 0)
     elif plane_lower == 'yz':
-        transform_matrix.setToRotation(-math.pi / 2, adsk.core.Vector3D.create(0, 1, 0), adsk.core.Point3D.create(0,0,0))
-        plane_normal = adsk.core.Vector3D.create(1, 0, 0)
+        base_rotation = rotation_matrix((0, 1, 0), -math.pi / 2)
+        plane_normal = (1, 0, 0)
 
     orientation_angle_deg = 0
     orientation_lower = orientation.lower()
 
-    if plane_lower == 'xy':
-        if orientation_lower == 'back': orientation_angle_deg = 180
-        elif orientation_lower == 'left': orientation_angle_deg = 90
-        elif orientation_lower == 'right': orientation_angle_deg = -90
-    elif plane_lower == 'xz':
-        if orientation_lower == 'back': orientation_angle_deg = 180
-        elif orientation_lower == 'left': orientation_angle_deg = 90
-        elif orientation_lower == 'right': orientation_angle_deg = -90
-    elif plane_lower == 'yz':
-        if orientation_lower == 'back': orientation_angle_deg = 180
-        elif orientation_lower == 'left': orientation_angle_deg = 90
-        elif orientation_lower == 'right': orientation_angle_deg = -90
+    if orientation_lower == 'back': orientation_angle_deg = 180
+    elif orientation_lower == 'left': orientation_angle_deg = 90
+    elif orientation_lower == 'right': orientation_angle_deg = -90
 
     total_rotation_angle_rad = math.radians(orientation_angle_deg + plane_rotation_angle)
-
+    rotation = base_rotation
     if total_rotation_angle_rad != 0:
-        orientation_matrix = adsk.core.Matrix3D.create()
-        orientation_matrix.setToRotation(total_rotation_angle_rad, plane_normal, adsk.core.Point3D.create(0,0,0))
-        transform_matrix.transformBy(orientation_matrix)
-
-    if not transform_matrix.isEqualTo(adsk.core.Matrix3D.create()):
-        move_input = move_features.createInput(adsk.core.ObjectCollection.createWithArray([new_body]), transform_matrix)
-        move_features.add(move_input)
-        adsk.doEvents()
+        rotation = matrix_multiply(rotation_matrix(plane_normal, total_rotation_angle_rad), base_rotation)
 
     # --- 最終配置 ---
-    move_body_with_placement(new_body, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement, 'positive')
+    # 半周側はバウンディングボックスの符号から判定し、回転と配置を1つの移動フィーチャーにまとめる
+    bbox = new_body.boundingBox
+    side = 1 if bbox.maxPoint.y + bbox.minPoint.y >= 0 else -1
+    centroid = (0.0, side * half_torus_centroid_offset(major_radius_cm, minor_radius_cm), 0.0)
+    translation = compute_analytic_placement(torus_support(major_radius_cm, minor_radius_cm, side), centroid, rotation, (0.0, 0.0, 0.0),
+                                             cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement)
+    apply_body_transform(root, new_body, rotation, translation)
     
     # --- 開口断面の押し出し処理 ---
     if opening_extrude_distance != 0:
@@ -495,13 +1740,15 @@ def create_half_torus(major_radius=30, minor_radius=10, cx=0, cy=0, cz=0, plane=
             distance = adsk.core.ValueInput.createByReal(opening_extrude_distance * get_fusion_unit_scale())
             extrude_input = extrudes.createInput(extrude_faces, adsk.fusion.FeatureOperations.JoinFeatureOperation)
             extrude_input.setDistanceExtent(False, distance)
-            extrudes.add(extrude_input)
+            with trace_span('extrude.add'):
+                extrudes.add(extrude_input)
             log_debug(f"Extruded opening faces by {opening_extrude_distance}mm.")
         else:
-            log_debug(f"Warning: Expected 2 planar faces for extrusion, but found {extrude_faces.count}. Skipping extrusion.")
+            log_warning(f"Warning: Expected 2 planar faces for extrusion, but found {extrude_faces.count}. Skipping extrusion.")
 
     if body_name:
         new_body.name = get_unique_body_name(root, body_name) #【修正】一意な名前を生成
+    register_entity(new_body)
     return new_body.name
     
 def create_pipe(x1: float=0, y1: float=0, z1: float=0, x2: float=50, y2: float=0, z2: float=50, radius: float=5, body_name: str=None, **kwargs):
@@ -518,7 +1765,8 @@ def create_pipe(x1: float=0, y1: float=0, z1: float=0, x2: float=50, y2: float=0
         (p1.y + p2.y) / 2,
         (p1.z + p2.z) / 2
     )
-    sketch = root.sketches.add(root.xYConstructionPlane)
+    with trace_span('sketch.add'):
+        sketch = root.sketches.add(root.xYConstructionPlane)
     sketch.sketchCurves.sketchCircles.addByCenterRadius(adsk.core.Point3D.create(0, 0, 0), radius_cm)
     prof = sketch.profiles.item(0)
     extrudes = root.features.extrudeFeatures
@@ -528,44 +1776,22 @@ def create_pipe(x1: float=0, y1: float=0, z1: float=0, x2: float=50, y2: float=0
         adsk.fusion.DistanceExtentDefinition.create(adsk.core.ValueInput.createByReal(length/2)),
         adsk.fusion.DistanceExtentDefinition.create(adsk.core.ValueInput.createByReal(length/2))
     )
-    extrude_feature = extrudes.add(ext_input)
+    with trace_span('extrude.add'):
+        extrude_feature = extrudes.add(ext_input)
     new_body = extrude_feature.bodies.item(0)
     sketch.isVisible = False
-    z_axis = adsk.core.Vector3D.create(0, 0, 1)
-    dot_product = direction.dotProduct(z_axis)
+    # 押し出しは原点を中心とするため、回転と中点への平行移動を1つの移動フィーチャーにまとめる
+    rotation = _IDENTITY_ROTATION
+    dot_product = direction.z
     if abs(dot_product) < 0.999:
-        rotation_axis = z_axis.crossProduct(direction)
-        rotation_axis.normalize()
-        angle = z_axis.angleTo(direction)
-        transform = adsk.core.Matrix3D.create()
-        transform.setToRotation(angle, rotation_axis, adsk.core.Point3D.create(0, 0, 0))
-        
-        move_features = root.features.moveFeatures
-        move_input = move_features.createInput(adsk.core.ObjectCollection.createWithArray([new_body]), transform)
-        move_features.add(move_input)
-        adsk.doEvents()
+        rotation = rotation_matrix((-direction.y, direction.x, 0), math.acos(dot_product))
     elif dot_product < 0:
-        transform = adsk.core.Matrix3D.create()
-        transform.setToRotation(math.pi, adsk.core.Vector3D.create(1, 0, 0), adsk.core.Point3D.create(0, 0, 0))
-        
-        move_features = root.features.moveFeatures
-        move_input = move_features.createInput(adsk.core.ObjectCollection.createWithArray([new_body]), transform)
-        move_features.add(move_input)
-        adsk.doEvents()
-    
-    current_center = new_body.physicalProperties.centerOfMass
-    move_vector = current_center.vectorTo(center)
-    
-    if move_vector.length > 1e-6:
-        transform2 = adsk.core.Matrix3D.create()
-        transform2.translation = move_vector
-        
-        move_features = root.features.moveFeatures
-        move_input2 = move_features.createInput(adsk.core.ObjectCollection.createWithArray([new_body]), transform2)
-        move_features.add(move_input2)
+        rotation = rotation_matrix((1, 0, 0), math.pi)
+    apply_body_transform(root, new_body, rotation, (center.x, center.y, center.z))
     
     if body_name:
         new_body.name = get_unique_body_name(root, body_name) #【修正】一意な名前を生成
+    register_entity(new_body)
     
     return new_body.name
 
@@ -605,14 +1831,16 @@ def create_polygon_sweep(cx=0, cy=0, cz=0, path_radius=30, sweep_angle=360,
     # --- ジオメトリ作成 ---
     
     # 1. パススケッチを作成 (XZ平面上)
-    path_sketch = root.sketches.add(root.xZConstructionPlane)
+    with trace_span('sketch.add'):
+        path_sketch = root.sketches.add(root.xZConstructionPlane)
     center_point = adsk.core.Point3D.create(0, 0, 0)
 
     # 360度の場合は完全な円を作成
     path_curve = path_sketch.sketchCurves.sketchCircles.addByCenterRadius(center_point, path_radius_cm)
 
     # 2. XY平面上にプロファイルスケッチを作成 (パスの始点に垂直)
-    profile_sketch = root.sketches.add(root.xYConstructionPlane)
+    with trace_span('sketch.add'):
+        profile_sketch = root.sketches.add(root.xYConstructionPlane)
     profile_center_pt = adsk.core.Point3D.create(path_radius_cm, 0, 0)
 
     profile_points = []
@@ -648,41 +1876,251 @@ def create_polygon_sweep(cx=0, cy=0, cz=0, path_radius=30, sweep_angle=360,
             sweep_input.twistAngle = twist_angle_value
             log_debug("Twist angle set successfully")
         except Exception as e:
-            log_debug(f"Warning: Failed to set twist angle: {e}")
+            log_warning(f"Warning: Failed to set twist angle: {e}")
             # ねじり角度の設定に失敗した場合でも、通常のスイープを続行
     
-    new_body = sweeps.add(sweep_input).bodies.item(0)
+    with trace_span('sweep.add'):
+        new_body = sweeps.add(sweep_input).bodies.item(0)
     path_sketch.isVisible = False
     profile_sketch.isVisible = False
 
     # --- 変換と配置 ---
     
-    # 4. ボディを目的の平面に回転
-    transform = adsk.core.Matrix3D.create()
+    # 4. 目的の平面への回転と最終位置への移動を1つの移動フィーチャーにまとめる
+    rotation = _IDENTITY_ROTATION
     plane_lower = plane.lower()
 
     if plane_lower == 'xy':
         # XZ平面からXY平面へ -> X軸を中心に-90度回転
-        transform.setToRotation(-math.pi / 2, adsk.core.Vector3D.create(1, 0, 0), adsk.core.Point3D.create(0,0,0))
+        rotation = rotation_matrix((1, 0, 0), -math.pi / 2)
     elif plane_lower == 'yz':
         # XZ平面からYZ平面へ -> Z軸を中心に90度回転
-        transform.setToRotation(math.pi / 2, adsk.core.Vector3D.create(0, 0, 1), adsk.core.Point3D.create(0,0,0))
-
-    if plane_lower != 'xz':
-        move_features = root.features.moveFeatures
-        move_input = move_features.createInput(adsk.core.ObjectCollection.createWithArray([new_body]), transform)
-        move_features.add(move_input)
-        adsk.doEvents()
+        rotation = rotation_matrix((0, 0, 1), math.pi / 2)
 
-    # 5. ボディを最終位置に移動
-    move_body_with_placement(new_body, cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement, 'positive')
+    # 回転は軸の入れ替えのみなので、作成直後のバウンディングボックスの角から配置後の範囲が正確に求まる (重心は原点)
+    bbox = new_body.boundingBox
+    corners = [(x, y, z) for x in (bbox.minPoint.x, bbox.maxPoint.x)
+               for y in (bbox.minPoint.y, bbox.maxPoint.y)
+               for z in (bbox.minPoint.z, bbox.maxPoint.z)]
+    translation = compute_analytic_placement(sampled_support(corners), (0.0, 0.0, 0.0), rotation, (0.0, 0.0, 0.0),
+                                             cx_cm, cy_cm, cz_cm, z_placement, x_placement, y_placement)
+    apply_body_transform(root, new_body, rotation, translation)
 
     if body_name:
         new_body.name = get_unique_body_name(root, body_name) #【修正】一意な名前を生成
+    register_entity(new_body)
     
     log_debug(f"Polygon sweep created successfully with {twist_rotations} rotations (twist_angle: {twist_angle} degrees)")
     return new_body.name
 
+# create_primitives_batch で作成できるコマンド (1つのボディを作成し、その名前を返すもの)
+BATCH_PRIMITIVE_COMMANDS = ('create_cube', 'create_box', 'create_cylinder', 'create_polygon_prism',
+                            'create_sphere', 'create_hemisphere', 'create_cone', 'create_torus',
+                            'create_half_torus', 'create_pipe', 'create_polygon_sweep')
+
+def batch_extrusion_profile(tool_name: str, arguments: dict, scale: float):
+    """
+    バッチ作成用に、押し出しプリミティブの (断面, 押し出し高さcm) を返します。
+    押し出しで作れないコマンドの場合は None を返します。既定値は各 create_* 関数と同じです。
+    """
+    if tool_name == 'create_cube':
+        size_cm = arguments.get('size', 50) * scale
+        return ExtrusionProfile('rect', size_cm / 2), size_cm
+    if tool_name == 'create_box':
+        return (ExtrusionProfile('rect', arguments.get('width', 50) * scale / 2, arguments.get('depth', 30) * scale / 2),
+                arguments.get('height', 20) * scale)
+    if tool_name == 'create_cylinder':
+        return ExtrusionProfile('circle', arguments.get('radius', 25) * scale), arguments.get('height', 50) * scale
+    if tool_name == 'create_polygon_prism':
+        num_sides = arguments.get('num_sides', 6)
+        if num_sides < 3: raise ValueError("多角形の辺の数は3以上でなければなりません。")
+        return ExtrusionProfile('polygon', arguments.get('radius', 25) * scale, sides=num_sides), arguments.get('height', 50) * scale
+    return None
+
+def _bounds_overlap(a_min, a_max, b_min, b_max, tolerance: float=1e-4):
+    return all(a_min[i] <= b_max[i] + tolerance and b_min[i] <= a_max[i] + tolerance for i in range(3))
+
+def partition_non_overlapping(entries: list, tolerance: float=1e-4) -> list:
+    """
+    (入力インデックス, 断面, 配置, 引数) のリストを、断面が互いに重ならないチャンクに分けます。
+    各要素は入力順に「重なる相手がまだいない最初のチャンク」へ入ります。
+    重なる組はX方向のスイープ・アンド・プルーンで求めるため、全組み合わせを比べる必要はありません。
+    """
+    neighbours = [[] for _ in entries]
+    active = []
+    for i in sorted(range(len(entries)), key=lambda i: entries[i][2]['bbox_min'][0]):
+        bbox_min, bbox_max = entries[i][2]['bbox_min'], entries[i][2]['bbox_max']
+        # X方向で離れた断面を作業リストから外す
+        active = [j for j in active if entries[j][2]['bbox_max'][0] + tolerance >= bbox_min[0]]
+        for j in active:
+            if _bounds_overlap(bbox_min, bbox_max, entries[j][2]['bbox_min'], entries[j][2]['bbox_max'], tolerance):
+                neighbours[i].append(j)
+                neighbours[j].append(i)
+        active.append(i)
+    chunks = []
+    assigned = [None] * len(entries)
+    for i, entry in enumerate(entries):
+        taken = {assigned[j] for j in neighbours[i] if assigned[j] is not None}
+        chunk_index = next(k for k in range(len(chunks) + 1) if k not in taken)
+        if chunk_index == len(chunks):
+            chunks.append([])
+        chunks[chunk_index].append(entry)
+        assigned[i] = chunk_index
+    return chunks
+
+def rollback_timeline(start_count: int) -> int:
+    """タイムラインの start_count 番目以降に追加された項目を新しい順に削除し、削除した件数を返します。"""
+    timeline = _app.activeProduct.timeline
+    removed = 0
+    for position in range(timeline.count - 1, start_count - 1, -1):
+        entity = timeline.item(position).entity
+        if entity and entity.isValid and entity.deleteMe():
+            removed += 1
+    return removed
+
+def create_primitives_batch(primitives: list, **kwargs):
+    """
+    複数のプリミティブをまとめて作成し、作成されたボディ名を入力順に返します。
+    primitives の各要素は {"tool_name": "create_cylinder", "arguments": {...}} 形式です。
+    平面・高さ・押し出し方向・開始オフセット・テーパーが同じ押し出しプリミティブは
+    1つのスケッチにまとめて描き、1回の押し出しで作成します (互いに重なる断面は別のグループに分けます)。
+    押し出しで作れないプリミティブは個別の create_* コマンドで作成します。
+    使用できるコマンドは BATCH_PRIMITIVE_COMMANDS のプリミティブ作成コマンドだけです。
+    途中で失敗した場合は、このコマンドで追加したスケッチ・フィーチャーをすべて削除してからエラーを返します。
+    """
+    global _ui_refresh_deferred
+    root = _app.activeProduct.rootComponent
+    timeline = _app.activeProduct.timeline
+    timeline_start = timeline.count if timeline else None
+    scale = get_fusion_unit_scale()
+    names = [None] * len(primitives)
+    groups = {}
+    singles = []
+    frames = {}
+    spare_sketches = {}
+    was_deferred = _ui_refresh_deferred
+    _ui_refresh_deferred = True
+    feature_count = 0
+    extruded = []
+    try:
+        # --- 押し出しプリミティブの配置を計算してグループ分け ---
+        for index, spec in enumerate(primitives):
+            tool_name = spec.get('tool_name', '')
+            if tool_name.startswith('fusion:'):
+                tool_name = tool_name[len('fusion:'):]
+            arguments = spec.get('arguments', {})
+            if tool_name not in BATCH_PRIMITIVE_COMMANDS:
+                raise ValueError(f"primitives[{index}]: バッチ作成できないコマンドです: '{spec.get('tool_name')}' "
+                                 f"(使用可能: {', '.join(BATCH_PRIMITIVE_COMMANDS)})")
+            extrusion = batch_extrusion_profile(tool_name, arguments, scale)
+            if extrusion is None:
+                singles.append((index, tool_name, arguments))
+                continue
+            profile, height_cm = extrusion
+            plane = arguments.get('plane', 'xy').lower()
+            if plane not in frames:
+                # スケッチの座標系は平面ごとに1度だけ取得し、そのスケッチは最初のグループで再利用する
+                with trace_span('sketch.add'):
+                    sketch = root.sketches.add(get_construction_plane(root, plane))
+                frames[plane] = sketch_frame(sketch)
+                spare_sketches[plane] = sketch
+            rotation, origin = frames[plane]
+            taper_angle = arguments.get('taper_angle', 0)
+            taper_direction = arguments.get('taper_direction', 'inward')
+            plan = plan_placed_extrusion(rotation, origin, profile, height_cm,
+                                         arguments.get('cx', 0) * scale, arguments.get('cy', 0) * scale, arguments.get('cz', 0) * scale,
+                                         arguments.get('z_placement', 'center'), arguments.get('x_placement', 'center'), arguments.get('y_placement', 'center'),
+                                         taper_angle, taper_direction, arguments.get('direction', 'positive'))
+            key = (plane, round(height_cm, 9), plan['sign'], round(plan['start_offset'], 9),
+                   taper_angle, taper_direction.lower() if taper_angle else '')
+            groups.setdefault(key, []).append((index, profile, plan, arguments))
+
+        # --- グループごとに1つのスケッチ・1回の押し出し ---
+        for key, entries in groups.items():
+            plane, height_cm, sign, start_offset, taper_angle, taper_direction = key
+            # 同じスケッチ内で断面が重なると領域が分割・結合されるため、重なるものは別のチャンクに分ける
+            for chunk in partition_non_overlapping(entries):
+                with trace_span('sketch.add'):
+                    sketch = spare_sketches.pop(plane, None) or root.sketches.add(get_construction_plane(root, plane))
+                sketch.isComputeDeferred = True
+                for index, profile, plan, arguments in chunk:
+                    profile.draw(sketch, plan['u'], plan['v'])
+                sketch.isComputeDeferred = False
+                profiles = adsk.core.ObjectCollection.create()
+                for prof in sketch.profiles:
+                    profiles.add(prof)
+                if profiles.count != len(chunk):
+                    raise RuntimeError(f"スケッチの断面数 ({profiles.count}) がプリミティブ数 ({len(chunk)}) と一致しません。")
+                feature = add_extrusion(root, profiles, height_cm, start_offset, sign, taper_angle, taper_direction or 'inward')
+                sketch.isVisible = False
+                feature_count += 1
+                extruded.extend(match_bodies_to_plans(list(feature.bodies), chunk))
+        for sketch in spare_sketches.values():
+            sketch.deleteMe()
+
+        # --- 名前をまとめて割り当て、索引に登録 ---
+        named = [(index, body, arguments['body_name']) for index, body, arguments in extruded if arguments.get('body_name')]
+        unique_names = allocate_unique_body_names(root, [base for _, _, base in named])
+        for (index, body, _), name in zip(named, unique_names):
+            body.name = name
+        for index, body, _ in extruded:
+            register_entity(body)
+            names[index] = body.name
+
+        # --- 押し出しで作れないプリミティブは個別に作成 ---
+        for index, tool_name, arguments in singles:
+            names[index] = COMMAND_MAP[tool_name](**arguments)
+            feature_count += 1
+    except Exception:
+        # 一部だけ作成された状態を残さない
+        if timeline_start is not None:
+            removed = rollback_timeline(timeline_start)
+            log_warning(f"create_primitives_batch failed; removed {removed} timeline item(s) it had added.")
+        raise
+    finally:
+        _ui_refresh_deferred = was_deferred
+        if not was_deferred:
+            refresh_ui()
+
+    return {
+        "bodies": names,
+        "count": len(names),
+        "extrude_features": feature_count - len(singles),
+        "individual": len(singles)
+    }
+
+def match_bodies_to_plans(bodies: list, chunk: list) -> list:
+    """
+    1回の押し出しで作成された複数のボディを、予測したバウンディングボックスの中心で元のプリミティブに対応付けます。
+    戻り値は (入力インデックス, ボディ, 引数) のリストです。
+    """
+    if len(bodies) != len(chunk):
+        raise RuntimeError(f"押し出しで作成されたボディ数 ({len(bodies)}) がプリミティブ数 ({len(chunk)}) と一致しません。")
+    def center_key(bbox_min, bbox_max):
+        return tuple(round((lo + hi) / 2, 3) for lo, hi in zip(bbox_min, bbox_max))
+    expected = {}
+    for entry in chunk:
+        expected.setdefault(center_key(entry[2]['bbox_min'], entry[2]['bbox_max']), []).append(entry)
+    matched = []
+    unmatched = []
+    for body in bodies:
+        bbox = body.boundingBox
+        key = center_key((bbox.minPoint.x, bbox.minPoint.y, bbox.minPoint.z), (bbox.maxPoint.x, bbox.maxPoint.y, bbox.maxPoint.z))
+        if expected.get(key):
+            index, _, _, arguments = expected[key].pop()
+            matched.append((index, body, arguments))
+        else:
+            unmatched.append(body)
+    # 丸め誤差で一致しなかったものは最も近い中心に割り当てる
+    remaining = [entry for entries in expected.values() for entry in entries]
+    for body in unmatched:
+        bbox = body.boundingBox
+        center = [(bbox.minPoint.x + bbox.maxPoint.x) / 2, (bbox.minPoint.y + bbox.maxPoint.y) / 2, (bbox.minPoint.z + bbox.maxPoint.z) / 2]
+        best = min(remaining, key=lambda entry: sum(((lo + hi) / 2 - c) ** 2 for lo, hi, c in zip(entry[2]['bbox_min'], entry[2]['bbox_max'], center)))
+        remaining.remove(best)
+        matched.append((best[0], body, best[3]))
+    return matched
+
 def copy_body_symmetric(source_body_name: str, new_body_name: str, plane: str = 'xy', **kwargs):
     source_body = find_entity_by_name(source_body_name)
     if not source_body: raise ValueError(f"ボディ '{source_body_name}' が見つかりません。")
@@ -690,9 +2128,11 @@ def copy_body_symmetric(source_body_name: str, new_body_name: str, plane: str =
     mirror_features = root.features.mirrorFeatures
     mirror_input = mirror_features.createInput(adsk.core.ObjectCollection.createWithArray([source_body]), get_construction_plane(root, plane))
     mirror_input.pattern_type = 0 # 0 = Body Pattern
-    new_body = mirror_features.add(mirror_input).bodies.item(0)
+    with trace_span('mirror.add'):
+        new_body = mirror_features.add(mirror_input).bodies.item(0)
     if new_body_name:
         new_body.name = get_unique_body_name(root, new_body_name) #【修正】一意な名前を生成
+    register_entity(new_body)
     return new_body.name
 
 def create_circular_pattern(source_body_name: str, axis: str = 'z', quantity: int = 4, angle: float = 360.0, new_body_base_name: str = None, **kwargs):
@@ -713,14 +2153,17 @@ def create_circular_pattern(source_body_name: str, axis: str = 'z', quantity: in
     pattern_input.pattern_type = 0 # 0 = Body Pattern
 
     #【修正】堅牢なロジックに変更
-    pattern_feature = circular_patterns.add(pattern_input)
+    with trace_span('circular_pattern.add'):
+        pattern_feature = circular_patterns.add(pattern_input)
+    # パターン機能から直接新しいボディを取得（高速・確実）
+    new_bodies = list(pattern_feature.bodies)
     if new_body_base_name:
-        # パターン機能から直接新しいボディを取得（高速・確実）
-        newly_created_bodies = pattern_feature.bodies
-        for i, body in enumerate(newly_created_bodies):
-            # 新しいボディそれぞれに一意な名前を生成して付与
-            unique_name = get_unique_body_name(root, f"{new_body_base_name}_{i+1}")
-            body.name = unique_name
+        # 新しいボディすべての一意な名前をまとめて割り当てる
+        unique_names = allocate_unique_body_names(root, [f"{new_body_base_name}_{i+1}" for i in range(len(new_bodies))])
+    for i, body in enumerate(new_bodies):
+        if new_body_base_name:
+            body.name = unique_names[i]
+        register_entity(body)
             
     return f"{quantity}個の円形状パターンを作成しました。"
 
@@ -740,49 +2183,270 @@ def create_rectangular_pattern(source_body_name: str, distance_type: str='spacin
     pattern_input.pattern_type = 0 # 0 = Body Pattern
     
     #【修正】堅牢なロジックに変更
-    pattern_feature = rect_patterns.add(pattern_input)
+    with trace_span('rectangular_pattern.add'):
+        pattern_feature = rect_patterns.add(pattern_input)
+    # パターン機能から直接新しいボディを取得（高速・確実）
+    new_bodies = list(pattern_feature.bodies)
     if new_body_base_name:
-        # パターン機能から直接新しいボディを取得（高速・確実）
-        newly_created_bodies = pattern_feature.bodies
-        for i, body in enumerate(newly_created_bodies):
-            # 新しいボディそれぞれに一意な名前を生成して付与
-            unique_name = get_unique_body_name(root, f"{new_body_base_name}_{i+1}")
-            body.name = unique_name
+        # 新しいボディすべての一意な名前をまとめて割り当てる
+        unique_names = allocate_unique_body_names(root, [f"{new_body_base_name}_{i+1}" for i in range(len(new_bodies))])
+    for i, body in enumerate(new_bodies):
+        if new_body_base_name:
+            body.name = unique_names[i]
+        register_entity(body)
             
     return f"{quantity_one}x{quantity_two}の矩形状パターンを作成しました。"
         
-def add_fillet(body_name: str, radius: float=1.0, edge_indices: list=None, **kwargs):
+# --- エッジ/面セレクター ---
+# セレクター文字列の例:
+#   "type=line; parallel=z"            Z軸に平行な直線エッジ
+#   "face_normal=+z"                   上向きの平面に接するエッジ (上面の輪郭)
+#   "at=max_z; length>=10"             ボディ上端にある長さ10mm以上のエッジ
+#   "type=circle; radius=2..5 | parallel=x"
+# ";" (または空白) で区切った条件はすべて満たす必要があり (AND)、"|" で区切った条件群はいずれかを満たせば選択されます (OR)。
+_SELECTOR_CLAUSE_PATTERN = re.compile(r'^\s*([a-z_]+)\s*(<=|>=|!=|=|<|>)\s*(.+?)\s*$')
+_SELECTOR_AXES = {'x': (1.0, 0.0, 0.0), 'y': (0.0, 1.0, 0.0), 'z': (0.0, 0.0, 1.0)}
+_SELECTOR_ANGLE_TOLERANCE = 1e-3
+_SELECTOR_POSITION_TOLERANCE = 1e-4  # cm
+_EDGE_SELECTOR_KEYS = ('type', 'parallel', 'perpendicular', 'at', 'length', 'radius', 'face_normal')
+_FACE_SELECTOR_KEYS = ('type', 'normal', 'at', 'area', 'radius')
+# 大小比較 (<, <=, >, >=) が使えるのは数値のキーだけ。それ以外のキーは = と != のみ
+_SELECTOR_NUMERIC_KEYS = ('length', 'radius', 'area')
+
+def parse_selector(selector: str, allowed_keys) -> list:
     """
-    指定されたボディの特定のエッジにフィレットを追加します。
-    UIの選択状態に依存せず、引数で直接指定する堅牢な実装です。
+    セレクター文字列を [[(キー, 演算子, 値), ...], ...] (OR の中に AND) に変換します。
     """
-    target_body = find_entity_by_name(body_name)
-    if not target_body:
+    alternatives = []
+    for group in selector.lower().split('|'):
+        clauses = []
+        for text in re.split(r'[;\s]+(?=[a-z_]+\s*(?:<=|>=|!=|=|<|>))', group.strip()):
+            text = text.strip().rstrip(';')
+            if not text:
+                continue
+            match = _SELECTOR_CLAUSE_PATTERN.match(text)
+            if not match:
+                raise ValueError(f"セレクターの条件を解釈できません: '{text}'")
+            key, op, value = match.groups()
+            if key not in allowed_keys:
+                raise ValueError(f"セレクターのキー '{key}' は使用できません (使用可能: {', '.join(allowed_keys)})")
+            if op not in ('=', '!=') and key not in _SELECTOR_NUMERIC_KEYS:
+                raise ValueError(f"セレクターのキー '{key}' には = か != を指定してください: '{text}'")
+            clauses.append((key, op, value))
+        if clauses:
+            alternatives.append(clauses)
+    if not alternatives:
+        raise ValueError("セレクターが空です。")
+    return alternatives
+
+def _selector_axis(value: str):
+    """'x' / '+z' / '-y' を (単位ベクトル, 符号) に変換します。"""
+    sign = -1 if value.startswith('-') else 1
+    axis = _SELECTOR_AXES.get(value.lstrip('+-'))
+    if axis is None:
+        raise ValueError(f"無効な軸: '{value}' (x / y / z に +/- を付けて指定してください)")
+    return axis, sign
+
+def _selector_compare(actual, op: str, value: str) -> bool:
+    """数値条件を評価します。'=' では 'a..b' の範囲指定も使えます。"""
+    if actual is None:
+        return False
+    if op == '=' and '..' in value:
+        low, high = value.split('..', 1)
+        return (not low or actual >= float(low) - 1e-9) and (not high or actual <= float(high) + 1e-9)
+    target = float(value)
+    if op == '=':
+        return abs(actual - target) <= 1e-6 * max(1.0, abs(target))
+    if op == '!=':
+        return abs(actual - target) > 1e-6 * max(1.0, abs(target))
+    return {'<': actual < target, '<=': actual <= target + 1e-9, '>': actual > target, '>=': actual >= target - 1e-9}[op]
+
+def _selector_at(entity_bbox, body_bbox, value: str) -> bool:
+    """'max_z' / 'min_x' などで、要素がボディのバウンディングボックスの端にあるかを判定します。"""
+    match = re.match(r'^(max|min)_([xyz])$', value)
+    if not match:
+        raise ValueError(f"無効な位置指定: '{value}' (例: max_z, min_x)")
+    side, axis = match.groups()
+    lo, hi = getattr(entity_bbox.minPoint, axis), getattr(entity_bbox.maxPoint, axis)
+    if side == 'max':
+        return lo >= getattr(body_bbox.maxPoint, axis) - _SELECTOR_POSITION_TOLERANCE
+    return hi <= getattr(body_bbox.minPoint, axis) + _SELECTOR_POSITION_TOLERANCE
+
+def _outward_normal(face):
+    """平面の外向き法線を返します (平面以外は None)。"""
+    if face.geometry.objectType != adsk.core.Plane.classType():
+        return None
+    ok, normal = face.evaluator.getNormalAtPoint(face.pointOnFace)
+    if not ok:
+        normal = face.geometry.normal
+    return (normal.x, normal.y, normal.z)
+
+def _normal_matches(normal, value: str) -> bool:
+    if normal is None:
+        return False
+    axis, sign = _selector_axis(value)
+    dot = sum(n * a for n, a in zip(normal, axis))
+    if value[0] in '+-':
+        return dot * sign >= 1 - _SELECTOR_ANGLE_TOLERANCE
+    return abs(dot) >= 1 - _SELECTOR_ANGLE_TOLERANCE
+
+_EDGE_CURVE_TYPES = {
+    'line': 'Line3DCurveType', 'circle': 'Circle3DCurveType', 'arc': 'Arc3DCurveType',
+    'ellipse': 'Ellipse3DCurveType', 'spline': 'NurbsCurve3DCurveType',
+}
+
+def _edge_matches(edge, clauses, body_bbox, scale: float) -> bool:
+    geom = edge.geometry
+    for key, op, value in clauses:
+        if key == 'type':
+            curve_type = getattr(adsk.core.Curve3DTypes, _EDGE_CURVE_TYPES.get(value, ''), None)
+            if curve_type is None:
+                raise ValueError(f"無効なエッジタイプ: '{value}' (使用可能: {', '.join(_EDGE_CURVE_TYPES)})")
+            matched = geom is not None and geom.curveType == curve_type
+        elif key in ('parallel', 'perpendicular'):
+            axis, _ = _selector_axis(value)
+            if geom is None or geom.curveType != adsk.core.Curve3DTypes.Line3DCurveType:
+                matched = False
+            else:
+                direction = geom.startPoint.vectorTo(geom.endPoint)
+                direction.normalize()
+                dot = abs(direction.x * axis[0] + direction.y * axis[1] + direction.z * axis[2])
+                matched = dot >= 1 - _SELECTOR_ANGLE_TOLERANCE if key == 'parallel' else dot <= _SELECTOR_ANGLE_TOLERANCE
+        elif key == 'at':
+            matched = _selector_at(edge.boundingBox, body_bbox, value)
+        elif key == 'length':
+            matched = _selector_compare(edge.length / scale, op, value)
+        elif key == 'radius':
+            matched = _selector_compare(geom.radius / scale if geom is not None and hasattr(geom, 'radius') else None, op, value)
+        else:  # face_normal
+            matched = any(_normal_matches(_outward_normal(face), value) for face in edge.faces)
+        if op == '!=' and key not in _SELECTOR_NUMERIC_KEYS:
+            matched = not matched
+        if not matched:
+            return False
+    return True
+
+_FACE_SURFACE_TYPES = {'planar': 'Plane', 'cylindrical': 'Cylinder', 'spherical': 'Sphere', 'conical': 'Cone', 'toroidal': 'Torus'}
+
+def _face_matches(face, clauses, body_bbox, scale: float) -> bool:
+    geom = face.geometry
+    for key, op, value in clauses:
+        if key == 'type':
+            surface_class = getattr(adsk.core, _FACE_SURFACE_TYPES.get(value, ''), None)
+            if surface_class is None:
+                raise ValueError(f"無効な面タイプ: '{value}' (使用可能: {', '.join(_FACE_SURFACE_TYPES)})")
+            matched = geom.objectType == surface_class.classType()
+        elif key == 'normal':
+            matched = _normal_matches(_outward_normal(face), value)
+        elif key == 'at':
+            matched = _selector_at(face.boundingBox, body_bbox, value)
+        elif key == 'area':
+            matched = _selector_compare(face.area * 100, op, value)  # cm² to mm²
+        else:  # radius
+            matched = _selector_compare(geom.radius / scale if hasattr(geom, 'radius') else None, op, value)
+        if op == '!=' and key not in _SELECTOR_NUMERIC_KEYS:
+            matched = not matched
+        if not matched:
+            return False
+    return True
+
+def evaluate_edge_selector(body, selector: str) -> list:
+    """セレクターに一致するエッジのインデックスのリストを返します。"""
+    alternatives = parse_selector(selector, _EDGE_SELECTOR_KEYS)
+    body_bbox = body.boundingBox
+    scale = get_fusion_unit_scale()
+    return [i for i, edge in enumerate(body.edges)
+            if any(_edge_matches(edge, clauses, body_bbox, scale) for clauses in alternatives)]
+
+def evaluate_face_selector(body, selector: str) -> list:
+    """セレクターに一致する面のインデックスのリストを返します。"""
+    alternatives = parse_selector(selector, _FACE_SELECTOR_KEYS)
+    body_bbox = body.boundingBox
+    scale = get_fusion_unit_scale()
+    return [i for i, face in enumerate(body.faces)
+            if any(_face_matches(face, clauses, body_bbox, scale) for clauses in alternatives)]
+
+def select_edges(body_name: str, selector: str, **kwargs):
+    """
+    セレクターに一致するエッジのインデックスを返します (add_fillet などの edge_indices に使えます)。
+    """
+    body = find_entity_by_name(body_name)
+    if not body:
+        raise ValueError(f"ボディ '{body_name}' が見つかりません。")
+    indices = evaluate_edge_selector(body, selector)
+    log_debug(f"Selector '{selector}' matched {len(indices)} edges on '{body_name}'")
+    edges = list(body.edges)
+    return {"indices": indices, "tokens": [edges[i].entityToken for i in indices], "count": len(indices), "total": len(edges)}
+
+def select_faces(body_name: str, selector: str, **kwargs):
+    """
+    セレクターに一致する面のインデックスを返します。
+    """
+    body = find_entity_by_name(body_name)
+    if not body:
         raise ValueError(f"ボディ '{body_name}' が見つかりません。")
+    indices = evaluate_face_selector(body, selector)
+    log_debug(f"Selector '{selector}' matched {len(indices)} faces on '{body_name}'")
+    faces = list(body.faces)
+    return {"indices": indices, "tokens": [faces[i].entityToken for i in indices], "count": len(indices), "total": len(faces)}
 
+def resolve_target_edges(target_body, edge_indices: list=None, edge_selector: str=None, edge_tokens: list=None):
+    """
+    edge_indices / edge_selector / edge_tokens から対象エッジの ObjectCollection を作ります。
+    いずれも指定されない場合は全ての外周エッジを対象にします。
+    """
     all_edges = target_body.edges
-    edges_to_fillet = adsk.core.ObjectCollection.create()
+    target_edges = adsk.core.ObjectCollection.create()
+    indices = []
 
     if edge_indices and isinstance(edge_indices, list) and len(edge_indices) > 0:
         # 特定のエッジインデックスが指定された場合
-        log_debug(f"Applying fillet to specified edge indices: {edge_indices}")
+        log_debug("Using specified edge indices: %s", edge_indices)
         for index in edge_indices:
             try:
                 # 入力が数値であることを確認
                 idx = int(index)
                 if 0 <= idx < all_edges.count:
-                    edges_to_fillet.add(all_edges.item(idx))
+                    indices.append(idx)
                 else:
-                    log_debug(f"警告: 無効なエッジインデックス {idx} は無視されます。")
+                    log_warning(f"警告: 無効なエッジインデックス {idx} は無視されます。")
             except (ValueError, TypeError):
-                log_debug(f"警告: 数値でないエッジインデックス '{index}' は無視されます。")
-    else:
+                log_warning(f"警告: 数値でないエッジインデックス '{index}' は無視されます。")
+    if edge_selector:
+        selected = evaluate_edge_selector(target_body, edge_selector)
+        log_debug(f"Edge selector '{edge_selector}' matched {len(selected)} edges")
+        indices.extend(selected)
+
+    if indices:
+        edges = list(all_edges)
+        for idx in sorted(set(indices)):
+            target_edges.add(edges[idx])
+    for token in edge_tokens or []:
+        edge = resolve_entity_token(token)
+        if edge is None or edge.objectType != adsk.fusion.BRepEdge.classType() or edge.body != target_body:
+            log_warning(f"警告: ボディ '{target_body.name}' のエッジとして解決できないトークン '{token}' は無視されます。")
+        elif not target_edges.contains(edge):
+            target_edges.add(edge)
+    if not edge_indices and not edge_selector and not edge_tokens:
         # インデックスが指定されない場合は全ての外周エッジを対象にする
         log_debug("エッジが指定されなかったため、全ての外周エッジを対象にします。")
         for edge in all_edges:
             # 2つの面に接しているエッジを外周エッジとみなす
             if len(edge.faces) == 2:
-                edges_to_fillet.add(edge)
+                target_edges.add(edge)
+    return target_edges
+
+def add_fillet(body_name: str, radius: float=1.0, edge_indices: list=None, edge_selector: str=None, edge_tokens: list=None, **kwargs):
+    """
+    指定されたボディの特定のエッジにフィレットを追加します。
+    UIの選択状態に依存せず、引数で直接指定する堅牢な実装です。
+    edge_selector でセレクター (例: "parallel=z")、edge_tokens でエンティティトークンによるエッジ指定もできます。
+    """
+    target_body = find_entity_by_name(body_name)
+    if not target_body:
+        raise ValueError(f"ボディ '{body_name}' が見つかりません。")
+
+    edges_to_fillet = resolve_target_edges(target_body, edge_indices, edge_selector, edge_tokens)
     
     if edges_to_fillet.count == 0:
         return "フィレット対象のエッジが見つかりません。"
@@ -791,42 +2455,22 @@ def add_fillet(body_name: str, radius: float=1.0, edge_indices: list=None, **kwa
     fillets = root.features.filletFeatures
     fillet_input = fillets.createInput()
     fillet_input.addConstantRadiusEdgeSet(edges_to_fillet, adsk.core.ValueInput.createByReal(radius * get_fusion_unit_scale()), True)
-    fillets.add(fillet_input)
+    with trace_span('fillet.add'):
+        fillets.add(fillet_input)
     
     return f"{edges_to_fillet.count}個のエッジに半径{radius}mmのフィレットを追加しました。"
 
-def add_chamfer(body_name: str, distance: float=1.0, edge_indices: list=None, **kwargs):
+def add_chamfer(body_name: str, distance: float=1.0, edge_indices: list=None, edge_selector: str=None, edge_tokens: list=None, **kwargs):
     """
     指定されたボディの特定のエッジに面取りを追加します。
     UIの選択状態に依存せず、引数で直接指定する堅牢な実装です。
+    edge_selector でセレクター (例: "face_normal=+z")、edge_tokens でエンティティトークンによるエッジ指定もできます。
     """
     target_body = find_entity_by_name(body_name)
     if not target_body:
         raise ValueError(f"ボディ '{body_name}' が見つかりません。")
 
-    all_edges = target_body.edges
-    edges_to_chamfer = adsk.core.ObjectCollection.create()
-
-    if edge_indices and isinstance(edge_indices, list) and len(edge_indices) > 0:
-        # 特定のエッジインデックスが指定された場合
-        log_debug(f"Applying chamfer to specified edge indices: {edge_indices}")
-        for index in edge_indices:
-            try:
-                # 入力が数値であることを確認
-                idx = int(index)
-                if 0 <= idx < all_edges.count:
-                    edges_to_chamfer.add(all_edges.item(idx))
-                else:
-                    log_debug(f"警告: 無効なエッジインデックス {idx} は無視されます。")
-            except (ValueError, TypeError):
-                log_debug(f"警告: 数値でないエッジインデックス '{index}' は無視されます。")
-    else:
-        # インデックスが指定されない場合は全ての外周エッジを対象にする
-        log_debug("エッジが指定されなかったため、全ての外周エッジを対象にします。")
-        for edge in all_edges:
-            # 2つの面に接しているエッジを外周エッジとみなす
-            if len(edge.faces) == 2:
-                edges_to_chamfer.add(edge)
+    edges_to_chamfer = resolve_target_edges(target_body, edge_indices, edge_selector, edge_tokens)
 
     if edges_to_chamfer.count == 0:
         return "面取り対象のエッジが見つかりません。"
@@ -835,7 +2479,8 @@ def add_chamfer(body_name: str, distance: float=1.0, edge_indices: list=None, **
     chamfers = root.features.chamferFeatures
     chamfer_input = chamfers.createInput(edges_to_chamfer, True)
     chamfer_input.setToEqualDistance(adsk.core.ValueInput.createByReal(distance * get_fusion_unit_scale()))
-    chamfers.add(chamfer_input)
+    with trace_span('chamfer.add'):
+        chamfers.add(chamfer_input)
 
     return f"{edges_to_chamfer.count}個のエッジに{distance}mmの面取りを追加しました。"
     
@@ -851,9 +2496,11 @@ def combine_selection(operation: str, new_body_name: str=None, **kwargs):
     combine_input = combine_features.createInput(target_body, tool_bodies)
     op_map = {'join': adsk.fusion.FeatureOperations.JoinFeatureOperation, 'cut': adsk.fusion.FeatureOperations.CutFeatureOperation, 'intersect': adsk.fusion.FeatureOperations.IntersectFeatureOperation}
     combine_input.operation = op_map.get(operation.lower())
-    result_feature = combine_features.add(combine_input)
+    with trace_span('combine.add'):
+        result_feature = combine_features.add(combine_input)
     if new_body_name and result_feature.bodies.count > 0:
         result_feature.bodies.item(0).name = get_unique_body_name(root, new_body_name)
+        register_entity(result_feature.bodies.item(0))
         return result_feature.bodies.item(0).name
     return f"選択したボディを{operation}操作で結合しました。"
 
@@ -877,9 +2524,11 @@ def combine_by_name(target_body: str, tool_body: str, operation: str, new_body_n
     combine_input = combine_features.createInput(target, adsk.core.ObjectCollection.createWithArray([tool]))
     op_map = {'join': adsk.fusion.FeatureOperations.JoinFeatureOperation, 'cut': adsk.fusion.FeatureOperations.CutFeatureOperation, 'intersect': adsk.fusion.FeatureOperations.IntersectFeatureOperation}
     combine_input.operation = op_map.get(operation.lower())
-    result_feature = combine_features.add(combine_input)
+    with trace_span('combine.add'):
+        result_feature = combine_features.add(combine_input)
     if new_body_name and result_feature.bodies.count > 0:
         result_feature.bodies.item(0).name = get_unique_body_name(root, new_body_name)
+        register_entity(result_feature.bodies.item(0))
         return result_feature.bodies.item(0).name
     return f"ボディを{operation}操作で結合しました。"
 
@@ -902,9 +2551,11 @@ def move_by_name(body_name: str, x_dist: float=0, y_dist: float=0, z_dist: float
     transform = adsk.core.Matrix3D.create()
     transform.translation = vector
     root = _app.activeProduct.rootComponent
+    mark_entity_moved(target_entity)
     move_features = root.features.moveFeatures
     move_input = move_features.createInput(adsk.core.ObjectCollection.createWithArray([target_entity]), transform)
-    move_features.add(move_input)
+    with trace_span('move.add'):
+        move_features.add(move_input)
     return f"'{body_name}' を移動しました。"
 
 def rotate_by_name(body_name: str, axis: str='z', angle: float=90.0, cx: float=0, cy: float=0, cz: float=0, **kwargs):
@@ -917,9 +2568,11 @@ def rotate_by_name(body_name: str, axis: str='z', angle: float=90.0, cx: float=0
     transform = adsk.core.Matrix3D.create()
     transform.setToRotation(math.radians(angle), axis_vector, center_point)
     root = _app.activeProduct.rootComponent
+    mark_entity_moved(target_entity)
     move_features = root.features.moveFeatures
     move_input = move_features.createInput(adsk.core.ObjectCollection.createWithArray([target_entity]), transform)
-    move_features.add(move_input)
+    with trace_span('move.add'):
+        move_features.add(move_input)
     return f"'{body_name}' を回転しました。"
 
 def select_body(body_name: str, **kwargs):
@@ -1067,10 +2720,10 @@ def get_bounding_box(body_name: str, **kwargs):
         }
     }
     
-    log_debug(f"Bounding box for '{body_name}': {result}")
+    log_debug("Bounding box for '%s': %s", body_name, result)
     return result
 
-def get_body_center(body_name: str, **kwargs):
+def get_body_center(body_name: str, accuracy: str=None, **kwargs):
     """
     指定したボディの中心点情報を取得
     """
@@ -1079,7 +2732,7 @@ def get_body_center(body_name: str, **kwargs):
         raise ValueError(f"ボディ '{body_name}' が見つかりません。")
     
     bbox = body.boundingBox
-    mass_center = body.physicalProperties.centerOfMass
+    mass_center = get_physical_properties(body, accuracy).centerOfMass
     scale = get_fusion_unit_scale()
     
     result = {
@@ -1100,10 +2753,10 @@ def get_body_center(body_name: str, **kwargs):
         }
     }
     
-    log_debug(f"Centers for '{body_name}': {result}")
+    log_debug("Centers for '%s': %s", body_name, result)
     return result
 
-def get_body_dimensions(body_name: str, **kwargs):
+def get_body_dimensions(body_name: str, accuracy: str=None, **kwargs):
     """
     指定したボディの詳細寸法情報を取得
     """
@@ -1116,8 +2769,9 @@ def get_body_dimensions(body_name: str, **kwargs):
     
     # 物理プロパティから体積と表面積を取得
     try:
-        volume_cm3 = body.physicalProperties.volume
-        area_cm2 = body.physicalProperties.area
+        props = get_physical_properties(body, accuracy)
+        volume_cm3 = props.volume
+        area_cm2 = props.area
         volume_mm3 = volume_cm3 * 1000  # cm³ to mm³
         area_mm2 = area_cm2 * 100       # cm² to mm²
     except:
@@ -1132,172 +2786,165 @@ def get_body_dimensions(body_name: str, **kwargs):
         "surface_area": area_mm2
     }
     
-    log_debug(f"Dimensions for '{body_name}': {result}")
+    log_debug("Dimensions for '%s': %s", body_name, result)
     return result
 
-def get_faces_info(body_name: str, **kwargs):
+def _vector(v, factor: float=1.0):
+    return [v.x * factor, v.y * factor, v.z * factor]
+
+def describe_face(face, scale: float) -> dict:
+    """面1つの情報を辞書で返します (ベクトル値は [x, y, z] のリスト)。"""
+    face_data = {"token": face.entityToken, "area": face.area * 100}  # cm² to mm²
+    
+    # 面のタイプを判定
+    geom = face.geometry
+    if geom.objectType == adsk.core.Plane.classType():
+        face_data["type"] = "planar"
+        face_data["normal"] = _vector(geom.normal)
+        face_data["center"] = _vector(geom.origin, 1 / scale)
+    elif geom.objectType == adsk.core.Cylinder.classType():
+        face_data["type"] = "cylindrical"
+        face_data["radius"] = geom.radius / scale
+        face_data["axis"] = _vector(geom.axis)
+    elif geom.objectType == adsk.core.Sphere.classType():
+        face_data["type"] = "spherical"
+        face_data["radius"] = geom.radius / scale
+        face_data["center"] = _vector(geom.origin, 1 / scale)
+    elif geom.objectType == adsk.core.Cone.classType():
+        face_data["type"] = "conical"
+        face_data["radius"] = geom.radius / scale
+        face_data["half_angle"] = math.degrees(geom.halfAngle)
+    else:
+        face_data["type"] = "other"
+    return face_data
+
+def describe_edge(edge, scale: float) -> dict:
+    """エッジ1つの情報を辞書で返します (ベクトル値は [x, y, z] のリスト)。"""
+    edge_data = {"token": edge.entityToken, "length": edge.length / scale}
+    
+    # エッジのタイプを判定
+    geom = edge.geometry
+    
+    if not geom:
+        edge_data["type"] = "unknown_geometry"
+    elif geom.curveType == adsk.core.Curve3DTypes.Line3DCurveType:
+        edge_data["type"] = "line"
+        edge_data["start_point"] = _vector(geom.startPoint, 1 / scale)
+        edge_data["end_point"] = _vector(geom.endPoint, 1 / scale)
+        direction = geom.startPoint.vectorTo(geom.endPoint)
+        direction.normalize()
+        edge_data["direction"] = _vector(direction)
+    elif geom.curveType == adsk.core.Curve3DTypes.Circle3DCurveType:
+        edge_data["type"] = "circle"
+        edge_data["radius"] = geom.radius / scale
+        edge_data["center"] = _vector(geom.center, 1 / scale)
+        edge_data["normal"] = _vector(geom.normal)
+    elif geom.curveType == adsk.core.Curve3DTypes.Arc3DCurveType:
+        edge_data["type"] = "arc"
+        edge_data["radius"] = geom.radius / scale
+        edge_data["center"] = _vector(geom.center, 1 / scale)
+        edge_data["start_angle"] = math.degrees(geom.startAngle)
+        edge_data["end_angle"] = math.degrees(geom.endAngle)
+    else:
+        edge_data["type"] = "spline"
+    return edge_data
+
+def collect_topology_info(kind: str, items, describe, format: str='rows', offset: int=0, limit: int=None, fields: list=None):
+    """
+    面/エッジのコレクションを describe で記述し、指定された形式で返します。
+    format='rows' (既定): 要素ごとの辞書のリスト。ベクトル値は {"x", "y", "z"} の辞書。
+                          offset / limit を指定した場合は total などを含む辞書で包みます。
+    format='columnar': タイプごとにグループ化した列指向の配列 (ベクトル値は [x, y, z])。
+                       index 列は add_fillet などの edge_indices にそのまま使えます。
+    fields: 返すフィールドの絞り込み (id / index / type は常に含まれます)。
+    token は形状の変更後も同じ要素を指すエンティティトークンで、add_fillet などの edge_tokens に使えます。
+    """
+    if format not in ('rows', 'columnar'):
+        raise ValueError(f"無効な形式: {format} ('rows' または 'columnar' を指定してください)")
+    scale = get_fusion_unit_scale()
+    total = items.count
+    start = max(0, offset)
+    end = total if limit is None else min(total, start + max(0, limit))
+    wanted = set(fields) if fields else None
+
+    records = []
+    for i in range(start, end):
+        try:
+            record = describe(items.item(i), scale)
+        except Exception as e:
+            log_warning(f"Error processing {kind} {i}: {e}")
+            record = {"type": "error", "error": str(e)}
+        if wanted is not None:
+            record = {key: value for key, value in record.items() if key == 'type' or key in wanted}
+        records.append((i, record))
+
+    page = {"total": total, "offset": start, "count": len(records), "has_more": end < total}
+    if format == 'columnar':
+        groups = {}
+        for i, record in records:
+            group = groups.setdefault(record['type'], {'index': []})
+            position = len(group['index'])
+            group['index'].append(i)
+            for key, value in record.items():
+                if key == 'type':
+                    continue
+                # グループ内で途中から現れたフィールドは None で埋める
+                group.setdefault(key, [None] * position).append(value)
+            for column in group.values():
+                if len(column) == position:
+                    column.append(None)
+        page["groups"] = groups
+        return page
+
+    rows = []
+    for i, record in records:
+        row = {"id": f"{kind}_{i+1}"}
+        for key, value in record.items():
+            row[key] = {"x": value[0], "y": value[1], "z": value[2]} if isinstance(value, list) else value
+        rows.append(row)
+    if offset == 0 and limit is None:
+        return rows
+    page["items"] = rows
+    return page
+
+def get_faces_info(body_name: str, format: str='rows', offset: int=0, limit: int=None, fields: list=None, **kwargs):
     """
     指定したボディの面情報を取得
+    format='columnar' で面タイプごとの列指向形式、offset / limit でページング、fields でフィールドを絞り込みます。
     """
     body = find_entity_by_name(body_name)
     if not body:
         raise ValueError(f"ボディ '{body_name}' が見つかりません。")
     
-    scale = get_fusion_unit_scale()
-    faces_info = []
-    
-    for i, face in enumerate(body.faces):
-        try:
-            face_data = {
-                "id": f"face_{i+1}",
-                "area": face.area * 100,  # cm² to mm²
-            }
-            
-            # 面のタイプを判定
-            geom = face.geometry
-            if geom.objectType == adsk.core.Plane.classType():
-                face_data["type"] = "planar"
-                face_data["normal"] = {
-                    "x": geom.normal.x,
-                    "y": geom.normal.y,
-                    "z": geom.normal.z
-                }
-                face_data["center"] = {
-                    "x": geom.origin.x / scale,
-                    "y": geom.origin.y / scale,
-                    "z": geom.origin.z / scale
-                }
-            elif geom.objectType == adsk.core.Cylinder.classType():
-                face_data["type"] = "cylindrical"
-                face_data["radius"] = geom.radius / scale
-                face_data["axis"] = {
-                    "x": geom.axis.x,
-                    "y": geom.axis.y,
-                    "z": geom.axis.z
-                }
-            elif geom.objectType == adsk.core.Sphere.classType():
-                face_data["type"] = "spherical"
-                face_data["radius"] = geom.radius / scale
-                face_data["center"] = {
-                    "x": geom.origin.x / scale,
-                    "y": geom.origin.y / scale,
-                    "z": geom.origin.z / scale
-                }
-            elif geom.objectType == adsk.core.Cone.classType():
-                face_data["type"] = "conical"
-                face_data["radius"] = geom.radius / scale
-                face_data["half_angle"] = math.degrees(geom.halfAngle)
-            else:
-                face_data["type"] = "other"
-            
-            faces_info.append(face_data)
-            
-        except Exception as e:
-            log_debug(f"Error processing face {i}: {e}")
-            faces_info.append({
-                "id": f"face_{i+1}",
-                "type": "error",
-                "error": str(e)
-            })
-    
-    log_debug(f"Found {len(faces_info)} faces for '{body_name}'")
+    faces_info = collect_topology_info('face', body.faces, describe_face, format, offset, limit, fields)
+    log_debug(f"Found {body.faces.count} faces for '{body_name}'")
     return faces_info
 
-def get_edges_info(body_name: str, **kwargs):
+def get_edges_info(body_name: str, format: str='rows', offset: int=0, limit: int=None, fields: list=None, **kwargs):
     """
     指定したボディのエッジ情報を取得
+    format='columnar' でカーブタイプごとの列指向形式、offset / limit でページング、fields でフィールドを絞り込みます。
     """
     body = find_entity_by_name(body_name)
     if not body:
         raise ValueError(f"ボディ '{body_name}' が見つかりません。")
     
-    scale = get_fusion_unit_scale()
-    edges_info = []
-    
-    for i, edge in enumerate(body.edges):
-        try:
-            edge_data = {
-                "id": f"edge_{i+1}",
-                "length": edge.length / scale
-            }
-            
-            # エッジのタイプを判定
-            geom = edge.geometry
-            
-            if not geom:
-                edge_data["type"] = "unknown_geometry"
-                edges_info.append(edge_data)
-                continue # 次のエッジの処理に進む
-            
-            if geom.curveType == adsk.core.Curve3DTypes.Line3DCurveType:
-                edge_data["type"] = "line"
-                edge_data["start_point"] = {
-                    "x": geom.startPoint.x / scale,
-                    "y": geom.startPoint.y / scale,
-                    "z": geom.startPoint.z / scale
-                }
-                edge_data["end_point"] = {
-                    "x": geom.endPoint.x / scale,
-                    "y": geom.endPoint.y / scale,
-                    "z": geom.endPoint.z / scale
-                }
-                direction = geom.startPoint.vectorTo(geom.endPoint)
-                direction.normalize()
-                edge_data["direction"] = {
-                    "x": direction.x,
-                    "y": direction.y,
-                    "z": direction.z
-                }
-            elif geom.curveType == adsk.core.Curve3DTypes.Circle3DCurveType:
-                edge_data["type"] = "circle"
-                edge_data["radius"] = geom.radius / scale
-                edge_data["center"] = {
-                    "x": geom.center.x / scale,
-                    "y": geom.center.y / scale,
-                    "z": geom.center.z / scale
-                }
-                edge_data["normal"] = {
-                    "x": geom.normal.x,
-                    "y": geom.normal.y,
-                    "z": geom.normal.z
-                }
-            elif geom.curveType == adsk.core.Curve3DTypes.Arc3DCurveType:
-                edge_data["type"] = "arc"
-                edge_data["radius"] = geom.radius / scale
-                edge_data["center"] = {
-                    "x": geom.center.x / scale,
-                    "y": geom.center.y / scale,
-                    "z": geom.center.z / scale
-                }
-                edge_data["start_angle"] = math.degrees(geom.startAngle)
-                edge_data["end_angle"] = math.degrees(geom.endAngle)
-            else:
-                edge_data["type"] = "spline"
-            
-            edges_info.append(edge_data)
-            
-        except Exception as e:
-            log_debug(f"Error processing edge {i}: {e}")
-            edges_info.append({
-                "id": f"edge_{i+1}",
-                "type": "error",
-                "error": str(e)
-            })
-    
-    log_debug(f"Found {len(edges_info)} edges for '{body_name}'")
+    edges_info = collect_topology_info('edge', body.edges, describe_edge, format, offset, limit, fields)
+    log_debug(f"Found {body.edges.count} edges for '{body_name}'")
     return edges_info
 
-def get_mass_properties(body_name: str, material_density: float = 1.0, **kwargs):
+def get_mass_properties(body_name: str, material_density: float = 1.0, accuracy: str=None, **kwargs):
     """
     指定したボディの質量特性を取得
     material_density: 材料密度 (g/cm³)
+    accuracy: 計算精度 ('low' / 'medium' / 'high' / 'very_high')
     """
     body = find_entity_by_name(body_name)
     if not body:
         raise ValueError(f"ボディ '{body_name}' が見つかりません。")
     
     scale = get_fusion_unit_scale()
-    props = body.physicalProperties
+    props = get_physical_properties(body, accuracy)
     
     # 体積をcm³からmm³に変換
     volume_mm3 = props.volume * 1000
@@ -1324,9 +2971,11 @@ def get_mass_properties(body_name: str, material_density: float = 1.0, **kwargs)
     log_debug(f"Mass properties for '{body_name}': volume={volume_mm3:.2f}mm³, mass={mass_g:.2f}g")
     return result
 
-def get_body_relationships(body_name: str, other_body_name: str, **kwargs):
+def get_body_relationships(body_name: str, other_body_name: str, accuracy: str=None, clearance: float=None, **kwargs):
     """
     2つのボディ間の位置関係を取得
+    バウンディングボックスが離れている組は、その距離が clearance (mm) 以下の場合のみ正確な最短距離を計測します
+    (省略時はバウンディングボックスの距離を返し、clearance_is_lower_bound が True になります)。
     """
     body1 = find_entity_by_name(body_name)
     body2 = find_entity_by_name(other_body_name)
@@ -1339,20 +2988,18 @@ def get_body_relationships(body_name: str, other_body_name: str, **kwargs):
     scale = get_fusion_unit_scale()
     
     # 重心間の距離を計算
-    center1 = body1.physicalProperties.centerOfMass
-    center2 = body2.physicalProperties.centerOfMass
+    center1 = get_physical_properties(body1, accuracy).centerOfMass
+    center2 = get_physical_properties(body2, accuracy).centerOfMass
     distance = center1.distanceTo(center2) / scale
     
     # バウンディングボックス情報
     bbox1 = body1.boundingBox
     bbox2 = body2.boundingBox
     
-    # 簡易的な干渉チェック（バウンディングボックスベース）
-    interference = (
-        bbox1.minPoint.x <= bbox2.maxPoint.x and bbox1.maxPoint.x >= bbox2.minPoint.x and
-        bbox1.minPoint.y <= bbox2.maxPoint.y and bbox1.maxPoint.y >= bbox2.minPoint.y and
-        bbox1.minPoint.z <= bbox2.maxPoint.z and bbox1.maxPoint.z >= bbox2.minPoint.z
-    )
+    # 干渉チェック (広域判定で決まらなければ最短距離計測・ブーリアン演算で判定)
+    clearance_cm = max(0.0, clearance) * scale if clearance is not None else None
+    proximity = compute_body_proximity(body1, body2, clearance_cm, exact_distance=clearance is not None)
+    interference = proximity['interference']
     
     # 相対位置の判定
     relative_position = "unknown"
@@ -1374,14 +3021,17 @@ def get_body_relationships(body_name: str, other_body_name: str, **kwargs):
     result = {
         "distance": distance,
         "interference": interference,
+        "interference_volume": proximity['interference_volume'] * 1000,  # cm³ to mm³
         "relative_position": relative_position,
-        "clearance": distance if not interference else 0
+        "clearance": proximity['distance'] / scale,
+        "clearance_is_lower_bound": proximity['distance_is_lower_bound'],
+        "decided_by": proximity['decided_by']
     }
     
-    log_debug(f"Relationship between '{body_name}' and '{other_body_name}': {result}")
+    log_debug("Relationship between '%s' and '%s': %s", body_name, other_body_name, result)
     return result
 
-def measure_distance(body_name1: str, body_name2: str, **kwargs):
+def measure_distance(body_name1: str, body_name2: str, accuracy: str=None, **kwargs):
     """
     2つのボディ間の最短距離を測定
     """
@@ -1396,8 +3046,8 @@ def measure_distance(body_name1: str, body_name2: str, **kwargs):
     scale = get_fusion_unit_scale()
     
     # 重心間距離を計算
-    center1 = body1.physicalProperties.centerOfMass
-    center2 = body2.physicalProperties.centerOfMass
+    center1 = get_physical_properties(body1, accuracy).centerOfMass
+    center2 = get_physical_properties(body2, accuracy).centerOfMass
     center_distance = center1.distanceTo(center2) / scale
     
     # バウンディングボックス間の最短距離を計算
@@ -1411,15 +3061,673 @@ def measure_distance(body_name1: str, body_name2: str, **kwargs):
     
     bbox_distance = math.sqrt(dx*dx + dy*dy + dz*dz) / scale
     
+    # 実際の最短距離 (ボックスが重なっている場合や離れている場合もカーネルで計測)
+    proximity = compute_body_proximity(body1, body2)
+    
     result = {
         "center_to_center": center_distance,
         "bounding_box_clearance": bbox_distance,
-        "is_overlapping": bbox_distance == 0
+        "is_overlapping": bbox_distance == 0,
+        "minimum_distance": proximity['distance'] / scale,
+        "interference": proximity['interference'],
+        "interference_volume": proximity['interference_volume'] * 1000,  # cm³ to mm³
+        "decided_by": proximity['decided_by']
     }
+    if 'closest_points' in proximity:
+        result["closest_points"] = [[value / scale for value in point] for point in proximity['closest_points']]
     
-    log_debug(f"Distance between '{body_name1}' and '{body_name2}': {result}")
+    log_debug("Distance between '%s' and '%s': %s", body_name1, body_name2, result)
+    return result
+
+SCENE_SNAPSHOT_FIELDS = ('name', 'visible', 'bbox_min', 'bbox_max', 'size', 'volume', 'area', 'center')
+
+def get_scene_snapshot(fields: list=None, include_occurrences: bool=False, offset: int=0, limit: int=None, accuracy: str=None, **kwargs):
+    """
+    シーン内の全ボディ (必要に応じてオカレンスも) のメタデータを1回の呼び出しで取得します。
+    結果は columns と rows からなるコンパクトな表形式です (座標は [x, y, z] の配列、単位はmm)。
+    fields で列を絞り込み、offset / limit でページングできます。
+    volume / area / center は物理プロパティが必要なため、要求された場合のみ計算します。
+    """
+    fields = list(fields) if fields else list(SCENE_SNAPSHOT_FIELDS)
+    unknown = [field for field in fields if field not in SCENE_SNAPSHOT_FIELDS]
+    if unknown:
+        raise ValueError(f"無効なフィールド: {', '.join(unknown)} (使用可能: {', '.join(SCENE_SNAPSHOT_FIELDS)})")
+    root = _app.activeProduct.rootComponent
+    bodies = root.bRepBodies
+    occurrences = root.occurrences if include_occurrences else None
+    body_count = bodies.count
+    total = body_count + (occurrences.count if occurrences else 0)
+    start = max(0, offset)
+    end = total if limit is None else min(total, start + max(0, limit))
+
+    scale = get_fusion_unit_scale()
+    need_bbox = any(field in fields for field in ('bbox_min', 'bbox_max', 'size'))
+    need_props = any(field in fields for field in ('volume', 'area', 'center'))
+    columns = (['kind'] if include_occurrences else []) + fields
+    rows = []
+    for position in range(start, end):
+        if position < body_count:
+            entity, kind = bodies.item(position), 'body'
+        else:
+            entity, kind = occurrences.item(position - body_count), 'occurrence'
+        values = {}
+        if need_bbox:
+            bbox = entity.boundingBox
+            bbox_min = [bbox.minPoint.x / scale, bbox.minPoint.y / scale, bbox.minPoint.z / scale]
+            bbox_max = [bbox.maxPoint.x / scale, bbox.maxPoint.y / scale, bbox.maxPoint.z / scale]
+            values['bbox_min'] = bbox_min
+            values['bbox_max'] = bbox_max
+            values['size'] = [bbox_max[i] - bbox_min[i] for i in range(3)]
+        if need_props:
+            try:
+                props = get_physical_properties(entity, accuracy)
+                center = props.centerOfMass
+                values['volume'] = props.volume * 1000  # cm³ to mm³
+                values['area'] = props.area * 100       # cm² to mm²
+                values['center'] = [center.x / scale, center.y / scale, center.z / scale]
+            except:
+                values['volume'] = values['area'] = values['center'] = None
+        row = [kind] if include_occurrences else []
+        for field in fields:
+            if field == 'name':
+                row.append(entity.name)
+            elif field == 'visible':
+                row.append(entity.isVisible)
+            else:
+                row.append(values[field])
+        rows.append(row)
+
+    return {
+        "columns": columns,
+        "rows": rows,
+        "total": total,
+        "offset": start,
+        "count": len(rows),
+        "has_more": end < total
+    }
+
+# --- 一括クエリ (列指向) ---
+def resolve_batch_bodies(body_names: list=None, pattern: str=None):
+    """
+    ボディ名のリストまたはglobパターンから対象ボディを解決します。
+    戻り値は (名前のリスト, ボディのリスト, 見つからなかった名前のリスト) です。
+    """
+    if body_names is None and pattern is None:
+        raise ValueError("body_names または pattern のいずれかを指定してください。")
+    names, bodies, missing = [], [], []
+    if body_names is not None:
+        for name in body_names:
+            body = find_entity_by_name(name)
+            if body is None:
+                missing.append(name)
+            else:
+                names.append(name)
+                bodies.append(body)
+    if pattern is not None:
+        selected = set(names)
+        for body in _app.activeProduct.rootComponent.bRepBodies:
+            if body.name not in selected and fnmatch.fnmatchcase(body.name, pattern):
+                names.append(body.name)
+                bodies.append(body)
+    return names, bodies, missing
+
+def _scale_columns(raw: dict, factor: float) -> dict:
+    """cm単位の列をまとめて単位変換します (列ごとに1回)。"""
+    return {key: [value * factor for value in values] for key, values in raw.items()}
+
+def get_bounding_box_batch(body_names: list=None, pattern: str=None, **kwargs):
+    """
+    複数ボディのバウンディングボックスを列指向の配列で取得します。
+    body_names (名前のリスト) または pattern (例: "peg_*") で対象を指定します。
+    """
+    names, bodies, missing = resolve_batch_bodies(body_names, pattern)
+    raw = {key: [] for key in ('min_x', 'min_y', 'min_z', 'max_x', 'max_y', 'max_z')}
+    for body in bodies:
+        bbox = body.boundingBox
+        raw['min_x'].append(bbox.minPoint.x)
+        raw['min_y'].append(bbox.minPoint.y)
+        raw['min_z'].append(bbox.minPoint.z)
+        raw['max_x'].append(bbox.maxPoint.x)
+        raw['max_y'].append(bbox.maxPoint.y)
+        raw['max_z'].append(bbox.maxPoint.z)
+    result = _scale_columns(raw, 1 / get_fusion_unit_scale())
+    result['width'] = [hi - lo for lo, hi in zip(result['min_x'], result['max_x'])]
+    result['height'] = [hi - lo for lo, hi in zip(result['min_y'], result['max_y'])]
+    result['depth'] = [hi - lo for lo, hi in zip(result['min_z'], result['max_z'])]
+    result['names'] = names
+    result['missing'] = missing
+    return result
+
+def get_body_center_batch(body_names: list=None, pattern: str=None, accuracy: str=None, **kwargs):
+    """
+    複数ボディの幾何学的中心と重心を列指向の配列で取得します。
+    """
+    names, bodies, missing = resolve_batch_bodies(body_names, pattern)
+    raw = {key: [] for key in ('geometric_x', 'geometric_y', 'geometric_z', 'mass_x', 'mass_y', 'mass_z')}
+    for body in bodies:
+        bbox = body.boundingBox
+        mass_center = get_physical_properties(body, accuracy).centerOfMass
+        raw['geometric_x'].append((bbox.minPoint.x + bbox.maxPoint.x) / 2)
+        raw['geometric_y'].append((bbox.minPoint.y + bbox.maxPoint.y) / 2)
+        raw['geometric_z'].append((bbox.minPoint.z + bbox.maxPoint.z) / 2)
+        raw['mass_x'].append(mass_center.x)
+        raw['mass_y'].append(mass_center.y)
+        raw['mass_z'].append(mass_center.z)
+    result = _scale_columns(raw, 1 / get_fusion_unit_scale())
+    result['names'] = names
+    result['missing'] = missing
+    return result
+
+def get_body_dimensions_batch(body_names: list=None, pattern: str=None, accuracy: str=None, **kwargs):
+    """
+    複数ボディの寸法・体積・表面積を列指向の配列で取得します。
+    """
+    names, bodies, missing = resolve_batch_bodies(body_names, pattern)
+    raw = {key: [] for key in ('length', 'width', 'height')}
+    volume, surface_area = [], []
+    for body in bodies:
+        bbox = body.boundingBox
+        raw['length'].append(bbox.maxPoint.x - bbox.minPoint.x)
+        raw['width'].append(bbox.maxPoint.y - bbox.minPoint.y)
+        raw['height'].append(bbox.maxPoint.z - bbox.minPoint.z)
+        try:
+            props = get_physical_properties(body, accuracy)
+            volume.append(props.volume)
+            surface_area.append(props.area)
+        except:
+            volume.append(0)
+            surface_area.append(0)
+    result = _scale_columns(raw, 1 / get_fusion_unit_scale())
+    result['volume'] = [value * 1000 for value in volume]  # cm³ to mm³
+    result['surface_area'] = [value * 100 for value in surface_area]  # cm² to mm²
+    result['names'] = names
+    result['missing'] = missing
+    return result
+
+def get_mass_properties_batch(body_names: list=None, pattern: str=None, material_density: float=1.0, accuracy: str=None, **kwargs):
+    """
+    複数ボディの質量特性を列指向の配列で取得します。
+    material_density: 材料密度 (g/cm³)
+    """
+    names, bodies, missing = resolve_batch_bodies(body_names, pattern)
+    raw = {key: [] for key in ('center_x', 'center_y', 'center_z')}
+    volume, ixx, iyy, izz = [], [], [], []
+    for body in bodies:
+        props = get_physical_properties(body, accuracy)
+        volume.append(props.volume)
+        raw['center_x'].append(props.centerOfMass.x)
+        raw['center_y'].append(props.centerOfMass.y)
+        raw['center_z'].append(props.centerOfMass.z)
+        ixx.append(props.principalMomentsOfInertia.x)
+        iyy.append(props.principalMomentsOfInertia.y)
+        izz.append(props.principalMomentsOfInertia.z)
+    result = _scale_columns(raw, 1 / get_fusion_unit_scale())
+    result['volume'] = [value * 1000 for value in volume]  # cm³ to mm³
+    result['mass'] = [value * material_density for value in volume]  # g/cm³ × cm³ = g
+    result['Ixx'], result['Iyy'], result['Izz'] = ixx, iyy, izz
+    result['material_density'] = material_density
+    result['names'] = names
+    result['missing'] = missing
+    return result
+
+# --- マクロ実行 ---
+def resolve_macro_references(value, step_results: dict):
+    """
+    引数中の '${ステップ}' / '${ステップ.キー}' を以前のステップの戻り値で置き換えます。
+    ステップはコマンドの 'id' または0始まりのインデックスで指定します。
+    文字列全体が参照の場合は戻り値の型をそのまま保ちます。
+    """
+    if isinstance(value, dict):
+        return {k: resolve_macro_references(v, step_results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_macro_references(v, step_results) for v in value]
+    if not isinstance(value, str) or '${' not in value:
+        return value
+
+    def lookup(expr):
+        ref, *path = expr.strip().split('.')
+        if ref not in step_results:
+            raise ValueError(f"マクロ参照 '{expr}' のステップが見つからないか、まだ成功していません。")
+        current = step_results[ref]
+        for key in path:
+            if isinstance(current, list):
+                current = current[int(key)]
+            elif isinstance(current, dict) and key in current:
+                current = current[key]
+            else:
+                raise ValueError(f"マクロ参照 '{expr}' のキー '{key}' が見つかりません。")
+        return current
+
+    whole = _MACRO_REF_PATTERN.fullmatch(value)
+    if whole:
+        return lookup(whole.group(1))
+    return _MACRO_REF_PATTERN.sub(lambda m: str(lookup(m.group(1))), value)
+
+def run_macro(commands: list, stop_on_error: bool=False):
+    """
+    複数のコマンドを順に実行し、ステップごとの結果 (ステータス、戻り値、所要時間) を返します。
+    stop_on_error が True の場合、最初に失敗したステップで中断します。
+    UI更新は全ステップ終了後に1回だけ行います。
+    """
+    global _ui_refresh_deferred
+    steps = []
+    step_results = {}
+    aborted = False
+    was_deferred = _ui_refresh_deferred
+    _ui_refresh_deferred = True
+    try:
+        for index, cmd_item in enumerate(commands):
+            tool_name = cmd_item.get('tool_name')
+            step_id = cmd_item.get('id')
+            started = time.time()
+            try:
+                arguments = resolve_macro_references(cmd_item.get('arguments', {}), step_results)
+                response = execute_command(tool_name, arguments)
+            except Exception as e:
+                response = {'status': 'error', 'message': f"Failed to execute '{tool_name}': {str(e)}"}
+            step = {'index': index, 'tool_name': tool_name, 'status': response['status'],
+                    'elapsed_ms': (time.time() - started) * 1000}
+            if step_id is not None:
+                step['id'] = step_id
+            if response['status'] == 'success':
+                step['result'] = response['result']
+                step_results[str(index)] = response['result']
+                if step_id is not None:
+                    step_results[str(step_id)] = response['result']
+            else:
+                step['message'] = response.get('message')
+            steps.append(step)
+            if response['status'] != 'success' and stop_on_error:
+                aborted = True
+                break
+    finally:
+        _ui_refresh_deferred = was_deferred
+        if not was_deferred:
+            with trace_span('doEvents'):
+                adsk.doEvents()
+            try:
+                _app.activeViewport.refresh()
+            except:
+                pass
+
+    failed = [step for step in steps if step['status'] != 'success']
+    result = {
+        'summary': f"Macro with {len(commands)} steps executed.",
+        'total': len(commands),
+        'executed': len(steps),
+        'succeeded': len(steps) - len(failed),
+        'failed': len(failed),
+        'aborted': aborted,
+        'steps': steps
+    }
+    if failed:
+        first = failed[0]
+        return {'status': 'error', 'message': f"Macro step {first['index']} ('{first['tool_name']}') failed: {first['message']}", 'result': result}
+    return {'status': 'success', 'result': result}
+
+# --- ファイル監視バックエンド ---
+class PollingWatcherBackend:
+    """一定間隔でスリープするだけのフォールバック実装 (従来の0.5秒ポーリング)。"""
+    name = 'poll'
+
+    def __init__(self, paths, interval: float=_WATCHER_POLL_INTERVAL):
+        self.interval = interval
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(min(timeout, self.interval))
+        return True
+
+    def close(self):
+        pass
+
+class InotifyWatcherBackend:
+    """Linux の inotify で監視ディレクトリの変更通知を待ちます。"""
+    name = 'inotify'
+    _IN_CLOSE_WRITE = 0x00000008
+    _IN_MOVED_TO = 0x00000080
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        # IN_MODIFY では書き込み途中で起きてしまうため、書き込みの完了 (close / rename) だけを待つ
+        mask = self._IN_CLOSE_WRITE | self._IN_MOVED_TO
+        for directory in {p if os.path.isdir(p) else os.path.dirname(p) for p in paths}:
+            if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+                err = ctypes.get_errno()
+                os.close(self._fd)
+                raise OSError(err, f'inotify_add_watch failed: {directory}')
+
+    def wait(self, timeout: float) -> bool:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self._fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+class KqueueWatcherBackend:
+    """macOS の kqueue (EVFILT_VNODE) でファイルとディレクトリの変更通知を待ちます。"""
+    name = 'kqueue'
+    _O_EVTONLY = 0x8000
+
+    def __init__(self, paths):
+        self._kq = select.kqueue()
+        self._paths = list(paths)
+        self._fds = {}
+        for path in self._paths:
+            self._open(path)
+
+    def _open(self, path):
+        if path in self._fds or not os.path.exists(path):
+            return
+        fd = os.open(path, self._O_EVTONLY if sys.platform == 'darwin' else os.O_RDONLY)
+        fflags = (select.KQ_NOTE_WRITE | select.KQ_NOTE_EXTEND | select.KQ_NOTE_ATTRIB |
+                  select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME)
+        event = select.kevent(fd, filter=select.KQ_FILTER_VNODE,
+                              flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR, fflags=fflags)
+        self._kq.control([event], 0, 0)
+        self._fds[path] = fd
+
+    def wait(self, timeout: float) -> bool:
+        # 置き換えられたファイルは新しい実体を開き直す
+        for path in self._paths:
+            self._open(path)
+        events = self._kq.control(None, 16, timeout)
+        for event in events:
+            if event.fflags & (select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME):
+                for path, fd in list(self._fds.items()):
+                    if fd == event.ident:
+                        os.close(fd)
+                        del self._fds[path]
+        return bool(events)
+
+    def close(self):
+        for fd in self._fds.values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._fds.clear()
+        self._kq.close()
+
+class Win32WatcherBackend:
+    """Windows の FindFirstChangeNotification でディレクトリの変更通知を待ちます。"""
+    name = 'win32'
+    _FILE_NOTIFY_CHANGE_FILE_NAME = 0x00000001
+    _FILE_NOTIFY_CHANGE_SIZE = 0x00000008
+    _FILE_NOTIFY_CHANGE_LAST_WRITE = 0x00000010
+    _WAIT_TIMEOUT = 0x00000102
+    _INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+
+    def __init__(self, paths):
+        from ctypes import wintypes
+        self._k32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self._k32.FindFirstChangeNotificationW.restype = wintypes.HANDLE
+        self._k32.FindFirstChangeNotificationW.argtypes = [wintypes.LPCWSTR, wintypes.BOOL, wintypes.DWORD]
+        self._k32.FindNextChangeNotification.argtypes = [wintypes.HANDLE]
+        self._k32.FindCloseChangeNotification.argtypes = [wintypes.HANDLE]
+        self._k32.WaitForMultipleObjects.argtypes = [wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE), wintypes.BOOL, wintypes.DWORD]
+        self._k32.WaitForMultipleObjects.restype = wintypes.DWORD
+        flags = self._FILE_NOTIFY_CHANGE_FILE_NAME | self._FILE_NOTIFY_CHANGE_SIZE | self._FILE_NOTIFY_CHANGE_LAST_WRITE
+        handles = []
+        for directory in {p if os.path.isdir(p) else os.path.dirname(p) for p in paths}:
+            handle = self._k32.FindFirstChangeNotificationW(directory, False, flags)
+            if not handle or handle == self._INVALID_HANDLE_VALUE:
+                for h in handles:
+                    self._k32.FindCloseChangeNotification(h)
+                raise ctypes.WinError(ctypes.get_last_error())
+            handles.append(handle)
+        self._handles = (wintypes.HANDLE * len(handles))(*handles)
+
+    def wait(self, timeout: float) -> bool:
+        result = self._k32.WaitForMultipleObjects(len(self._handles), self._handles, False, int(timeout * 1000))
+        if result == self._WAIT_TIMEOUT or result >= len(self._handles):
+            return False
+        self._k32.FindNextChangeNotification(self._handles[result])
+        return True
+
+    def close(self):
+        for handle in self._handles:
+            self._k32.FindCloseChangeNotification(handle)
+        self._handles = ()
+
+WATCHER_BACKENDS = {
+    'inotify': InotifyWatcherBackend,
+    'kqueue': KqueueWatcherBackend,
+    'win32': Win32WatcherBackend,
+    'poll': PollingWatcherBackend,
+}
+
+def create_watcher_backend(paths, preferred: str='auto'):
+    """
+    監視バックエンドを生成します。'auto' の場合はOSに応じた通知方式を選び、
+    利用できなければポーリングにフォールバックします。
+    """
+    if preferred == 'auto':
+        if sys.platform.startswith('linux'):
+            candidates = ['inotify']
+        elif sys.platform == 'darwin':
+            candidates = ['kqueue']
+        elif sys.platform == 'win32':
+            candidates = ['win32']
+        else:
+            candidates = []
+    else:
+        candidates = [preferred]
+    for name in candidates:
+        backend_cls = WATCHER_BACKENDS.get(name)
+        if not backend_cls:
+            log_warning(f"Unknown watcher backend '{name}', falling back to polling.")
+            continue
+        try:
+            return backend_cls(paths)
+        except Exception:
+            log_warning(f"Watcher backend '{name}' unavailable, falling back to polling: {traceback.format_exc()}")
+    return PollingWatcherBackend(paths)
+
+def _record_pickup_latency(seconds: float):
+    _pickup_latencies.append(max(0.0, seconds))
+
+def get_watcher_stats(**kwargs):
+    """
+    ファイル監視バックエンドと、コマンド書き込みから検知までの遅延 (ms) を返します。
+    """
+    samples = sorted(_pickup_latencies)
+    result = {"backend": _watcher_backend_in_use, "samples": len(samples)}
+    if samples:
+        def pct(p): return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+        result["pickup_latency_ms"] = {
+            "last": _pickup_latencies[-1] * 1000,
+            "min": samples[0] * 1000,
+            "mean": sum(samples) / len(samples) * 1000,
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "max": samples[-1] * 1000
+        }
+    return result
+
+# --- サーバー統計 ---
+def _stage_stats():
+    return {'samples': collections.deque(maxlen=_SERVER_STATS_SAMPLES),
+            'buckets': [0] * (len(_LATENCY_BUCKETS_MS) + 1), 'sum': 0.0, 'count': 0}
+
+def stats_command_label(command_name) -> str:
+    """
+    統計・メトリクスのラベルに使うコマンド名を返します。クライアントが送った任意の文字列で
+    系列が増え続けないよう、未知のコマンドは '<unknown>'、文字列でないものは '<invalid>' にまとめます。
+    """
+    if not isinstance(command_name, str):
+        return '<invalid>'
+    if command_name != 'execute_macro' and command_name not in COMMAND_MAP:
+        return '<unknown>'
+    return command_name
+
+def record_command_timing(command_name, status, timings: dict):
+    """
+    1リクエスト分の結果と段階別の所要時間 (ms) を集計に加えます。
+    直近のサンプルはパーセンタイル用に、累積ヒストグラムは Prometheus 出力用に保持します。
+    """
+    entry = _server_stats['commands'].get(command_name)
+    if entry is None:
+        entry = {'count': 0, 'errors': 0, 'stages': {}}
+        _server_stats['commands'][command_name] = entry
+    entry['count'] += 1
+    if status == 'error': entry['errors'] += 1
+    for stage, ms in timings.items():
+        if ms is None: continue
+        ms = max(0.0, ms)
+        stats = entry['stages'].get(stage)
+        if stats is None:
+            stats = entry['stages'][stage] = _stage_stats()
+        stats['samples'].append(ms)
+        stats['buckets'][next((i for i, bound in enumerate(_LATENCY_BUCKETS_MS) if ms <= bound), len(_LATENCY_BUCKETS_MS))] += 1
+        stats['sum'] += ms
+        stats['count'] += 1
+
+def summarize_latencies(samples):
+    samples = sorted(samples)
+    if not samples: return None
+    def pct(p): return samples[min(len(samples) - 1, int(p * len(samples)))]
+    return {"samples": len(samples), "mean": sum(samples) / len(samples),
+            "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": samples[-1]}
+
+def get_server_stats(command: str=None, reset: bool=False, **kwargs):
+    """
+    コマンドごとの実行件数・エラー数と、段階別 (pickup/queue/parse/execute/serialize)
+    レイテンシの p50/p95/p99 (ms) を返します。パーセンタイルは直近のサンプルから計算します。
+    """
+    commands = {}
+    for name, entry in sorted(_server_stats['commands'].items()):
+        if command and name != command: continue
+        latency = {}
+        for stage in _SERVER_STATS_STAGES:
+            stats = entry['stages'].get(stage)
+            if stats:
+                latency[stage] = summarize_latencies(stats['samples'])
+                latency[stage]["total"] = stats['count']
+        commands[name] = {"count": entry['count'], "errors": entry['errors'], "latency_ms": latency}
+    result = {
+        "uptime_s": time.time() - _server_stats['started_at'],
+        "total_requests": sum(e['count'] for e in _server_stats['commands'].values()),
+        "total_errors": sum(e['errors'] for e in _server_stats['commands'].values()),
+        "commands": commands,
+        "metrics_file": _metrics_file_path or None
+    }
+    if reset:
+        _server_stats['commands'].clear()
+        _server_stats['started_at'] = time.time()
     return result
 
+def _prometheus_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_prometheus_metrics():
+    """集計を Prometheus のテキスト形式 (exposition format 0.0.4) に整形します。"""
+    lines = [
+        "# HELP fusion_mcp_uptime_seconds Seconds since the statistics were started or reset.",
+        "# TYPE fusion_mcp_uptime_seconds gauge",
+        f"fusion_mcp_uptime_seconds {time.time() - _server_stats['started_at']:.3f}",
+        "# HELP fusion_mcp_requests_total Requests handled per command.",
+        "# TYPE fusion_mcp_requests_total counter"
+    ]
+    items = sorted(_server_stats['commands'].items())
+    for name, entry in items:
+        lines.append(f'fusion_mcp_requests_total{{command="{_prometheus_label(name)}"}} {entry["count"]}')
+    lines += ["# HELP fusion_mcp_request_errors_total Requests that returned an error per command.",
+              "# TYPE fusion_mcp_request_errors_total counter"]
+    for name, entry in items:
+        lines.append(f'fusion_mcp_request_errors_total{{command="{_prometheus_label(name)}"}} {entry["errors"]}')
+    lines += ["# HELP fusion_mcp_stage_latency_seconds Per-stage request latency.",
+              "# TYPE fusion_mcp_stage_latency_seconds histogram"]
+    for name, entry in items:
+        for stage in _SERVER_STATS_STAGES:
+            stats = entry['stages'].get(stage)
+            if not stats: continue
+            labels = f'command="{_prometheus_label(name)}",stage="{stage}"'
+            cumulative = 0
+            for bound, n in zip(_LATENCY_BUCKETS_MS, stats['buckets']):
+                cumulative += n
+                lines.append(f'fusion_mcp_stage_latency_seconds_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'fusion_mcp_stage_latency_seconds_bucket{{{labels},le="+Inf"}} {stats["count"]}')
+            lines.append(f'fusion_mcp_stage_latency_seconds_sum{{{labels}}} {stats["sum"] / 1000:.6f}')
+            lines.append(f'fusion_mcp_stage_latency_seconds_count{{{labels}}} {stats["count"]}')
+    return '\n'.join(lines) + '\n'
+
+def write_metrics_file(force: bool=False):
+    """
+    メトリクスファイルが設定されていれば、前回から一定間隔が経過したときだけ書き出します。
+    node_exporter の textfile collector 等が途中状態を読まないよう、一時ファイル経由で置き換えます。
+    """
+    global _metrics_last_written
+    if not _metrics_file_path: return False
+    now = time.time()
+    if not force and now - _metrics_last_written < _METRICS_WRITE_INTERVAL: return False
+    _metrics_last_written = now
+    temp_path = _metrics_file_path + '.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(format_prometheus_metrics())
+        os.replace(temp_path, _metrics_file_path)
+        return True
+    except Exception:
+        log_error(f"Failed to write metrics file: {traceback.format_exc()}")
+        return False
+
+# --- リクエストジャーナル ---
+
+def append_journal_entry(payload: str, request, response: dict, arrived_at: float, started_at: float):
+    """
+    1リクエスト分を NDJSON の1行としてジャーナルへ追記します。
+    request には受信経路固有のキー ('_' で始まるキーと correlation_id) を除いた本体を記録するため、
+    tools/benchmarks/replay_journal.py でそのまま再送できます。JSON として解析できなかった場合は raw に原文を残します。
+    arrived_at はファイル経由なら書き込み時刻、ソケット経由なら受信時刻 (UNIX 時間) です。
+    """
+    if _journal_state['file'] is None:
+        _journal_state['file'] = open(_journal_state['path'], 'a', encoding='utf-8')
+    transport = 'file'
+    if isinstance(request, dict):
+        transport = 'socket' if request.get('_reply_to') else 'spool' if request.get('_request_id') else 'file'
+    _journal_state['records'] += 1
+    entry = {'seq': _journal_state['records'], 'arrived_at': arrived_at, 'started_at': started_at,
+             'transport': transport, 'command': request.get('command') if isinstance(request, dict) else None,
+             'status': response.get('status'), 'queued_ms': response.get('queued_ms'),
+             'elapsed_ms': response.get('elapsed_ms'), 'response_ms': (time.time() - arrived_at) * 1000}
+    if isinstance(request, dict):
+        entry['request'] = {k: v for k, v in strip_internal_keys(request).items() if k != 'correlation_id'}
+    else:
+        entry['raw'] = payload
+    _journal_state['file'].write(json.dumps(entry, ensure_ascii=False) + '\n')
+    _journal_state['file'].flush()
+
+def close_journal():
+    if _journal_state['file'] is not None:
+        _journal_state['file'].close()
+        _journal_state['file'] = None
+
+def set_journal(enabled: bool=True, file_path: str=None, **kwargs):
+    """
+    リクエストジャーナルの記録を切り替えます。file_path を省略すると現在のファイル
+    (未設定なら ~/Documents/fusion_mcp_journal.ndjson) に追記します。
+    """
+    close_journal()
+    if enabled:
+        _journal_state['path'] = file_path or _journal_state['path'] or _journal_default_path
+    else:
+        _journal_state['path'] = ''
+    return {"enabled": bool(_journal_state['path']), "file_path": _journal_state['path'] or None,
+            "records": _journal_state['records']}
+
 # --- ディスパッチャー ---
 COMMAND_MAP = {
     'create_cube': create_cube, 'create_cylinder': create_cylinder, 'create_box': create_box,
@@ -1442,6 +3750,29 @@ COMMAND_MAP = {
     'get_mass_properties': get_mass_properties,
     'get_body_relationships': get_body_relationships,
     'measure_distance': measure_distance,
+    'get_watcher_stats': get_watcher_stats,
+    'get_server_stats': get_server_stats,
+    'set_tracing': set_tracing,
+    'export_trace': export_trace,
+    'get_recent_logs': get_recent_logs,
+    'set_log_level': set_log_level,
+    'set_journal': set_journal,
+    'get_cache_stats': get_cache_stats,
+    'create_primitives_batch': create_primitives_batch,
+    'get_scene_snapshot': get_scene_snapshot,
+    'get_bounding_box_batch': get_bounding_box_batch,
+    'get_body_center_batch': get_body_center_batch,
+    'get_body_dimensions_batch': get_body_dimensions_batch,
+    'get_mass_properties_batch': get_mass_properties_batch,
+    'select_edges': select_edges,
+    'select_faces': select_faces,
+    'check_interference_all': check_interference_all,
+    'find_bodies_in_box': find_bodies_in_box,
+    'find_bodies_near_point': find_bodies_near_point,
+    'nearest_bodies': nearest_bodies,
+    'classify_points': classify_points,
+    'raycast': raycast,
+    'slice_profile': slice_profile,
     # Fusion:プレフィックス付きバージョン
     'fusion:create_cube': create_cube, 'fusion:create_cylinder': create_cylinder, 'fusion:create_box': create_box,
     'fusion:create_sphere': create_sphere, 'fusion:create_hemisphere': create_hemisphere, 'fusion:create_cone': create_cone,
@@ -1463,59 +3794,270 @@ COMMAND_MAP = {
     'fusion:get_mass_properties': get_mass_properties,
     'fusion:get_body_relationships': get_body_relationships,
     'fusion:measure_distance': measure_distance,
+    'fusion:get_watcher_stats': get_watcher_stats,
+    'fusion:get_server_stats': get_server_stats,
+    'fusion:set_tracing': set_tracing,
+    'fusion:export_trace': export_trace,
+    'fusion:get_recent_logs': get_recent_logs,
+    'fusion:set_log_level': set_log_level,
+    'fusion:set_journal': set_journal,
+    'fusion:get_cache_stats': get_cache_stats,
+    'fusion:create_primitives_batch': create_primitives_batch,
+    'fusion:get_scene_snapshot': get_scene_snapshot,
+    'fusion:get_bounding_box_batch': get_bounding_box_batch,
+    'fusion:get_body_center_batch': get_body_center_batch,
+    'fusion:get_body_dimensions_batch': get_body_dimensions_batch,
+    'fusion:get_mass_properties_batch': get_mass_properties_batch,
+    'fusion:select_edges': select_edges,
+    'fusion:select_faces': select_faces,
+    'fusion:check_interference_all': check_interference_all,
+    'fusion:find_bodies_in_box': find_bodies_in_box,
+    'fusion:find_bodies_near_point': find_bodies_near_point,
+    'fusion:nearest_bodies': nearest_bodies,
+    'fusion:classify_points': classify_points,
+    'fusion:raycast': raycast,
+    'fusion:slice_profile': slice_profile,
 }
 
-def dispatch_command(command_name, params):
-    log_debug(f"Executing command: {command_name}")
+def execute_command(command_name, params):
+    """
+    コマンドを実行し、レスポンス辞書を返します (ファイルへは書き込みません)。
+    """
+    log_debug("Executing command: %s", command_name)
     func = COMMAND_MAP.get(command_name)
     response_data = {}
+    begin_entity_index_transaction()
     try:
         if func:
-            result = func(**params)
+            with trace_span(command_name):
+                result = func(**params)
             response_data['status'] = 'success'
             response_data['result'] = result if result is not None else 'OK'
         else:
             raise ValueError(f"Unsupported command: {command_name}")
 
     except Exception as e:
-        log_debug(f"Error executing '{command_name}': {traceback.format_exc()}")
+        log_error(f"Error executing '{command_name}': {traceback.format_exc()}")
         response_data['status'] = 'error'
         response_data['message'] = f"Failed to execute '{command_name}': {str(e)}"
         response_data['traceback'] = traceback.format_exc()
-
     finally:
+        end_entity_index_transaction()
+    return response_data
+
+def write_response_file(response_data):
+    try:
+        with open(_response_file_path, 'w', encoding='utf-8') as f:
+            json.dump(response_data, f, ensure_ascii=False)
+    except Exception as e:
+        log_error(f"Failed to write response file: {traceback.format_exc()}")
+
+def dispatch_command(command_name, params):
+    response_data = execute_command(command_name, params)
+    write_response_file(response_data)
+    log_debug("Wrote response for %s to file.", command_name)
+    return response_data
+
+def is_valid_request_id(request_id) -> bool:
+    return isinstance(request_id, str) and _SPOOL_REQUEST_ID_PATTERN.match(request_id) is not None
+
+def strip_internal_keys(request: dict) -> dict:
+    """
+    外部から受け取ったリクエストから '_' で始まるキー (_request_id, _reply_to などの受信経路用) を取り除きます。
+    これらは各トランスポートが自分で付け直すため、クライアントが指定した値は信用しません。
+    """
+    return {k: v for k, v in request.items() if not (isinstance(k, str) and k.startswith('_'))}
+
+def sanitize_request_payload(payload: str) -> str:
+    """JSON オブジェクトであれば内部用のキーを取り除いて返します。解析できない内容はそのまま返します (エラーは handle_request が返します)。"""
+    try:
+        request = json.loads(payload)
+    except ValueError:
+        return payload
+    if not isinstance(request, dict) or not any(isinstance(k, str) and k.startswith('_') for k in request):
+        return payload
+    return json.dumps(strip_internal_keys(request), ensure_ascii=False)
+
+def write_spool_response(request_id: str, response_data):
+    """
+    スプールの responses/<request_id>.json に一時ファイル経由で (rename) レスポンスを書き込みます。
+    """
+    if not is_valid_request_id(request_id):
+        log_error("Refusing to write spool response for invalid request id %r", request_id)
+        return
+    response_data = dict(response_data, request_id=request_id)
+    final_path = os.path.join(_spool_response_dir, f"{request_id}.json")
+    temp_path = os.path.join(_spool_response_dir, f".{request_id}.json.tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(response_data, f, ensure_ascii=False)
+        os.replace(temp_path, final_path)
+    except Exception as e:
+        log_error(f"Failed to write spool response '{request_id}': {traceback.format_exc()}")
+
+def deliver_response(request, response_data):
+    """
+    リクエストの受信経路に応じてレスポンスを返します。
+    ソケット経由 ('_reply_to' 付き) なら接続へ、スプール経由 ('_request_id' 付き) なら
+    リクエストIDごとのレスポンスファイルへ、それ以外は従来のレスポンスファイルへ書き込みます。
+    """
+    reply_to = request.get('_reply_to') if isinstance(request, dict) else None
+    request_id = request.get('_request_id') if isinstance(request, dict) else None
+    if reply_to and _socket_server:
+        _socket_server.complete(reply_to, response_data)
+    elif request_id:
+        write_spool_response(request_id, response_data)
+        append_spool_completion(request_id, response_data)
+    else:
+        write_response_file(response_data)
+
+def append_spool_completion(request_id: str, response_data):
+    """
+    完了順に responses/completions.log へ1行ずつ追記します。
+    クライアントはこのファイルを追跡すれば、完了したレスポンスを順不同で回収できます。
+    """
+    entry = {'seq': response_data.get('completion_seq'), 'request_id': request_id,
+             'correlation_id': response_data.get('correlation_id'), 'status': response_data.get('status')}
+    try:
+        with open(os.path.join(_spool_response_dir, 'completions.log'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    except Exception as e:
+        log_error(f"Failed to append spool completion: {traceback.format_exc()}")
+
+def enqueue_request(payload: str, pickup_seconds: float=None):
+    """
+    受信したリクエスト(JSON文字列)をキューに積み、必要であればカスタムイベントで
+    メインスレッドを起こします。イベントは未処理のものが無い場合にのみ発行されます。
+    pickup_seconds にはファイル書き込みから検知までの遅延を渡します (統計用)。
+    """
+    global _request_kick_pending
+    with _request_queue_lock:
+        _request_queue.append((time.time(), payload, pickup_seconds))
+        need_kick = not _request_kick_pending
+        _request_kick_pending = True
+    if need_kick:
+        error = None
         try:
-            with open(_response_file_path, 'w', encoding='utf-8') as f:
-                json.dump(response_data, f, ensure_ascii=False, indent=4)
-            log_debug(f"Wrote response for {command_name} to file.")
+            fired = _app.fireCustomEvent(_command_received_event_id, '')
         except Exception as e:
-            log_debug(f"Failed to write response file: {traceback.format_exc()}")
+            fired, error = False, e
+        if not fired:
+            # 発行できなかったイベントを待ち続けないよう、次のリクエストで再度発行させる
+            with _request_queue_lock:
+                _request_kick_pending = False
+            log_warning(f"Failed to fire the command event ({error or 'not registered'}); the next request will retry.")
+
+def reset_request_queue():
+    """
+    未処理のリクエストを破棄し、イベント発行済みフラグを戻します。
+    停止時に未配送のイベントが捨てられてもフラグが残らないよう、開始時と停止時に呼びます。
+    """
+    global _request_kick_pending
+    with _request_queue_lock:
+        dropped = len(_request_queue)
+        _request_queue.clear()
+        _request_kick_pending = False
+    if dropped: log_warning("Dropped %d queued request(s).", dropped)
+    return dropped
+
+def process_request_queue(max_requests: int=_MAX_REQUESTS_PER_EVENT):
+    """
+    キューに溜まったリクエストをメインスレッド上で連続して実行します。
+    上限を超えた分はUIに制御を返してから次のイベントで続けます。
+    """
+    global _request_kick_pending
+    processed = 0
+    while processed < max_requests:
+        with _request_queue_lock:
+            if not _request_queue:
+                _request_kick_pending = False
+                return processed
+            enqueued_at, payload, pickup_seconds = _request_queue.popleft()
+        handle_request(payload, enqueued_at, pickup_seconds)
+        processed += 1
+    _app.fireCustomEvent(_command_received_event_id, '')
+    return processed
+
+def handle_request(payload: str, enqueued_at: float=None, pickup_seconds: float=None):
+    global _completion_seq
+    started = time.time()
+    data = None
+    response = None
+    command_name = '<invalid>'
+    parse_ms = execute_started = None
+    try:
+        data = json.loads(payload)
+        parse_ms = (time.time() - started) * 1000
+        execute_started = time.time()
+        if data.get('trace') or _trace_state['enabled']:
+            _trace_state['active'] = True
+            if data.get('trace'): _trace_state['request_events'] = []
+        if not data.get('_reply_to') and not data.get('_request_id') and os.path.exists(_response_file_path):
+            with open(_response_file_path, 'w', encoding='utf-8') as f: f.truncate(0)
+        command_name = data.get('command')
+        params = data.get('parameters', {})
+        if data.get('_invalid_request'):
+            # スプールで解析できなかったリクエスト (drain_spool_requests が付けた内部キー)
+            response = {'status': 'error', 'message': data['_invalid_request']}
+        elif not _app.activeDocument:
+            raise RuntimeError("アクティブなデザイン ドキュメントがありません。")
+        elif command_name == 'execute_macro':
+            response = run_macro(params.get('commands', []), stop_on_error=params.get('stop_on_error', False))
+        else:
+            response = execute_command(command_name, params)
+    except Exception as e:
+        response = {'status': 'error', 'message': 'Failed to process command event.', 'traceback': traceback.format_exc()}
+        log_error(f'コマンド処理に失敗:\n{traceback.format_exc()}')
+    finally:
+        _trace_state['active'] = False
+    if _trace_state['request_events'] is not None:
+        response['trace'] = {'traceEvents': _trace_state['request_events'], 'displayTimeUnit': 'ms'}
+        _trace_state['request_events'] = None
+
+    # 相関IDと完了順序を付与 (パイプライン実行時にクライアントが対応付けられるように)
+    _completion_seq += 1
+    response['completion_seq'] = _completion_seq
+    if isinstance(data, dict) and data.get('correlation_id') is not None:
+        response['correlation_id'] = data.get('correlation_id')
+    response['elapsed_ms'] = (time.time() - started) * 1000
+    if enqueued_at is not None:
+        response['queued_ms'] = (started - enqueued_at) * 1000
+    execute_ms = (time.time() - execute_started) * 1000 if execute_started is not None else None
+    serialize_started = time.time()
+    try:
+        deliver_response(data, response)
+    except Exception:
+        log_error(f'レスポンスの返却に失敗:\n{traceback.format_exc()}')
+    record_command_timing(stats_command_label(command_name), response.get('status'), {
+        'pickup': pickup_seconds * 1000 if pickup_seconds is not None else None,
+        'queue': response.get('queued_ms'),
+        'parse': parse_ms,
+        'execute': execute_ms,
+        'serialize': (time.time() - serialize_started) * 1000
+    })
+    write_metrics_file()
+    if _journal_state['path']:
+        arrived_at = enqueued_at - (pickup_seconds or 0) if enqueued_at is not None else started
+        try:
+            append_journal_entry(payload, data, response, arrived_at, started)
+        except Exception:
+            log_error(f'ジャーナルの書き込みに失敗:\n{traceback.format_exc()}')
 
 # --- イベントハンドラ ---
 class CommandReceivedEventHandler(adsk.core.CustomEventHandler):
     def notify(self, args):
         try:
-            if os.path.exists(_response_file_path):
-                with open(_response_file_path, 'w', encoding='utf-8') as f: f.truncate(0)
-            data = json.loads(args.additionalInfo)
-            command_name = data.get('command')
-            params = data.get('parameters', {})
-            if not _app.activeDocument: raise RuntimeError("アクティブなデザイン ドキュメントがありません。")
-
-            if command_name == 'execute_macro':
-                for cmd_item in params.get('commands', []):
-                    dispatch_command(cmd_item.get('tool_name'), cmd_item.get('arguments', {}))
-                
-                response = {'status': 'success', 'result': f"Macro with {len(params.get('commands',[]))} steps executed."}
-                with open(_response_file_path, 'w', encoding='utf-8') as f: json.dump(response, f, ensure_ascii=False, indent=4)
-            else:
-                dispatch_command(command_name, params)
-        except Exception as e:
-            error_response = {'status': 'error', 'message': 'Failed to process command event.', 'traceback': traceback.format_exc()}
-            try:
-                 with open(_response_file_path, 'w', encoding='utf-8') as f: json.dump(error_response, f, ensure_ascii=False, indent=4)
-            except: pass
-            log_debug(f'コマンド処理に失敗:\n{traceback.format_exc()}')
+            # 直接渡されたリクエストがあれば先に処理し、その後キューを消化する
+            if args.additionalInfo:
+                handle_request(sanitize_request_payload(args.additionalInfo))
+            process_request_queue()
+        except:
+            log_error(f'コマンド処理に失敗:\n{traceback.format_exc()}')
+        flush_log_palette()
+
+class LogFlushEventHandler(adsk.core.CustomEventHandler):
+    def notify(self, args):
+        flush_log_palette()
 
 # --- UIコマンドハンドラ ---
 class StartServerCreatedHandler(adsk.core.CommandCreatedEventHandler):
@@ -1536,56 +4078,403 @@ class StopServerExecuteHandler(adsk.core.CommandEventHandler):
     def __init__(self): super().__init__()
     def notify(self, args): stop_server()
 
+# --- ソケット通信 (JSON-RPC) ---
+def parse_socket_address(spec: str):
+    """
+    'unix:/path/to.sock' / 'host:port' / 'port' 形式のアドレス指定を解析します。
+    """
+    spec = str(spec).strip()
+    if spec.startswith('unix:'):
+        return spec[len('unix:'):]
+    host, _, port = spec.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+def load_socket_token(path: str=None) -> str:
+    """
+    ソケット接続の共有シークレットを読み込みます。
+    ファイルが無いか空の場合は新しく生成し、所有者だけが読み書きできる権限 (0600) で保存します。
+    """
+    path = path or _socket_token_path
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+    token = secrets.token_hex(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    try:
+        os.chmod(path, 0o600)
+    except OSError:
+        pass
+    return token
+
+class SocketCommandServer:
+    """
+    ローカルのTCP / Unixドメインソケットで改行区切りのJSON-RPC 2.0 リクエストを受け付けます。
+    リクエストは submit (通常は enqueue_request) でメインスレッドへ渡され、
+    complete() で返された実行結果を同じ接続へ書き戻します。
+    1つの接続で応答を待たずに複数のリクエストを送ることができ (パイプライン)、
+    レスポンスは完了した順に id 付きで返ります。
+    各接続の最初の1行は共有シークレットを渡す authenticate リクエストでなければならず、
+    それ以外 (HTTP のリクエスト行を含む) の場合は何も実行せずに接続を閉じます。
+    """
+    def __init__(self, address, submit, token: str):
+        self.address = address
+        self._submit = submit
+        self._token = token
+        self._sock = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_token = 0
+
+    def bind(self):
+        """ソケットを bind して listen します。接続の受け付けは start() で始めます。"""
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(self.address)
+            if isinstance(self.address, str):
+                os.chmod(self.address, 0o600)
+            sock.listen(8)
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(_WATCHER_POLL_INTERVAL)
+        self._sock = sock
+        if not isinstance(self.address, str):
+            self.address = sock.getsockname()[:2]
+
+    def start(self):
+        if self._sock is None:
+            self.bind()
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        log_info(f"Socket server listening on {self.address}")
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        with self._pending_lock:
+            self._pending.clear()
+
+    def complete(self, token, response_data):
+        """メインスレッドから呼ばれ、実行結果を要求元の接続へ書き戻します。"""
+        with self._pending_lock:
+            target = self._pending.pop(token, None)
+        if target is None:
+            log_warning(f"Socket reply target '{token}' is no longer waiting.")
+            return
+        connection, request_id = target
+        if request_id is not _NO_REPLY:
+            connection.send(_jsonrpc_response(request_id, response_data))
+
+    def _accept_loop(self):
+        while not self._stopping.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._serve_connection, args=(_SocketConnection(conn),), daemon=True).start()
+
+    def _serve_connection(self, connection):
+        authenticated = False
+        try:
+            with connection.sock, connection.sock.makefile('rb') as reader:
+                for line in reader:
+                    if self._stopping.is_set():
+                        break
+                    if not line.strip():
+                        continue
+                    if not authenticated:
+                        authenticated, reply = self._authenticate(line)
+                        if reply is not None:
+                            connection.send(reply)
+                        if not authenticated:
+                            break
+                        continue
+                    reply = self._handle_line(connection, line)
+                    if reply is not None:
+                        connection.send(reply)
+        except OSError:
+            pass
+        except Exception:
+            log_error(f"Socket connection error: {traceback.format_exc()}")
+        finally:
+            connection.closed = True
+            with self._pending_lock:
+                for token in [t for t, (c, _) in self._pending.items() if c is connection]:
+                    del self._pending[token]
+
+    def _authenticate(self, line: bytes):
+        """接続の最初の1行を検証し、(認証できたか, 返信または None) を返します。"""
+        if _HTTP_REQUEST_LINE_PATTERN.match(line):
+            log_warning("Socket server rejected an HTTP request.")
+            return False, None
+        try:
+            request = json.loads(line.decode('utf-8'))
+        except ValueError:
+            request = None
+        if not isinstance(request, dict) or request.get('method') != 'authenticate':
+            log_warning("Socket server rejected a connection that did not authenticate.")
+            return False, _jsonrpc_error(None, -32001, "Unauthorized: the first request must be 'authenticate'")
+        request_id = request.get('id')
+        params = request.get('params')
+        token = params.get('token') if isinstance(params, dict) else None
+        if not isinstance(token, str) or not hmac.compare_digest(token.encode('utf-8'), self._token.encode('utf-8')):
+            log_warning("Socket server rejected an invalid token.")
+            return False, _jsonrpc_error(request_id, -32001, "Unauthorized: invalid token")
+        return True, (None if 'id' not in request else {'jsonrpc': '2.0', 'id': request_id, 'result': 'authenticated'})
+
+    def _handle_line(self, connection, line: bytes):
+        """即時に返せるエラーは返却し、実行するリクエストはキューへ渡して None を返します。"""
+        try:
+            request = json.loads(line.decode('utf-8'))
+        except ValueError as e:
+            return _jsonrpc_error(None, -32700, f"Parse error: {e}")
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return _jsonrpc_error(None, -32600, "Invalid Request")
+        request_id = request.get('id')
+        is_notification = 'id' not in request
+        method = request['method']
+        params = request.get('params', {})
+        if not isinstance(params, dict):
+            return None if is_notification else _jsonrpc_error(request_id, -32602, "params must be an object")
+        if method != 'execute_macro' and method not in COMMAND_MAP:
+            return None if is_notification else _jsonrpc_error(request_id, -32601, f"Method not found: {method}")
+
+        with self._pending_lock:
+            self._next_token += 1
+            token = f"sock-{self._next_token}"
+            self._pending[token] = (connection, _NO_REPLY if is_notification else request_id)
+        payload = {'command': method, 'parameters': params, '_reply_to': token}
+        if not is_notification:
+            payload['correlation_id'] = request_id
+        if request.get('trace'):
+            payload['trace'] = True
+        self._submit(json.dumps(payload, ensure_ascii=False))
+        return None
+
+class _SocketConnection:
+    """1つのクライアント接続。メインスレッドと受信スレッドの双方から書き込むためロックで保護します。"""
+    def __init__(self, sock):
+        self.sock = sock
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        if self.closed:
+            return
+        data = json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n'
+        try:
+            with self._lock:
+                self.sock.sendall(data)
+        except OSError:
+            self.closed = True
+
+_NO_REPLY = object()
+
+def _jsonrpc_response(request_id, response_data):
+    if response_data.get('status') == 'success':
+        reply = {'jsonrpc': '2.0', 'id': request_id, 'result': response_data.get('result')}
+    else:
+        data = {'traceback': response_data.get('traceback')}
+        if 'result' in response_data:
+            data['result'] = response_data['result']
+        reply = _jsonrpc_error(request_id, -32000, response_data.get('message', 'Command failed.'), data)
+    # "trace": true で要求されたスパンは拡張メンバーとして返す
+    if 'trace' in response_data:
+        reply['trace'] = response_data['trace']
+    return reply
+
+def _jsonrpc_error(request_id, code: int, message: str, data=None):
+    error = {'code': code, 'message': message}
+    if data is not None:
+        error['data'] = data
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': error}
+
 # --- ファイル監視とサーバー制御 ---
+def drain_spool_requests():
+    """
+    スプールの requests/ にある *.json を書き込み順 (mtime, 名前順) にすべて取り出し、
+    メインスレッドへ渡します。ファイル名 (拡張子除く) がリクエストIDになります。
+    クライアントは一時ファイルに書き込んでから rename してください。
+    """
+    try:
+        entries = [e for e in os.scandir(_spool_request_dir) if e.is_file() and e.name.endswith('.json') and not e.name.startswith('.')]
+    except FileNotFoundError:
+        return 0
+    entries.sort(key=lambda e: (e.stat().st_mtime_ns, e.name))
+    for entry in entries:
+        request_id = entry.name[:-len('.json')]
+        if not is_valid_request_id(request_id):
+            log_warning("Ignoring spool request with invalid id %r", entry.name)
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            continue
+        try:
+            modified = entry.stat().st_mtime
+            with open(entry.path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+        pickup_seconds = time.time() - modified
+        _record_pickup_latency(pickup_seconds)
+        try:
+            request = json.loads(content)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            request = strip_internal_keys(request)
+        except ValueError as e:
+            # 通常のリクエストと同じ経路でエラーを返し、completions.log にも完了を記録する
+            request = {'_invalid_request': f"Invalid request JSON: {e}"}
+        request['_request_id'] = request_id
+        enqueue_request(json.dumps(request, ensure_ascii=False), pickup_seconds)
+    return len(entries)
+
+def is_command_complete(content: str) -> bool:
+    """コマンドファイルの内容が JSON として最後まで読めるかを返します。"""
+    try:
+        json.loads(content)
+        return True
+    except ValueError:
+        return False
+
 def file_watcher(stop_event):
+    global _watcher_backend_in_use
+    backend = create_watcher_backend([_command_file_path, _spool_request_dir], _watcher_backend_name)
+    _watcher_backend_in_use = backend.name
+    log_info(f"File watcher started with '{backend.name}' backend.")
     last_modified = 0
-    while not stop_event.is_set():
-        try:
-            if os.path.exists(_command_file_path):
-                modified = os.path.getmtime(_command_file_path)
-                if modified > last_modified:
-                    last_modified = modified
-                    with open(_command_file_path, 'r+', encoding='utf-8') as f:
-                        content = f.read().strip()
-                        if content:
-                            _app.fireCustomEvent(_command_received_event_id, content)
-                            f.seek(0)
-                            f.truncate()
-        except Exception as e:
-            log_debug(f"File watcher error: {traceback.format_exc()}")
-        time.sleep(0.5)
+    try:
+        while not stop_event.is_set():
+            try:
+                if os.path.exists(_command_file_path):
+                    modified = os.path.getmtime(_command_file_path)
+                    if modified > last_modified:
+                        with open(_command_file_path, 'r+', encoding='utf-8') as f:
+                            content = f.read().strip()
+                            if content and not is_command_complete(content) and time.time() - modified < _COMMAND_SETTLE_SECONDS:
+                                # 書き込み途中の可能性があるため、切り詰めずに次の通知 (または待機のタイムアウト) で読み直す
+                                content = None
+                            else:
+                                last_modified = modified
+                            if content:
+                                pickup_seconds = time.time() - modified
+                                _record_pickup_latency(pickup_seconds)
+                                enqueue_request(sanitize_request_payload(content), pickup_seconds)
+                                f.seek(0)
+                                f.truncate()
+                drain_spool_requests()
+            except Exception as e:
+                log_error(f"File watcher error: {traceback.format_exc()}")
+            # 変更通知を待つ (タイムアウトは停止フラグ確認と取りこぼし防止のため)
+            backend.wait(_WATCHER_POLL_INTERVAL)
+    finally:
+        backend.close()
 
 def start_server():
-    global _is_running, _file_watcher_thread, _stop_flag, _command_received_event, _event_handler
+    global _is_running, _file_watcher_thread, _stop_flag, _command_received_event, _event_handler, _socket_server
+    global _log_flush_event, _log_flush_handler, _log_flusher_thread
     if _is_running: return
+    reset_request_queue()
     try:
         with open(_command_file_path, 'w', encoding='utf-8') as f: f.truncate(0)
         with open(_response_file_path, 'w', encoding='utf-8') as f: f.truncate(0)
+        os.makedirs(_spool_request_dir, exist_ok=True)
+        os.makedirs(_spool_response_dir, exist_ok=True)
+        # 失敗しやすいソケットの bind を先に行い、スレッドやイベントを起動する前に失敗させる
+        if _socket_address:
+            _socket_server = SocketCommandServer(parse_socket_address(_socket_address), enqueue_request, load_socket_token())
+            _socket_server.bind()
         _command_received_event = _app.registerCustomEvent(_command_received_event_id)
         _event_handler = CommandReceivedEventHandler()
         _command_received_event.add(_event_handler)
         _handlers.append(_event_handler)
+        # 受け付けはイベントの登録後に始める (未登録のイベントを発行するとキューが起こされなくなる)
+        if _socket_server:
+            _socket_server.start()
         _stop_flag = threading.Event()
         _file_watcher_thread = threading.Thread(target=file_watcher, args=(_stop_flag,))
         _file_watcher_thread.start()
+        _log_flush_event = _app.registerCustomEvent(_log_flush_event_id)
+        _log_flush_handler = LogFlushEventHandler()
+        _log_flush_event.add(_log_flush_handler)
+        _handlers.append(_log_flush_handler)
+        _log_flusher_thread = threading.Thread(target=log_flusher, args=(_stop_flag,), daemon=True)
+        _log_flusher_thread.start()
+        _log_state['buffered'] = True
         _is_running = True
         if _start_cmd_control: _start_cmd_control.isEnabled = False
         if _stop_cmd_control: _stop_cmd_control.isEnabled = True
         if _ui: _ui.messageBox('MCPサーバー連携を開始しました。')
     except Exception as e:
+        # 途中まで起動したスレッド・イベント・ソケットを片付ける (_is_running は False のまま)
+        try:
+            shutdown_server_resources()
+        except Exception:
+            log_error(f'起動失敗後の後始末に失敗:\n{traceback.format_exc()}')
         if _ui: _ui.messageBox(f'サーバーの開始に失敗: {e}')
 
+def shutdown_server_resources():
+    """
+    監視スレッド・ソケット・ログのフラッシュ・カスタムイベントを停止して登録を解除します。
+    stop_server と、start_server が途中で失敗したときの後始末の両方から呼ばれます。
+    """
+    global _file_watcher_thread, _stop_flag, _command_received_event, _event_handler, _socket_server
+    global _log_flush_event, _log_flush_handler, _log_flusher_thread
+    if _stop_flag: _stop_flag.set()
+    if _file_watcher_thread:
+        _file_watcher_thread.join(timeout=2)
+        _file_watcher_thread = None
+    if _socket_server:
+        _socket_server.stop()
+        _socket_server = None
+    reset_request_queue()
+    write_metrics_file(force=True)
+    close_journal()
+    if _log_flusher_thread:
+        _log_flusher_thread.join(timeout=2)
+        _log_flusher_thread = None
+    _log_state['buffered'] = False
+    flush_log_palette()
+    if _log_flush_event and _log_flush_handler in _handlers:
+        _log_flush_event.remove(_log_flush_handler)
+        _handlers.remove(_log_flush_handler)
+    if _log_flush_event and _app.unregisterCustomEvent(_log_flush_event_id):
+        _log_flush_event = None
+    if _command_received_event and _event_handler in _handlers:
+        _command_received_event.remove(_event_handler)
+        _handlers.remove(_event_handler)
+    if _command_received_event and _app.unregisterCustomEvent(_command_received_event_id):
+        _command_received_event = None
+
 def stop_server():
-    global _is_running, _file_watcher_thread, _stop_flag, _command_received_event, _event_handler
+    global _is_running
     if not _is_running: return
     try:
-        if _stop_flag: _stop_flag.set()
-        if _file_watcher_thread: _file_watcher_thread.join(timeout=2)
-        if _command_received_event and _event_handler in _handlers:
-            _command_received_event.remove(_event_handler)
-            _handlers.remove(_event_handler)
-        if _command_received_event and _app.unregisterCustomEvent(_command_received_event_id):
-            _command_received_event = None
+        shutdown_server_resources()
         _is_running = False
         if _start_cmd_control: _start_cmd_control.isEnabled = True
         if _stop_cmd_control: _stop_cmd_control.isEnabled = False
@@ -0,0 +1,344 @@
+"""
+コマンド層のベンチマーク (Fusion 不要)。
+
+tools/fake_adsk の代替 adsk パッケージ上で fusion_mcp_server.py を読み込み、代表的なワークロードを実行して
+スループットとメモリ割り当てを報告します。代替 adsk の擬似遅延は既定で 0 なので、
+計測値はアドイン側 (ディスパッチャー、シリアライズ、索引、配置計算など) のオーバーヘッドになります。
+
+使い方:
+    python tools/benchmarks/bench_commands.py
+    python tools/benchmarks/bench_commands.py --only primitive_grid macro_long --scale 2
+    python tools/benchmarks/bench_commands.py --latency extrude.add=0.004 --latency physicalProperties=0.003
+    python tools/benchmarks/bench_commands.py --json bench.json
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'tools', 'fake_adsk'))
+sys.path.insert(0, _REPO_ROOT)
+
+import adsk.core  # noqa: E402
+import adsk.fusion  # noqa: E402
+from adsk import simulation  # noqa: E402
+import fusion_mcp_server as server  # noqa: E402
+
+# --- 環境の準備 ---
+def reset_environment(work_dir: str):
+    """空のデザインを作り、アドインの出力先を一時ディレクトリへ向けます。"""
+    simulation.reset()
+    app = adsk.core.Application.get()
+    server._app = app
+    server._ui = app.userInterface
+    server._response_file_path = os.path.join(work_dir, 'fusion_response.txt')
+    server._spool_request_dir = os.path.join(work_dir, 'spool', 'requests')
+    server._spool_response_dir = os.path.join(work_dir, 'spool', 'responses')
+    shutil.rmtree(os.path.join(work_dir, 'spool'), ignore_errors=True)
+    os.makedirs(server._spool_request_dir)
+    os.makedirs(server._spool_response_dir)
+    return app
+
+def timeline_count():
+    return adsk.core.Application.get().activeProduct.timeline.count
+
+def grid_arguments(n: int, pitch: float=30.0):
+    return [{"width": 20, "depth": 20, "height": 10, "cx": i * pitch, "cy": j * pitch, "z_placement": "bottom",
+             "body_name": f"Cell_{i}_{j}"} for i in range(n) for j in range(n)]
+
+# --- ワークロード ---
+# 各ワークロードは (実行関数, 操作数) を返します。準備 (デザインの初期化や元ボディの作成) は計測に含めません。
+def workload_primitive_grid(scale: float):
+    n = max(2, int(12 * scale ** 0.5))
+    arguments = grid_arguments(n)
+    def run():
+        for args in arguments:
+            response = server.execute_command('create_box', args)
+            assert response['status'] == 'success', response
+    return run, len(arguments)
+
+def workload_primitive_grid_batch(scale: float):
+    n = max(2, int(12 * scale ** 0.5))
+    primitives = [{"tool_name": "create_box", "arguments": args} for args in grid_arguments(n)]
+    def run():
+        response = server.execute_command('create_primitives_batch', {"primitives": primitives})
+        assert response['status'] == 'success', response
+    return run, len(primitives)
+
+_PLACEMENT_CASES = [
+    {"z_placement": "bottom", "x_placement": "left", "y_placement": "front"},
+    {"z_placement": "top", "x_placement": "right", "y_placement": "back"},
+    {"z_placement": "center", "x_placement": "center", "y_placement": "center", "direction": "negative"},
+    {"z_placement": "bottom", "x_placement": "center", "y_placement": "back", "taper_angle": 5},
+]
+
+def placement_arguments(count: int):
+    return [dict(_PLACEMENT_CASES[k % len(_PLACEMENT_CASES)], width=20, depth=12, height=8, cx=k * 25.0, cy=5.0, cz=2.0)
+            for k in range(count)]
+
+def workload_placement_analytic(scale: float):
+    arguments = placement_arguments(max(4, int(100 * scale)))
+    def run():
+        for args in arguments:
+            server.create_box(**args)
+    return run, len(arguments)
+
+def workload_placement_legacy(scale: float):
+    """解析的配置の導入前と同じ手順 (原点でスケッチ → 押し出し → 物理プロパティ計測 → 移動) の比較用。"""
+    arguments = placement_arguments(max(4, int(100 * scale)))
+    scale_mm = server.get_fusion_unit_scale()
+    def run():
+        root = server._app.activeProduct.rootComponent
+        for args in arguments:
+            sketch = root.sketches.add(root.xYConstructionPlane)
+            profile = server.ExtrusionProfile('rect', args['width'] * scale_mm / 2, args['depth'] * scale_mm / 2)
+            profile.draw(sketch, 0.0, 0.0)
+            sign = -1 if args.get('direction') == 'negative' else 1
+            body = server.add_extrusion(root, sketch.profiles.item(0), args['height'] * scale_mm, 0.0, sign,
+                                        args.get('taper_angle', 0), 'inward').bodies.item(0)
+            server.move_body_with_placement(body, args['cx'] * scale_mm, args['cy'] * scale_mm, args['cz'] * scale_mm,
+                                            args['z_placement'], args['x_placement'], args['y_placement'])
+    return run, len(arguments)
+
+def workload_pattern_naming(scale: float):
+    """同じベース名で何度もパターンを作り、名前の衝突が増えていく状況での命名コストを測ります。"""
+    patterns = max(2, int(20 * scale))
+    quantity = 10
+    server.create_box(width=5, depth=5, height=5, body_name='Seed')
+    def run():
+        for _ in range(patterns):
+            response = server.execute_command('create_rectangular_pattern', {
+                "source_body_name": "Seed", "quantity_one": quantity, "distance_one": 10,
+                "quantity_two": quantity, "distance_two": 10, "new_body_base_name": "Tile"})
+            assert response['status'] == 'success', response
+    return run, patterns * (quantity * quantity - 1)
+
+def workload_edges_info_large(scale: float):
+    sides = max(8, int(2000 * scale))
+    server.create_polygon_prism(num_sides=sides, radius=100, height=20, body_name='Gear')
+    body = server.find_entity_by_name('Gear')
+    body.edges  # 位相の生成は代替 adsk 側のコストなので計測から除外する
+    def run():
+        rows = server.execute_command('get_edges_info', {"body_name": "Gear"})
+        columnar = server.execute_command('get_edges_info', {"body_name": "Gear", "format": "columnar"})
+        assert rows['status'] == 'success' and columnar['status'] == 'success'
+        json.dumps(rows)
+        json.dumps(columnar)
+    return run, 2 * 3 * sides
+
+def workload_macro_long(scale: float):
+    """ファイル経由の1リクエストで長いマクロを実行します (解析・参照解決・レスポンスのシリアライズを含む)。"""
+    steps = max(4, int(400 * scale)) // 2 * 2
+    commands = []
+    for k in range(steps // 2):
+        commands.append({"id": f"box{k}", "tool_name": "create_box",
+                         "arguments": {"width": 10, "depth": 10, "height": 10, "cx": k * 15.0, "body_name": "MacroBox"}})
+        commands.append({"tool_name": "get_bounding_box", "arguments": {"body_name": f"${{box{k}}}"}})
+    payload = json.dumps({"command": "execute_macro", "parameters": {"commands": commands}})
+    def run():
+        server.handle_request(payload)
+        with open(server._response_file_path, 'r', encoding='utf-8') as f:
+            response = json.load(f)
+        assert response['status'] == 'success', response.get('message')
+    return run, steps
+
+def workload_dispatcher_roundtrip(scale: float):
+    """スプール経由の小さなクエリを繰り返し、ディスパッチャーとレスポンス書き込みの固定費を測ります。"""
+    count = max(10, int(1000 * scale))
+    server.create_box(body_name='Probe')
+    payloads = [json.dumps({"command": "get_bounding_box", "parameters": {"body_name": "Probe"},
+                            "_request_id": f"req-{k}", "correlation_id": k}) for k in range(count)]
+    def run():
+        for payload in payloads:
+            server.handle_request(payload, time.time())
+    return run, count
+
+def workload_watcher_spool(scale: float):
+    """スプールに置かれたリクエストファイルの検知・キュー投入・実行・レスポンス書き込みまでを測ります。"""
+    count = max(10, int(500 * scale))
+    server.create_box(body_name='Probe')
+    def run():
+        for k in range(count):
+            path = os.path.join(server._spool_request_dir, f"req-{k:06d}.json")
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({"command": "get_body_center", "parameters": {"body_name": "Probe"}}, f)
+            os.replace(path + '.tmp', path)
+        server.drain_spool_requests()
+        while server.process_request_queue():
+            pass
+        assert len(os.listdir(server._spool_response_dir)) >= count
+    return run, count
+
+def workload_slice_profile(scale: float):
+    slices = max(10, int(2000 * scale))
+    server.create_box(width=40, depth=30, height=50, z_placement='bottom', body_name='Part')
+    heights = [50.0 * (k + 0.5) / slices for k in range(slices)]
+    def run():
+        result = server.slice_profile('Part', heights)
+        assert result['count'] == slices
+    return run, slices
+
+def interference_scene(scale: float):
+    """
+    20mm 間隔 (隙間10mm) の格子に 10mm の立方体を並べ、対角線上のセルに
+    6mm 重なる立方体 (干渉 600mm³) と、その両方の上面に接する立方体 (距離0・干渉なし) を追加します。
+    さらに 4mm の立方体をセル Cell_1_0 の内部に置きます (面どうしは離れているが干渉 64mm³)。
+    格子の1辺のセル数と、対角線上で追加したセルの数を返します (干渉する組はその数 + 1、接触する組はその2倍)。
+    """
+    n = max(3, int(10 * scale ** 0.5))
+    for i in range(n):
+        for j in range(n):
+            server.create_box(width=10, depth=10, height=10, cx=i * 20, cy=j * 20, body_name=f"Cell_{i}_{j}")
+    diagonal = range(0, n, 2)
+    for k in diagonal:
+        server.create_box(width=10, depth=10, height=10, cx=k * 20 + 4, cy=k * 20, body_name=f"Overlap_{k}")
+        server.create_box(width=10, depth=10, height=10, cx=k * 20, cy=k * 20, cz=10, body_name=f"Touch_{k}")
+    server.create_box(width=4, depth=4, height=4, cx=20, cy=0, body_name="Nested")
+    return n, len(diagonal)
+
+def workload_interference_check(scale: float):
+    """check_interference_all の広域判定 (スイープ・アンド・プルーン) と狭域判定を、結果を検証しながら測ります。"""
+    n, diagonal = interference_scene(scale)
+    interfering, touching = diagonal + 1, 2 * diagonal
+    def run():
+        result = server.check_interference_all(clearance=1.0)
+        assert result['interfering'] == interfering, result
+        contacts = [row for row in result['pairs'] if not row[3]]
+        assert len(contacts) == touching and all(abs(row[2]) < 1e-6 for row in contacts), result
+        assert all(abs(row[4] - (64.0 if 'Nested' in row[:2] else 600.0)) < 1e-6 for row in result['pairs'] if row[3]), result
+    return run, n * n + 2 * diagonal + 1  # 対象ボディ数
+
+def workload_measure_distance(scale: float):
+    """隣接するセル同士 (10mm)、重なる組、接する組の measure_distance を測ります。"""
+    n, _ = interference_scene(scale)
+    neighbours = [(f"Cell_{i}_{j}", f"Cell_{i + 1}_{j}") for i in range(n - 1) for j in range(n)]
+    def run():
+        for name1, name2 in neighbours:
+            result = server.measure_distance(name1, name2)
+            assert abs(result['minimum_distance'] - 10.0) < 1e-6 and not result['interference'], result
+        result = server.measure_distance('Cell_0_0', 'Overlap_0')
+        assert result['interference'] and abs(result['interference_volume'] - 600.0) < 1e-6, result
+        result = server.measure_distance('Cell_0_0', 'Touch_0')
+        assert result['minimum_distance'] == 0 and not result['interference'], result
+        result = server.measure_distance('Cell_1_0', 'Nested')
+        assert result['interference'] and abs(result['interference_volume'] - 64.0) < 1e-6, result
+    return run, len(neighbours) + 3
+
+WORKLOADS = {
+    'primitive_grid': workload_primitive_grid,
+    'primitive_grid_batch': workload_primitive_grid_batch,
+    'placement_analytic': workload_placement_analytic,
+    'placement_legacy': workload_placement_legacy,
+    'pattern_naming': workload_pattern_naming,
+    'edges_info_large': workload_edges_info_large,
+    'macro_long': workload_macro_long,
+    'dispatcher_roundtrip': workload_dispatcher_roundtrip,
+    'watcher_spool': workload_watcher_spool,
+    'slice_profile': workload_slice_profile,
+    'interference_check': workload_interference_check,
+    'measure_distance': workload_measure_distance,
+}
+
+# --- 計測 ---
+def measure(name: str, scale: float, repeat: int, work_dir: str) -> dict:
+    """
+    計時は tracemalloc なしで repeat 回行い最小値を採用します。
+    その後もう1回 tracemalloc 付きで実行し、ピークメモリと実行後に残ったブロック数、GC回数を記録します。
+    """
+    best = None
+    for _ in range(repeat):
+        reset_environment(work_dir)
+        run, ops = WORKLOADS[name](scale)
+        features_before = timeline_count()
+        simulation.calls.clear()
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best['seconds']:
+            best = {'seconds': elapsed, 'ops': ops, 'features': timeline_count() - features_before,
+                    'api_calls': dict(simulation.calls)}
+
+    reset_environment(work_dir)
+    run, ops = WORKLOADS[name](scale)
+    gc.collect()
+    gen0_before = gc.get_stats()[0]['collections']
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    run()
+    snapshot_after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in snapshot_after.compare_to(snapshot_before, 'filename'))
+
+    return {
+        'workload': name,
+        'ops': best['ops'],
+        'seconds': best['seconds'],
+        'ops_per_second': best['ops'] / best['seconds'] if best['seconds'] > 0 else None,
+        'us_per_op': best['seconds'] / best['ops'] * 1e6,
+        'timeline_features': best['features'],
+        'features_per_op': best['features'] / best['ops'],
+        'api_calls': best['api_calls'],
+        'peak_kib': peak / 1024,
+        'retained_blocks': retained,
+        'gc_gen0_collections': gc.get_stats()[0]['collections'] - gen0_before,
+    }
+
+def format_table(results: list) -> str:
+    header = f"{'workload':<22}{'ops':>8}{'ops/s':>12}{'us/op':>10}{'feat/op':>9}{'peak KiB':>11}{'retained':>10}{'gc0':>6}"
+    lines = [header, '-' * len(header)]
+    for r in results:
+        lines.append(f"{r['workload']:<22}{r['ops']:>8}{r['ops_per_second']:>12.1f}{r['us_per_op']:>10.1f}"
+                     f"{r['features_per_op']:>9.2f}{r['peak_kib']:>11.1f}{r['retained_blocks']:>10}{r['gc_gen0_collections']:>6}")
+    return '\n'.join(lines)
+
+def parse_latency(values) -> dict:
+    latencies = {}
+    for value in values or []:
+        key, _, seconds = value.partition('=')
+        if not seconds:
+            raise SystemExit(f"--latency は <操作>=<秒> の形式で指定してください: {value}")
+        latencies[key] = float(seconds)
+    return latencies
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="代替 adsk 上での fusion_mcp_server コマンド層ベンチマーク")
+    parser.add_argument('--only', nargs='+', choices=sorted(WORKLOADS), help="実行するワークロード")
+    parser.add_argument('--scale', type=float, default=1.0, help="ワークロードの規模の倍率 (既定 1.0)")
+    parser.add_argument('--repeat', type=int, default=3, help="計時の繰り返し回数 (最小値を採用)")
+    parser.add_argument('--latency', action='append', metavar='OP=SECONDS',
+                        help="代替 adsk の擬似遅延 (例: extrude.add=0.004)。複数指定可")
+    parser.add_argument('--json', metavar='PATH', help="結果を JSON で書き出すファイル")
+    args = parser.parse_args(argv)
+
+    simulation.configure(parse_latency(args.latency))
+    work_dir = tempfile.mkdtemp(prefix='fusion_mcp_bench_')
+    results = []
+    try:
+        for name in args.only or list(WORKLOADS):
+            results.append(measure(name, args.scale, max(1, args.repeat), work_dir))
+            print(format_table(results[-1:]).splitlines()[-1] if len(results) > 1 else format_table(results), flush=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    legacy = next((r for r in results if r['workload'] == 'placement_legacy'), None)
+    analytic = next((r for r in results if r['workload'] == 'placement_analytic'), None)
+    if legacy and analytic:
+        print(f"\nplacement: {legacy['us_per_op'] - analytic['us_per_op']:.1f} us/primitive saved, "
+              f"{legacy['features_per_op']:.2f} -> {analytic['features_per_op']:.2f} timeline features/primitive, "
+              f"physicalProperties calls {legacy['api_calls'].get('physicalProperties', 0)} -> "
+              f"{analytic['api_calls'].get('physicalProperties', 0)}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'scale': args.scale, 'latencies': simulation.latencies, 'results': results}, f, indent=2)
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""
+リクエストジャーナル (NDJSON) の再生ツール。
+
+アドインが FUSION_MCP_JOURNAL / set_journal で記録したジャーナルを、元の間隔・最大速度・N倍速で
+トランスポート (ソケット または スプール) へ送り直し、コマンドごとのレイテンシ分布を報告します。
+同じ再生を実機の Fusion 上のアドインにも、tools/fake_adsk 上でプロセス内に起動したアドイン (--local) にも
+向けられるため、実セッションをそのまま負荷試験・回帰ベンチマークに使えます。
+
+ボディ名を参照するリクエストは記録時と同じ初期状態を前提にするため、通常は空のデザインに対して
+再生してください (--clear-design で再生前に delete_all_features を送ります)。
+
+使い方:
+    python tools/benchmarks/replay_journal.py journal.ndjson                       # 既定のスプールへ元の間隔で
+    python tools/benchmarks/replay_journal.py journal.ndjson --socket 127.0.0.1:8765 --speed max
+    python tools/benchmarks/replay_journal.py journal.ndjson --spool /dev/shm/fusion_mcp_spool --speed 4
+    python tools/benchmarks/replay_journal.py journal.ndjson --local --latency extrude.add=0.004 --json replay.json
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+# 再生しても意味のない (再生環境の設定を変えてしまう) コマンド
+_DEFAULT_SKIP = ('set_journal',)
+
+# --- ジャーナルの読み込み ---
+def load_journal(path: str, skip=_DEFAULT_SKIP) -> list:
+    """
+    ジャーナルを読み込み、到着時刻順のエントリーを返します。
+    JSON として解析できなかったリクエスト (raw) と skip に含まれるコマンドは除外します。
+    """
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: ジャーナルの行を解析できません: {e}")
+            request = entry.get('request')
+            if not isinstance(request, dict) or not isinstance(request.get('command'), str):
+                continue
+            if request['command'].split(':', 1)[-1] in skip:
+                continue
+            entries.append(entry)
+    entries.sort(key=lambda e: (e.get('arrived_at') or 0, e.get('seq') or 0))
+    return entries
+
+def schedule_offsets(entries: list, speed) -> list:
+    """各リクエストの送信時刻 (再生開始からの秒数) を返します。speed が None なら全て 0 (最大速度) です。"""
+    if not entries or speed is None:
+        return [0.0] * len(entries)
+    first = entries[0].get('arrived_at') or 0
+    return [max(0.0, ((e.get('arrived_at') or first) - first) / speed) for e in entries]
+
+# --- トランスポート ---
+class SocketTransport:
+    """
+    改行区切り JSON-RPC 2.0 で1本の接続にパイプライン送信します。
+    接続直後に共有シークレットで authenticate し、失敗した場合は例外を送出します。
+    id は再生時のインデックスで、完了した順に on_complete(index, status, server_ms) を呼びます。
+    """
+    name = 'socket'
+
+    def __init__(self, address, on_complete, token: str):
+        if isinstance(address, str):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.connect(address)
+        self._reader_file = self._sock.makefile('rb')
+        message = {'jsonrpc': '2.0', 'id': 'auth', 'method': 'authenticate', 'params': {'token': token}}
+        self._sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        line = self._reader_file.readline()
+        reply = json.loads(line.decode('utf-8')) if line.strip() else {}
+        if 'result' not in reply:
+            self._reader_file.close()
+            self.close()
+            raise RuntimeError(f"ソケットの認証に失敗しました: {reply.get('error', {}).get('message', '接続が閉じられました')}")
+        self._send_lock = threading.Lock()
+        self._on_complete = on_complete
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def send(self, index: int, request: dict):
+        message = {'jsonrpc': '2.0', 'id': index, 'method': request['command'],
+                   'params': request.get('parameters', {})}
+        if request.get('trace'):
+            message['trace'] = True
+        data = json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n'
+        with self._send_lock:
+            self._sock.sendall(data)
+
+    def _read_loop(self):
+        try:
+            with self._reader_file as reader:
+                for line in reader:
+                    if not line.strip():
+                        continue
+                    reply = json.loads(line.decode('utf-8'))
+                    if isinstance(reply.get('id'), int):
+                        self._on_complete(reply['id'], 'error' if 'error' in reply else 'success', None)
+        except (OSError, ValueError):
+            pass
+
+    def close(self):
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+class SpoolTransport:
+    """
+    スプールの requests/ へ一時ファイル経由 (rename) でリクエストを書き込み、
+    responses/completions.log を追跡して完了したレスポンスを回収します。
+    """
+    name = 'spool'
+
+    def __init__(self, spool_root: str, on_complete, poll_interval: float=0.001):
+        self._request_dir = os.path.join(spool_root, 'requests')
+        self._response_dir = os.path.join(spool_root, 'responses')
+        os.makedirs(self._request_dir, exist_ok=True)
+        os.makedirs(self._response_dir, exist_ok=True)
+        self._prefix = f"replay-{uuid.uuid4().hex[:8]}-"
+        self._on_complete = on_complete
+        self._poll_interval = poll_interval
+        self._stopping = threading.Event()
+        log_path = os.path.join(self._response_dir, 'completions.log')
+        self._log = open(log_path, 'a+', encoding='utf-8')
+        self._log.seek(0, os.SEEK_END)
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def send(self, index: int, request: dict):
+        request_id = f"{self._prefix}{index:06d}"
+        temp_path = os.path.join(self._request_dir, f".{request_id}.json.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(request, f, ensure_ascii=False)
+        os.replace(temp_path, os.path.join(self._request_dir, f"{request_id}.json"))
+
+    def _read_loop(self):
+        partial = ''
+        while not self._stopping.is_set():
+            chunk = self._log.readline()
+            if not chunk:
+                time.sleep(self._poll_interval)
+                continue
+            partial += chunk
+            if not partial.endswith('\n'):
+                continue
+            line, partial = partial, ''
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            request_id = entry.get('request_id') or ''
+            if not request_id.startswith(self._prefix):
+                continue
+            response_path = os.path.join(self._response_dir, f"{request_id}.json")
+            server_ms = None
+            try:
+                with open(response_path, 'r', encoding='utf-8') as f:
+                    server_ms = json.load(f).get('elapsed_ms')
+                os.remove(response_path)
+            except (OSError, ValueError):
+                pass
+            self._on_complete(int(request_id[len(self._prefix):]), entry.get('status'), server_ms)
+
+    def close(self):
+        self._stopping.set()
+        self._reader.join(timeout=1)
+        self._log.close()
+
+# --- プロセス内のアドイン (tools/fake_adsk 上) ---
+class LocalAddin:
+    """
+    代替 adsk パッケージ上で fusion_mcp_server を読み込み、start_server() でアドインと同じ
+    スプール監視とソケットサーバーを起動します。メインスレッドの代わりに専用スレッドでカスタムイベントを処理します。
+    """
+    def __init__(self, latencies: dict=None):
+        sys.path.insert(0, os.path.join(_REPO_ROOT, 'tools', 'fake_adsk'))
+        sys.path.insert(0, _REPO_ROOT)
+        import adsk.core
+        from adsk import simulation
+        import fusion_mcp_server as server
+        self._server = server
+        self._simulation = simulation
+        self.work_dir = tempfile.mkdtemp(prefix='fusion_mcp_replay_')
+        simulation.reset()
+        simulation.configure(latencies or {})
+        app = adsk.core.Application.get()
+        server._app = app
+        server._ui = app.userInterface
+        server._command_file_path = os.path.join(self.work_dir, 'fusion_command.txt')
+        server._response_file_path = os.path.join(self.work_dir, 'fusion_response.txt')
+        self.spool_root = os.path.join(self.work_dir, 'spool')
+        server._spool_request_dir = os.path.join(self.spool_root, 'requests')
+        server._spool_response_dir = os.path.join(self.spool_root, 'responses')
+        server._socket_address = '127.0.0.1:0'
+        server._socket_token_path = os.path.join(self.work_dir, 'socket_token')
+        self._stopping = threading.Event()
+        self._pump = threading.Thread(target=self._pump_loop, daemon=True)
+
+    @property
+    def socket_address(self):
+        return self._server._socket_server.address
+
+    @property
+    def socket_token(self):
+        return self._server.load_socket_token()
+
+    def start(self):
+        self._server.start_server()
+        if not self._server._is_running:
+            raise RuntimeError(f"アドインの起動に失敗しました: {self._server._ui.messages[-1:]}")
+        self._pump.start()
+        return self
+
+    def _pump_loop(self):
+        while not self._stopping.is_set():
+            if not self._simulation.pump_events():
+                time.sleep(0.0005)
+
+    def stop(self):
+        self._server.stop_server()
+        self._stopping.set()
+        self._pump.join(timeout=2)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+# --- 再生 ---
+def summarize(samples):
+    samples = sorted(s for s in samples if s is not None)
+    if not samples: return None
+    def pct(p): return samples[min(len(samples) - 1, int(p * len(samples)))]
+    return {"samples": len(samples), "mean": sum(samples) / len(samples),
+            "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": samples[-1]}
+
+def replay(entries: list, make_transport, speed=1.0, max_in_flight: int=0, timeout: float=60.0, keep_trace: bool=False) -> dict:
+    """
+    エントリーを送信スケジュールに従って送り、全ての完了 (または timeout) を待って結果を集計します。
+    max_in_flight > 0 なら未完了のリクエスト数をその値までに制限します (最大速度での閉ループ計測用)。
+    空きを timeout 秒待っても応答が返らない場合 (応答の消失や受信スレッドの停止) は送信を打ち切り、
+    残りは未送信のままタイムアウトとして集計します。
+    """
+    offsets = schedule_offsets(entries, speed)
+    sent_at = [None] * len(entries)
+    results = [None] * len(entries)
+    lock = threading.Lock()
+    all_done = threading.Event()
+    window = threading.BoundedSemaphore(max_in_flight) if max_in_flight > 0 else None
+    remaining = [len(entries)]
+
+    def on_complete(index, status, server_ms):
+        finished = time.perf_counter()
+        with lock:
+            if not 0 <= index < len(entries) or results[index] is not None or sent_at[index] is None:
+                return
+            results[index] = {'status': status, 'latency_ms': (finished - sent_at[index]) * 1000, 'server_ms': server_ms}
+            remaining[0] -= 1
+            if remaining[0] == 0: all_done.set()
+        if window: window.release()
+
+    transport = make_transport(on_complete)
+    lags = []
+    aborted = False
+    started = time.perf_counter()
+    try:
+        for index, entry in enumerate(entries):
+            request = dict(entry['request'])
+            if not keep_trace: request.pop('trace', None)
+            delay = started + offsets[index] - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+            if window and not window.acquire(timeout=timeout):
+                aborted = True
+                break
+            now = time.perf_counter()
+            lags.append((now - started - offsets[index]) * 1000)
+            with lock:
+                sent_at[index] = now
+            transport.send(index, request)
+        if entries and not aborted:
+            all_done.wait(timeout)
+        wall = time.perf_counter() - started
+    finally:
+        transport.close()
+    unsent = sum(1 for t in sent_at if t is None)
+    return build_report(entries, results, lags, wall, transport.name, speed, max_in_flight, unsent)
+
+def build_report(entries, results, lags, wall: float, transport_name: str, speed, max_in_flight: int, unsent: int=0) -> dict:
+    by_command = {}
+    for entry, result in zip(entries, results):
+        name = entry['request']['command']
+        bucket = by_command.setdefault(name, {'count': 0, 'errors': 0, 'timeouts': 0, 'latency': [], 'server': [], 'recorded': []})
+        bucket['count'] += 1
+        bucket['recorded'].append(entry.get('response_ms'))
+        if result is None:
+            bucket['timeouts'] += 1
+            continue
+        if result['status'] != 'success': bucket['errors'] += 1
+        bucket['latency'].append(result['latency_ms'])
+        bucket['server'].append(result['server_ms'])
+    commands = {name: {'count': b['count'], 'errors': b['errors'], 'timeouts': b['timeouts'],
+                       'latency_ms': summarize(b['latency']), 'server_elapsed_ms': summarize(b['server']),
+                       'recorded_response_ms': summarize(b['recorded'])}
+                for name, b in sorted(by_command.items())}
+    completed = [r for r in results if r is not None]
+    return {
+        'transport': transport_name,
+        'speed': 'max' if speed is None else speed,
+        'max_in_flight': max_in_flight or None,
+        'requests': len(entries),
+        'completed': len(completed),
+        'errors': sum(1 for r in completed if r['status'] != 'success'),
+        'timeouts': len(entries) - len(completed),
+        'unsent': unsent,
+        'wall_s': wall,
+        'throughput_rps': len(completed) / wall if wall > 0 else None,
+        'latency_ms': summarize(r['latency_ms'] for r in completed),
+        'send_lag_ms': summarize(lags),
+        'commands': commands
+    }
+
+def format_report(report: dict) -> str:
+    def ms(stats, key):
+        return f"{stats[key]:9.2f}" if stats else f"{'-':>9}"
+    lines = [f"transport={report['transport']} speed={report['speed']} requests={report['requests']} "
+             f"completed={report['completed']} errors={report['errors']} timeouts={report['timeouts']} unsent={report['unsent']} "
+             f"wall={report['wall_s']:.3f}s throughput={report['throughput_rps'] or 0:.1f} req/s",
+             f"{'command':<34}{'count':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'rec p50':>9}",
+             '-' * 90]
+    for name, c in report['commands'].items():
+        lines.append(f"{name[:33]:<34}{c['count']:>6}{c['errors'] + c['timeouts']:>5}{ms(c['latency_ms'], 'p50')}"
+                     f"{ms(c['latency_ms'], 'p95')}{ms(c['latency_ms'], 'p99')}{ms(c['latency_ms'], 'max')}"
+                     f"{ms(c['recorded_response_ms'], 'p50')}")
+    lag = report['send_lag_ms']
+    if lag:
+        lines.append(f"\nsend lag: p50 {lag['p50']:.2f} ms, max {lag['max']:.2f} ms (rec p50 = recorded arrival-to-response time)")
+    return '\n'.join(lines)
+
+def parse_speed(value: str):
+    if value == 'max': return None
+    if value == 'original': return 1.0
+    speed = float(value.rstrip('xX'))
+    if speed <= 0: raise argparse.ArgumentTypeError("speed は正の数、'original'、'max' のいずれかです。")
+    return speed
+
+def parse_latency(values) -> dict:
+    latencies = {}
+    for value in values or []:
+        key, _, seconds = value.partition('=')
+        latencies[key] = float(seconds)
+    return latencies
+
+def parse_address(spec: str):
+    if spec.startswith('unix:'):
+        return spec[len('unix:'):]
+    host, _, port = spec.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+def read_socket_token(path: str=None) -> str:
+    """アドインが保存したソケットの共有シークレットを読み込みます。"""
+    path = path or os.environ.get('FUSION_MCP_SOCKET_TOKEN_FILE') or os.path.join(os.path.expanduser('~'), '.fusion_mcp_socket_token')
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().strip()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a Fusion MCP request journal and report latency distributions.")
+    parser.add_argument('journal', help="NDJSON journal written by the add-in (FUSION_MCP_JOURNAL / set_journal)")
+    parser.add_argument('--socket', help="socket address of the add-in ('127.0.0.1:8765' or 'unix:/path')")
+    parser.add_argument('--socket-token-file', help="shared secret for --socket (default: FUSION_MCP_SOCKET_TOKEN_FILE or ~/.fusion_mcp_socket_token)")
+    parser.add_argument('--spool', nargs='?', const='', default=None,
+                        help="spool directory (default: FUSION_MCP_SPOOL or ~/Documents/fusion_mcp_spool)")
+    parser.add_argument('--local', action='store_true', help="replay against an in-process add-in on tools/fake_adsk")
+    parser.add_argument('--latency', action='append', metavar='OP=SECONDS', help="simulated API latency for --local")
+    parser.add_argument('--speed', type=parse_speed, default=1.0, help="'original' (default), 'max', or a factor such as 4")
+    parser.add_argument('--max-in-flight', type=int, default=0, help="limit outstanding requests (0 = unlimited)")
+    parser.add_argument('--timeout', type=float, default=60.0, help="seconds to wait for responses after the last send")
+    parser.add_argument('--skip', action='append', default=list(_DEFAULT_SKIP), metavar='COMMAND', help="commands not to replay")
+    parser.add_argument('--keep-trace', action='store_true', help="keep per-request \"trace\": true flags")
+    parser.add_argument('--clear-design', action='store_true', help="send delete_all_features before replaying")
+    parser.add_argument('--json', help="write the full report to this file")
+    args = parser.parse_args(argv)
+    if args.socket and args.spool is not None:
+        parser.error("--socket と --spool は同時に指定できません。")
+
+    entries = load_journal(args.journal, skip=set(args.skip))
+    addin = LocalAddin(parse_latency(args.latency)).start() if args.local else None
+    try:
+        if args.socket or (addin and args.spool is None):
+            address = addin.socket_address if addin else parse_address(args.socket)
+            token = addin.socket_token if addin else read_socket_token(args.socket_token_file)
+            make_transport = lambda on_complete: SocketTransport(address, on_complete, token)
+        else:
+            spool_root = addin.spool_root if addin else (args.spool or os.environ.get('FUSION_MCP_SPOOL')
+                                                          or os.path.join(os.path.expanduser('~'), 'Documents', 'fusion_mcp_spool'))
+            make_transport = lambda on_complete: SpoolTransport(spool_root, on_complete)
+        if args.clear_design:
+            replay([{'request': {'command': 'delete_all_features', 'parameters': {}}}], make_transport, speed=None, timeout=args.timeout)
+        report = replay(entries, make_transport, speed=args.speed, max_in_flight=args.max_in_flight,
+                        timeout=args.timeout, keep_trace=args.keep_trace)
+    finally:
+        if addin: addin.stop()
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report['timeouts'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""
+Fusion 360 の adsk パッケージの代替 (Fusion 外でのベンチマーク・動作確認用)。
+tools/fake_adsk を sys.path の先頭に追加すると `import adsk.core, adsk.fusion` がこのパッケージを読み込みます。
+シミュレーションの設定は adsk.simulation を参照してください。
+"""
+from . import simulation
+from . import core
+from . import fusion
+
+def doEvents():
+    simulation.simulate('doEvents')
+    return True
+
+def terminate():
+    return True
+
+def autoTerminate(value):
+    return True
@@ -0,0 +1,527 @@
+"""
+adsk.core の最小限の代替実装 (Fusion 外でのベンチマーク・動作確認用)。
+fusion_mcp_server.py が使用する範囲の幾何クラス、コレクション、アプリケーション/UI、
+カスタムイベントを模倣します。単位は Fusion と同じく cm / ラジアンです。
+"""
+import math
+import itertools
+
+from . import simulation
+
+# --- 幾何 ---
+class Point3D:
+    __slots__ = ('x', 'y', 'z')
+    objectType = 'adsk::core::Point3D'
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Point3D(x, y, z)
+
+    @staticmethod
+    def classType():
+        return Point3D.objectType
+
+    def asArray(self):
+        return [self.x, self.y, self.z]
+
+    def copy(self):
+        return Point3D(self.x, self.y, self.z)
+
+    def vectorTo(self, other):
+        return Vector3D(other.x - self.x, other.y - self.y, other.z - self.z)
+
+    def distanceTo(self, other):
+        return math.sqrt((other.x - self.x) ** 2 + (other.y - self.y) ** 2 + (other.z - self.z) ** 2)
+
+    def isEqualTo(self, other):
+        return self.distanceTo(other) < 1e-10
+
+    def translateBy(self, vector):
+        self.x += vector.x
+        self.y += vector.y
+        self.z += vector.z
+        return True
+
+    def transformBy(self, matrix):
+        self.x, self.y, self.z = matrix.apply_point((self.x, self.y, self.z))
+        return True
+
+    def __repr__(self):
+        return f"Point3D({self.x:g}, {self.y:g}, {self.z:g})"
+
+class Vector3D:
+    __slots__ = ('x', 'y', 'z')
+    objectType = 'adsk::core::Vector3D'
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Vector3D(x, y, z)
+
+    @staticmethod
+    def classType():
+        return Vector3D.objectType
+
+    @property
+    def length(self):
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def asArray(self):
+        return [self.x, self.y, self.z]
+
+    def asPoint(self):
+        return Point3D(self.x, self.y, self.z)
+
+    def copy(self):
+        return Vector3D(self.x, self.y, self.z)
+
+    def normalize(self):
+        length = self.length
+        if length < 1e-15:
+            return False
+        self.x, self.y, self.z = self.x / length, self.y / length, self.z / length
+        return True
+
+    def scaleBy(self, scale):
+        self.x, self.y, self.z = self.x * scale, self.y * scale, self.z * scale
+        return True
+
+    def add(self, other):
+        self.x, self.y, self.z = self.x + other.x, self.y + other.y, self.z + other.z
+        return True
+
+    def subtract(self, other):
+        self.x, self.y, self.z = self.x - other.x, self.y - other.y, self.z - other.z
+        return True
+
+    def dotProduct(self, other):
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def crossProduct(self, other):
+        return Vector3D(self.y * other.z - self.z * other.y,
+                        self.z * other.x - self.x * other.z,
+                        self.x * other.y - self.y * other.x)
+
+    def angleTo(self, other):
+        denominator = self.length * other.length
+        if denominator < 1e-15:
+            return 0.0
+        return math.acos(max(-1.0, min(1.0, self.dotProduct(other) / denominator)))
+
+    def isParallelTo(self, other):
+        return abs(abs(math.cos(self.angleTo(other))) - 1) < 1e-9
+
+    def transformBy(self, matrix):
+        self.x, self.y, self.z = matrix.apply_vector((self.x, self.y, self.z))
+        return True
+
+    def __repr__(self):
+        return f"Vector3D({self.x:g}, {self.y:g}, {self.z:g})"
+
+class Matrix3D:
+    """4x4 の同次変換行列 (行優先、平行移動は第4列)。"""
+    objectType = 'adsk::core::Matrix3D'
+
+    def __init__(self, rows=None):
+        self.rows = [list(r) for r in rows] if rows else [[1.0 if i == j else 0.0 for j in range(4)] for i in range(4)]
+
+    @staticmethod
+    def create():
+        return Matrix3D()
+
+    @staticmethod
+    def classType():
+        return Matrix3D.objectType
+
+    def copy(self):
+        return Matrix3D(self.rows)
+
+    @property
+    def translation(self):
+        return Vector3D(self.rows[0][3], self.rows[1][3], self.rows[2][3])
+
+    @translation.setter
+    def translation(self, vector):
+        self.rows[0][3], self.rows[1][3], self.rows[2][3] = vector.x, vector.y, vector.z
+
+    def setWithCoordinateSystem(self, origin, xAxis, yAxis, zAxis):
+        self.rows = [[xAxis.x, yAxis.x, zAxis.x, origin.x],
+                     [xAxis.y, yAxis.y, zAxis.y, origin.y],
+                     [xAxis.z, yAxis.z, zAxis.z, origin.z],
+                     [0.0, 0.0, 0.0, 1.0]]
+        return True
+
+    def getAsCoordinateSystem(self):
+        r = self.rows
+        return (Point3D(r[0][3], r[1][3], r[2][3]), Vector3D(r[0][0], r[1][0], r[2][0]),
+                Vector3D(r[0][1], r[1][1], r[2][1]), Vector3D(r[0][2], r[1][2], r[2][2]))
+
+    def setToRotation(self, angle, axis, origin):
+        """origin を通る axis まわりの angle (ラジアン) の回転に設定します。"""
+        ux, uy, uz = axis.x, axis.y, axis.z
+        length = math.sqrt(ux * ux + uy * uy + uz * uz)
+        ux, uy, uz = ux / length, uy / length, uz / length
+        c, s = math.cos(angle), math.sin(angle)
+        t = 1 - c
+        r = [[t * ux * ux + c, t * ux * uy - s * uz, t * ux * uz + s * uy],
+             [t * ux * uy + s * uz, t * uy * uy + c, t * uy * uz - s * ux],
+             [t * ux * uz - s * uy, t * uy * uz + s * ux, t * uz * uz + c]]
+        o = (origin.x, origin.y, origin.z)
+        self.rows = [r[i] + [o[i] - sum(r[i][j] * o[j] for j in range(3))] for i in range(3)] + [[0.0, 0.0, 0.0, 1.0]]
+        return True
+
+    def transformBy(self, matrix):
+        """この行列の後に matrix を適用する変換に置き換えます (self = matrix * self)。"""
+        a, b = matrix.rows, self.rows
+        self.rows = [[sum(a[i][k] * b[k][j] for k in range(4)) for j in range(4)] for i in range(4)]
+        return True
+
+    def apply_point(self, p):
+        r = self.rows
+        return tuple(r[i][0] * p[0] + r[i][1] * p[1] + r[i][2] * p[2] + r[i][3] for i in range(3))
+
+    def apply_vector(self, v):
+        r = self.rows
+        return tuple(r[i][0] * v[0] + r[i][1] * v[1] + r[i][2] * v[2] for i in range(3))
+
+class BoundingBox3D:
+    objectType = 'adsk::core::BoundingBox3D'
+
+    def __init__(self, minPoint, maxPoint):
+        self.minPoint = minPoint
+        self.maxPoint = maxPoint
+
+    @staticmethod
+    def create(minPoint, maxPoint):
+        return BoundingBox3D(minPoint.copy(), maxPoint.copy())
+
+    @staticmethod
+    def from_points(points):
+        xs, ys, zs = zip(*points)
+        return BoundingBox3D(Point3D(min(xs), min(ys), min(zs)), Point3D(max(xs), max(ys), max(zs)))
+
+    def contains(self, point):
+        return (self.minPoint.x <= point.x <= self.maxPoint.x and self.minPoint.y <= point.y <= self.maxPoint.y
+                and self.minPoint.z <= point.z <= self.maxPoint.z)
+
+class _Geometry:
+    """classType() / objectType を持つ幾何クラスの共通部分。"""
+    @classmethod
+    def classType(cls):
+        return f"adsk::core::{cls.__name__}"
+
+    @property
+    def objectType(self):
+        return type(self).classType()
+
+class Curve3DTypes:
+    Line3DCurveType = 0
+    Arc3DCurveType = 1
+    Circle3DCurveType = 2
+    Ellipse3DCurveType = 3
+    EllipticalArc3DCurveType = 4
+    InfiniteLine3DCurveType = 5
+    NurbsCurve3DCurveType = 6
+
+class SurfaceTypes:
+    PlaneSurfaceType = 0
+    CylinderSurfaceType = 1
+    ConeSurfaceType = 2
+    SphereSurfaceType = 3
+    TorusSurfaceType = 4
+    EllipticalCylinderSurfaceType = 5
+    EllipticalConeSurfaceType = 6
+    NurbsSurfaceType = 7
+
+class Plane(_Geometry):
+    surfaceType = SurfaceTypes.PlaneSurfaceType
+
+    def __init__(self, origin, normal):
+        self.origin = origin
+        self.normal = normal.copy()
+        self.normal.normalize()
+
+    @staticmethod
+    def create(origin, normal):
+        return Plane(origin.copy(), normal)
+
+class Cylinder(_Geometry):
+    surfaceType = SurfaceTypes.CylinderSurfaceType
+
+    def __init__(self, origin, axis, radius):
+        self.origin, self.axis, self.radius = origin, axis, radius
+
+    @staticmethod
+    def create(origin, axis, radius):
+        return Cylinder(origin.copy(), axis.copy(), radius)
+
+class Cone(_Geometry):
+    surfaceType = SurfaceTypes.ConeSurfaceType
+
+    def __init__(self, origin, axis, radius, halfAngle):
+        self.origin, self.axis, self.radius, self.halfAngle = origin, axis, radius, halfAngle
+
+    @staticmethod
+    def create(origin, axis, radius, halfAngle):
+        return Cone(origin.copy(), axis.copy(), radius, halfAngle)
+
+class Sphere(_Geometry):
+    surfaceType = SurfaceTypes.SphereSurfaceType
+
+    def __init__(self, origin, radius):
+        self.origin, self.radius = origin, radius
+
+    @staticmethod
+    def create(origin, radius):
+        return Sphere(origin.copy(), radius)
+
+class Torus(_Geometry):
+    surfaceType = SurfaceTypes.TorusSurfaceType
+
+    def __init__(self, origin, axis, majorRadius, minorRadius):
+        self.origin, self.axis, self.majorRadius, self.minorRadius = origin, axis, majorRadius, minorRadius
+
+class Line3D(_Geometry):
+    curveType = Curve3DTypes.Line3DCurveType
+
+    def __init__(self, startPoint, endPoint):
+        self.startPoint, self.endPoint = startPoint, endPoint
+
+    @staticmethod
+    def create(startPoint, endPoint):
+        return Line3D(startPoint.copy(), endPoint.copy())
+
+class InfiniteLine3D(_Geometry):
+    curveType = Curve3DTypes.InfiniteLine3DCurveType
+
+    def __init__(self, origin, direction):
+        self.origin, self.direction = origin, direction
+
+    @staticmethod
+    def create(origin, direction):
+        return InfiniteLine3D(origin.copy(), direction.copy())
+
+class Circle3D(_Geometry):
+    curveType = Curve3DTypes.Circle3DCurveType
+
+    def __init__(self, center, normal, radius):
+        self.center, self.normal, self.radius = center, normal, radius
+
+    @staticmethod
+    def createByCenter(center, normal, radius):
+        return Circle3D(center.copy(), normal.copy(), radius)
+
+class Arc3D(_Geometry):
+    curveType = Curve3DTypes.Arc3DCurveType
+
+    def __init__(self, center, normal, radius, startAngle, endAngle):
+        self.center, self.normal, self.radius = center, normal, radius
+        self.startAngle, self.endAngle = startAngle, endAngle
+
+# --- コレクション・入力値 ---
+class ObjectCollection:
+    objectType = 'adsk::core::ObjectCollection'
+
+    def __init__(self, items=None):
+        self._items = list(items or [])
+
+    @staticmethod
+    def create():
+        return ObjectCollection()
+
+    @staticmethod
+    def createWithArray(items):
+        return ObjectCollection(items)
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index]
+
+    def add(self, item):
+        if item in self._items:
+            return False
+        self._items.append(item)
+        return True
+
+    def removeByIndex(self, index):
+        del self._items[index]
+        return True
+
+    def clear(self):
+        self._items.clear()
+        return True
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+_UNIT_FACTORS = {'mm': 0.1, 'cm': 1.0, 'm': 100.0, 'in': 2.54, 'deg': math.pi / 180, 'rad': 1.0, '': 1.0}
+
+class ValueInput:
+    """値の入力。文字列は '<数値> <単位>' の形式だけを解釈します (単位は mm / cm / m / in / deg / rad)。"""
+    objectType = 'adsk::core::ValueInput'
+
+    def __init__(self, realValue=None, stringValue=None):
+        self.realValue = realValue
+        self.stringValue = stringValue
+
+    @staticmethod
+    def createByReal(value):
+        return ValueInput(realValue=float(value))
+
+    @staticmethod
+    def createByString(expression):
+        text = str(expression).strip()
+        number, _, unit = text.partition(' ')
+        if unit.strip() not in _UNIT_FACTORS:
+            raise ValueError(f"fake adsk: unsupported value expression '{expression}'")
+        return ValueInput(realValue=float(number) * _UNIT_FACTORS[unit.strip()], stringValue=text)
+
+    @property
+    def value(self):
+        return self.realValue
+
+class DefaultModelingOrientations:
+    YUpModelingOrientation = 0
+    ZUpModelingOrientation = 1
+
+# --- イベント ---
+class _EventHandlerBase:
+    def __init__(self):
+        pass
+
+    def notify(self, args):
+        pass
+
+class CustomEventHandler(_EventHandlerBase):
+    pass
+
+class CommandEventHandler(_EventHandlerBase):
+    pass
+
+class CommandCreatedEventHandler(_EventHandlerBase):
+    pass
+
+class CustomEventArgs:
+    def __init__(self, additionalInfo=''):
+        self.additionalInfo = additionalInfo
+
+class CustomEvent:
+    def __init__(self, event_id):
+        self.eventId = event_id
+        self._handlers = []
+
+    def add(self, handler):
+        self._handlers.append(handler)
+        return True
+
+    def remove(self, handler):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+            return True
+        return False
+
+# --- アプリケーション / UI ---
+class TextCommandPalette:
+    def __init__(self):
+        self.lines = []
+        self.writes = 0
+
+    def writeText(self, text):
+        self.writes += 1
+        self.lines.append(text)
+        del self.lines[:-1000]
+        return True
+
+class _Palettes:
+    def __init__(self):
+        self._text = TextCommandPalette()
+
+    def itemById(self, palette_id):
+        return self._text if palette_id == 'TextCommands' else None
+
+class _Selections(ObjectCollection):
+    pass
+
+class UserInterface:
+    def __init__(self):
+        self.palettes = _Palettes()
+        self.activeSelections = _Selections()
+        self.messages = []
+
+    def messageBox(self, text, title='', *args):
+        self.messages.append(text)
+        return 0
+
+class _Viewport:
+    def refresh(self):
+        return True
+
+class Application:
+    """
+    Fusion の Application の代替。fireCustomEvent は別スレッドから呼ばれても安全なようにキューへ積むだけで、
+    simulation.pump_events() を呼んだスレッドでハンドラーを実行します (メインスレッドの模倣)。
+    """
+    _instance = None
+
+    def __init__(self):
+        self.userInterface = UserInterface()
+        self.activeViewport = _Viewport()
+        self._events = {}
+        self._document = None
+        self._design = None
+
+    @staticmethod
+    def get():
+        if Application._instance is None:
+            Application._instance = Application()
+            simulation.reset()
+        return Application._instance
+
+    @property
+    def activeDocument(self):
+        return self._document
+
+    @property
+    def activeProduct(self):
+        return self._design
+
+    @property
+    def measureManager(self):
+        from . import fusion
+        return fusion.MeasureManager()
+
+    def registerCustomEvent(self, event_id):
+        event = self._events.setdefault(event_id, CustomEvent(event_id))
+        return event
+
+    def unregisterCustomEvent(self, event_id):
+        return self._events.pop(event_id, None) is not None
+
+    def fireCustomEvent(self, event_id, additionalInfo=''):
+        if event_id not in self._events:
+            return False
+        simulation.post_event(event_id, additionalInfo)
+        return True
+
+    def dispatch_event(self, event_id, additionalInfo):
+        event = self._events.get(event_id)
+        if event is None:
+            return
+        for handler in list(event._handlers):
+            handler.notify(CustomEventArgs(additionalInfo))
+
+_token_counter = itertools.count(1)
+
+def next_entity_token(prefix: str) -> str:
+    return f"{prefix}:{next(_token_counter)}"
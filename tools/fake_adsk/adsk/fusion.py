@@ -0,0 +1,1261 @@
+"""
+adsk.fusion の最小限の代替実装 (Fusion 外でのベンチマーク・動作確認用)。
+
+モデル化している範囲:
+- デザイン / ルートコンポーネント / タイムライン / 構築平面・軸
+- スケッチ (長方形・円・閉じた折れ線の断面) とプロファイル
+- 押し出し (開始オフセット・片側/負方向・テーパー)、移動、ミラー、矩形/円形パターン
+- 押し出しボディの面・エッジ (平面・円柱・円錐、直線・円)、バウンディングボックス、物理プロパティ、点の内外判定
+- 一時BRepの平面交差 (押し出し軸に垂直な断面のみ正確、それ以外はバウンディングボックスで近似)
+- 一時BRepのコピーと積演算 (軸に平行な直方体同士は厳密、それ以外は格子点での体積近似)
+- 最小距離 (軸に平行な直方体同士は入れ子を含めて厳密、それ以外はバウンディングボックス間の距離)
+- フィレット・面取りはタイムラインにのみ記録し、形状は変えません
+
+回転 (revolve)・スイープ・ブーリアン結合 (フィーチャー)・一時BRepの和/差・レイキャストはモデル化していません (NotImplementedError)。
+各操作は simulation.simulate() を通り、設定された擬似遅延と呼び出し回数が記録されます。
+"""
+import math
+import itertools
+
+from . import core, simulation
+
+_CIRCLE_SAMPLES = 64
+_BOOLEAN_GRID = 24  # 積演算の体積近似に使う格子の1辺の分割数
+_TOLERANCE = 1e-9
+
+# --- 列挙型 ---
+class FeatureOperations:
+    JoinFeatureOperation = 0
+    CutFeatureOperation = 1
+    IntersectFeatureOperation = 2
+    NewBodyFeatureOperation = 3
+    NewComponentFeatureOperation = 4
+
+class ExtentDirections:
+    PositiveExtentDirection = 0
+    NegativeExtentDirection = 1
+    SymmetricExtentDirection = 2
+
+class PatternDistanceType:
+    ExtentPatternDistanceType = 0
+    SpacingPatternDistanceType = 1
+
+class CalculationAccuracy:
+    LowCalculationAccuracy = 0
+    MediumCalculationAccuracy = 1
+    HighCalculationAccuracy = 2
+    VeryHighCalculationAccuracy = 3
+
+class BooleanTypes:
+    DifferenceBooleanType = 0
+    IntersectionBooleanType = 1
+    UnionBooleanType = 2
+
+class PointContainment:
+    PointInsidePointContainment = 0
+    PointOnPointContainment = 1
+    PointOutsidePointContainment = 2
+    UnknownPointContainment = 3
+
+class BRepEntityTypes:
+    BRepBodyEntityType = 0
+    BRepEdgeEntityType = 1
+    BRepFaceEntityType = 2
+    BRepVertexEntityType = 3
+
+class ChainedCurveOptions:
+    noChainedCurves = 0
+    connectedChainedCurves = 1
+    tangentChainedCurves = 2
+
+class DistanceExtentDefinition:
+    def __init__(self, distance):
+        self.distance = distance
+
+    @staticmethod
+    def create(distance):
+        return DistanceExtentDefinition(distance)
+
+class OffsetStartDefinition:
+    def __init__(self, offset):
+        self.offset = offset
+
+    @staticmethod
+    def create(offset):
+        return OffsetStartDefinition(offset)
+
+class Path:
+    @staticmethod
+    def create(curves, chainOptions):
+        raise NotImplementedError("fake adsk: Path (sweep) is not modelled")
+
+def _class_type(name):
+    return f"adsk::fusion::{name}"
+
+# --- ベクトル演算 (タプル) ---
+def _add(a, b): return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+def _sub(a, b): return (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+def _scale(a, s): return (a[0] * s, a[1] * s, a[2] * s)
+def _dot(a, b): return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+def _cross(a, b): return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+def _norm(a): return math.sqrt(_dot(a, a))
+
+def _unit(a):
+    length = _norm(a)
+    return _scale(a, 1 / length) if length > 0 else a
+
+def _point(p): return core.Point3D(*p)
+def _vector(v): return core.Vector3D(*v)
+
+def _bbox(points):
+    return core.BoundingBox3D.from_points(points)
+
+# --- 断面ループ (スケッチ座標) ---
+class _Loop:
+    """
+    閉じた断面。kind は 'polygon' (凸多角形、反時計回りの頂点列) または 'circle'。
+    offset(d) は外側へ d だけオフセットしたループを返します (テーパー押し出し用)。
+    """
+    def __init__(self, kind, points=None, center=None, radius=0.0):
+        self.kind = kind
+        if kind == 'polygon':
+            area2 = sum(points[i][0] * points[(i + 1) % len(points)][1] - points[(i + 1) % len(points)][0] * points[i][1]
+                        for i in range(len(points)))
+            self.points = list(points) if area2 >= 0 else list(reversed(points))
+            n = len(self.points)
+            self.center = (sum(p[0] for p in self.points) / n, sum(p[1] for p in self.points) / n)
+        else:
+            self.points = None
+            self.center = center
+        self.radius = radius
+
+    def offset(self, distance):
+        if abs(distance) < _TOLERANCE:
+            return self
+        if self.kind == 'circle':
+            return _Loop('circle', center=self.center, radius=max(0.0, self.radius + distance))
+        points = self.points
+        n = len(points)
+        normals = []
+        for i in range(n):
+            (x1, y1), (x2, y2) = points[i], points[(i + 1) % n]
+            length = math.hypot(x2 - x1, y2 - y1)
+            normals.append(((y2 - y1) / length, -(x2 - x1) / length))
+        moved = []
+        for i in range(n):
+            (ax, ay), (bx, by) = normals[i - 1], normals[i]
+            factor = distance / (1 + ax * bx + ay * by)
+            moved.append((points[i][0] + (ax + bx) * factor, points[i][1] + (ay + by) * factor))
+        return _Loop('polygon', moved)
+
+    @property
+    def area(self):
+        if self.kind == 'circle':
+            return math.pi * self.radius ** 2
+        points = self.points
+        return abs(sum(points[i][0] * points[(i + 1) % len(points)][1] - points[(i + 1) % len(points)][0] * points[i][1]
+                       for i in range(len(points)))) / 2
+
+    @property
+    def perimeter(self):
+        if self.kind == 'circle':
+            return 2 * math.pi * self.radius
+        points = self.points
+        return sum(math.hypot(points[(i + 1) % len(points)][0] - p[0], points[(i + 1) % len(points)][1] - p[1])
+                   for i, p in enumerate(points))
+
+    def samples(self):
+        if self.kind == 'polygon':
+            return self.points
+        cx, cy = self.center
+        return [(cx + self.radius * math.cos(2 * math.pi * i / _CIRCLE_SAMPLES),
+                 cy + self.radius * math.sin(2 * math.pi * i / _CIRCLE_SAMPLES)) for i in range(_CIRCLE_SAMPLES)]
+
+    def bounds(self):
+        xs, ys = zip(*self.samples())
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def contains(self, u, v, tolerance=1e-7):
+        """(u, v) が内側なら 1、境界上なら 0、外側なら -1。"""
+        if self.kind == 'circle':
+            d = math.hypot(u - self.center[0], v - self.center[1]) - self.radius
+        else:
+            points = self.points
+            d = -math.inf
+            for i in range(len(points)):
+                (x1, y1), (x2, y2) = points[i], points[(i + 1) % len(points)]
+                length = math.hypot(x2 - x1, y2 - y1)
+                d = max(d, ((u - x1) * (y2 - y1) - (v - y1) * (x2 - x1)) / length)
+        if d < -tolerance: return 1
+        if d <= tolerance: return 0
+        return -1
+
+# --- 押し出し形状 ---
+class _Prism:
+    """
+    スケッチ座標系 (origin, ex, ey, n) 上のループを法線方向に t0 から t1 まで押し出した形状。
+    growth は t0 からの距離1あたりのオフセット量 (テーパー)。matrix は作成後に適用された配置変換です。
+    """
+    def __init__(self, loop, origin, ex, ey, n, t0, t1, growth, matrix=None):
+        self.loop = loop
+        self.origin, self.ex, self.ey, self.n = origin, ex, ey, n
+        self.t0, self.t1, self.growth = t0, t1, growth
+        self.matrix = matrix or core.Matrix3D()
+
+    def copy(self, matrix=None):
+        return _Prism(self.loop, self.origin, self.ex, self.ey, self.n, self.t0, self.t1, self.growth,
+                      (matrix or self.matrix).copy())
+
+    def loop_at(self, t):
+        return self.loop.offset(self.growth * abs(t - self.t0))
+
+    def local_to_world(self, u, v, t):
+        o, ex, ey, n = self.origin, self.ex, self.ey, self.n
+        p = (o[0] + u * ex[0] + v * ey[0] + t * n[0], o[1] + u * ex[1] + v * ey[1] + t * n[1], o[2] + u * ex[2] + v * ey[2] + t * n[2])
+        return self.matrix.apply_point(p)
+
+    def world_direction(self, d):
+        return _unit(self.matrix.apply_vector(d))
+
+    def world_to_local(self, p):
+        """配置変換は直交変換 (回転・鏡映・平行移動) なので転置で逆変換します。"""
+        r = self.matrix.rows
+        q = (p[0] - r[0][3], p[1] - r[1][3], p[2] - r[2][3])
+        q = (r[0][0] * q[0] + r[1][0] * q[1] + r[2][0] * q[2],
+             r[0][1] * q[0] + r[1][1] * q[1] + r[2][1] * q[2],
+             r[0][2] * q[0] + r[1][2] * q[1] + r[2][2] * q[2])
+        d = _sub(q, self.origin)
+        return _dot(d, self.ex), _dot(d, self.ey), _dot(d, self.n)
+
+    def sample_points(self):
+        points = []
+        for t in (self.t0, self.t1):
+            points.extend(self.local_to_world(u, v, t) for u, v in self.loop_at(t).samples())
+        return points
+
+    def section_area(self, t):
+        return self.loop_at(t).area
+
+    def volume_and_axial_centroid(self):
+        # 断面積は t の2次式なので Simpson 則で厳密に積分できる
+        t0, t1 = self.t0, self.t1
+        tm = (t0 + t1) / 2
+        a0, am, a1 = self.section_area(t0), self.section_area(tm), self.section_area(t1)
+        length = abs(t1 - t0)
+        volume = length / 6 * (a0 + 4 * am + a1)
+        moment = length / 6 * (a0 * t0 + 4 * am * tm + a1 * t1)
+        return volume, (moment / volume if volume > 0 else tm)
+
+    def surface_area(self):
+        bottom, top = self.loop_at(self.t0), self.loop_at(self.t1)
+        length = abs(self.t1 - self.t0)
+        slant = math.hypot(length, self.growth * length)
+        return bottom.area + top.area + (bottom.perimeter + top.perimeter) / 2 * slant
+
+    def contains(self, p, tolerance=1e-7):
+        u, v, t = self.world_to_local(p)
+        lo, hi = min(self.t0, self.t1), max(self.t0, self.t1)
+        if t < lo - tolerance or t > hi + tolerance:
+            return -1
+        inside = self.loop_at(min(max(t, lo), hi)).contains(u, v, tolerance)
+        if inside == 1 and (t < lo + tolerance or t > hi - tolerance):
+            return 0
+        return inside
+
+    def bounds(self):
+        points = self.sample_points()
+        return (tuple(min(p[i] for p in points) for i in range(3)), tuple(max(p[i] for p in points) for i in range(3)))
+
+    def is_axis_aligned_box(self):
+        """バウンディングボックスを隙間なく満たしていれば、軸に平行な直方体とみなします。"""
+        lo, hi = self.bounds()
+        box_volume = (hi[0] - lo[0]) * (hi[1] - lo[1]) * (hi[2] - lo[2])
+        return abs(box_volume - self.volume_and_axial_centroid()[0]) <= 1e-9 * max(1.0, box_volume)
+
+    def build_topology(self, body):
+        """(面のリスト, エッジのリスト) を作成します。"""
+        bottom, top = self.loop_at(self.t0), self.loop_at(self.t1)
+        volume, axial = self.volume_and_axial_centroid()
+        center = self.local_to_world(self.loop.center[0], self.loop.center[1], axial)
+        faces, edges = [], []
+
+        def add_face(geometry, area, points, outward):
+            face = BRepFace(body, len(faces), geometry, area, points, outward)
+            faces.append(face)
+            return face
+
+        def add_edge(geometry, length, points, face_list):
+            edge = BRepEdge(body, len(edges), geometry, length, points, face_list)
+            edges.append(edge)
+            for face in face_list:
+                face._edge_indices.append(edge._index)
+            return edge
+
+        def cap(loop, t):
+            points = [self.local_to_world(u, v, t) for u, v in loop.samples()]
+            centroid = self.local_to_world(loop.center[0], loop.center[1], t)
+            normal = self.world_direction(self.n)
+            if _dot(normal, _sub(centroid, center)) < 0:
+                normal = _scale(normal, -1)
+            return add_face(core.Plane(_point(centroid), _vector(normal)), loop.area, points, normal), points
+
+        bottom_face, bottom_points = cap(bottom, self.t0)
+        top_face, top_points = cap(top, self.t1)
+        length = abs(self.t1 - self.t0)
+        if self.loop.kind == 'circle':
+            axis = self.world_direction(self.n)
+            base = self.local_to_world(bottom.center[0], bottom.center[1], self.t0)
+            slant = math.hypot(length, top.radius - bottom.radius)
+            if abs(top.radius - bottom.radius) < _TOLERANCE:
+                geometry = core.Cylinder(_point(base), _vector(axis), bottom.radius)
+            else:
+                geometry = core.Cone(_point(base), _vector(axis), bottom.radius, math.atan2(abs(top.radius - bottom.radius), length))
+            side = add_face(geometry, math.pi * (bottom.radius + top.radius) * slant, bottom_points + top_points, None)
+            for face, loop, t, points in ((bottom_face, bottom, self.t0, bottom_points), (top_face, top, self.t1, top_points)):
+                circle = core.Circle3D(_point(self.local_to_world(loop.center[0], loop.center[1], t)), _vector(axis), loop.radius)
+                add_edge(circle, 2 * math.pi * loop.radius, points, [face, side])
+            return faces, edges
+
+        count = len(bottom_points)
+        sides = []
+        for i in range(count):
+            j = (i + 1) % count
+            quad = [bottom_points[i], bottom_points[j], top_points[j], top_points[i]]
+            normal = _unit(_cross(_sub(quad[1], quad[0]), _sub(quad[3], quad[0])))
+            mid = _scale(_add(_add(quad[0], quad[1]), _add(quad[2], quad[3])), 0.25)
+            if _dot(normal, _sub(mid, center)) < 0:
+                normal = _scale(normal, -1)
+            bottom_len = math.dist(quad[0], quad[1])
+            top_len = math.dist(quad[2], quad[3])
+            slant = _norm(_sub(_scale(_add(quad[2], quad[3]), 0.5), _scale(_add(quad[0], quad[1]), 0.5)))
+            sides.append(add_face(core.Plane(_point(mid), _vector(normal)), (bottom_len + top_len) / 2 * slant, quad, normal))
+        for i in range(count):
+            j = (i + 1) % count
+            add_edge(core.Line3D(_point(bottom_points[i]), _point(bottom_points[j])), math.dist(bottom_points[i], bottom_points[j]),
+                     [bottom_points[i], bottom_points[j]], [bottom_face, sides[i]])
+        for i in range(count):
+            j = (i + 1) % count
+            add_edge(core.Line3D(_point(top_points[i]), _point(top_points[j])), math.dist(top_points[i], top_points[j]),
+                     [top_points[i], top_points[j]], [top_face, sides[i]])
+        for i in range(count):
+            add_edge(core.Line3D(_point(bottom_points[i]), _point(top_points[i])), math.dist(bottom_points[i], top_points[i]),
+                     [bottom_points[i], top_points[i]], [sides[i - 1], sides[i]])
+        return faces, edges
+
+# --- BRep ---
+class _EntityList:
+    """count / item / 反復に対応した読み取り専用のコレクション。"""
+    def __init__(self, items):
+        self._items = items
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+class _FaceEvaluator:
+    def __init__(self, face):
+        self._face = face
+
+    def getNormalAtPoint(self, point):
+        face = self._face
+        if face._outward is not None:
+            return True, _vector(face._outward)
+        geometry = face.geometry
+        axis = (geometry.axis.x, geometry.axis.y, geometry.axis.z)
+        d = _sub((point.x, point.y, point.z), (geometry.origin.x, geometry.origin.y, geometry.origin.z))
+        return True, _vector(_unit(_sub(d, _scale(axis, _dot(d, axis)))))
+
+class BRepFace:
+    objectType = _class_type('BRepFace')
+
+    def __init__(self, body, index, geometry, area, points, outward):
+        self.body = body
+        self._index = index
+        self.geometry = geometry
+        self.area = area
+        self._points = points
+        self._outward = outward
+        self._edge_indices = []
+
+    @staticmethod
+    def classType():
+        return BRepFace.objectType
+
+    @property
+    def isValid(self):
+        return self.body.isValid
+
+    @property
+    def entityToken(self):
+        return f"{self.body.entityToken}/f{self._index}"
+
+    @property
+    def boundingBox(self):
+        return _bbox(self._points)
+
+    @property
+    def pointOnFace(self):
+        if isinstance(self.geometry, core.Plane):
+            return self.geometry.origin.copy()
+        return _point(self._points[0])
+
+    @property
+    def evaluator(self):
+        return _FaceEvaluator(self)
+
+    @property
+    def edges(self):
+        edges = self.body._topology()[1]
+        return _EntityList([edges[i] for i in self._edge_indices])
+
+class BRepEdge:
+    objectType = _class_type('BRepEdge')
+
+    def __init__(self, body, index, geometry, length, points, faces):
+        self.body = body
+        self._index = index
+        self.geometry = geometry
+        self.length = length
+        self._points = points
+        self._faces = faces
+
+    @staticmethod
+    def classType():
+        return BRepEdge.objectType
+
+    @property
+    def isValid(self):
+        return self.body.isValid
+
+    @property
+    def entityToken(self):
+        return f"{self.body.entityToken}/e{self._index}"
+
+    @property
+    def boundingBox(self):
+        return _bbox(self._points)
+
+    @property
+    def faces(self):
+        return _EntityList(self._faces)
+
+class PhysicalProperties:
+    def __init__(self, body):
+        volume, axial = body._shape.volume_and_axial_centroid()
+        loop_center = body._shape.loop.center
+        self.volume = volume
+        self.area = body._shape.surface_area()
+        self.density = 1.0
+        self.mass = volume * self.density
+        self.centerOfMass = _point(body._shape.local_to_world(loop_center[0], loop_center[1], axial))
+        bbox = body.boundingBox
+        a = bbox.maxPoint.x - bbox.minPoint.x
+        b = bbox.maxPoint.y - bbox.minPoint.y
+        c = bbox.maxPoint.z - bbox.minPoint.z
+        # 直方体近似の慣性モーメント (kg·cm² ではなく g·cm²)
+        self.principalMomentsOfInertia = core.Vector3D(self.mass * (b * b + c * c) / 12, self.mass * (a * a + c * c) / 12,
+                                                       self.mass * (a * a + b * b) / 12)
+
+    def getXYZMomentsOfInertia(self):
+        m = self.principalMomentsOfInertia
+        return True, m.x, m.y, m.z, 0.0, 0.0, 0.0
+
+    def getPrincipalMomentsOfInertia(self):
+        m = self.principalMomentsOfInertia
+        return True, m.x, m.y, m.z
+
+class BRepBody:
+    objectType = _class_type('BRepBody')
+
+    def __init__(self, component, shape, name):
+        self.parentComponent = component
+        self._shape = shape
+        self._name = name
+        self.entityToken = core.next_entity_token('body')
+        self.isValid = True
+        self.isVisible = True
+        self.isSolid = True
+        self._cache = None
+        self._revision = 0
+
+    @staticmethod
+    def classType():
+        return BRepBody.objectType
+
+    @property
+    def revisionId(self):
+        return f'{self.entityToken}/{self._revision}'
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self.parentComponent.bRepBodies._rename(self, self._name, value)
+        self._name = value
+
+    def _invalidate(self):
+        self._cache = None
+        self._revision += 1
+
+    def _topology(self):
+        if self._cache is None:
+            self._cache = self._shape.build_topology(self)
+        return self._cache
+
+    @property
+    def boundingBox(self):
+        return _bbox(self._shape.sample_points())
+
+    @property
+    def faces(self):
+        return _EntityList(self._topology()[0])
+
+    @property
+    def edges(self):
+        return _EntityList(self._topology()[1])
+
+    @property
+    def volume(self):
+        return self._shape.volume_and_axial_centroid()[0]
+
+    @property
+    def area(self):
+        return self._shape.surface_area()
+
+    @property
+    def physicalProperties(self):
+        simulation.simulate('physicalProperties')
+        return PhysicalProperties(self)
+
+    def getPhysicalProperties(self, accuracy=CalculationAccuracy.LowCalculationAccuracy):
+        simulation.simulate('physicalProperties')
+        return PhysicalProperties(self)
+
+    def pointContainment(self, point):
+        result = self._shape.contains((point.x, point.y, point.z))
+        if result > 0: return PointContainment.PointInsidePointContainment
+        if result == 0: return PointContainment.PointOnPointContainment
+        return PointContainment.PointOutsidePointContainment
+
+    def deleteMe(self):
+        if not self.isValid:
+            return False
+        self.parentComponent.bRepBodies._remove(self)
+        self.isValid = False
+        return True
+
+    def _transform(self, matrix):
+        combined = self._shape.matrix.copy()
+        combined.transformBy(matrix)
+        self._shape.matrix = combined
+        self._invalidate()
+
+class BRepBodies(_EntityList):
+    def __init__(self):
+        super().__init__([])
+        self._by_name = {}
+
+    def itemByName(self, name):
+        bodies = self._by_name.get(name)
+        return bodies[0] if bodies else None
+
+    def _add(self, body):
+        self._items.append(body)
+        self._by_name.setdefault(body.name, []).append(body)
+
+    def _remove(self, body):
+        self._items.remove(body)
+        self._unindex(body, body.name)
+
+    def _unindex(self, body, name):
+        bodies = self._by_name.get(name)
+        if bodies and body in bodies:
+            bodies.remove(body)
+            if not bodies:
+                del self._by_name[name]
+
+    def _rename(self, body, old, new):
+        if body in self._by_name.get(old, ()):
+            self._unindex(body, old)
+            self._by_name.setdefault(new, []).append(body)
+
+class Occurrences(_EntityList):
+    def __init__(self):
+        super().__init__([])
+
+    def itemByName(self, name):
+        return next((occ for occ in self._items if occ.name == name), None)
+
+# --- スケッチ ---
+class SketchLine:
+    objectType = _class_type('SketchLine')
+
+    def __init__(self, sketch, start, end):
+        self.parentSketch = sketch
+        self.geometry = core.Line3D(_point(start), _point(end))
+        self.isValid = True
+
+class SketchCircle:
+    objectType = _class_type('SketchCircle')
+
+    def __init__(self, sketch, center, radius):
+        self.parentSketch = sketch
+        self.centerSketchPoint = _point(center)
+        self.radius = radius
+        self.isValid = True
+
+class SketchLines:
+    def __init__(self, sketch):
+        self._sketch = sketch
+        self._chain = []
+
+    def addTwoPointRectangle(self, pointOne, pointTwo):
+        x1, y1, x2, y2 = pointOne.x, pointOne.y, pointTwo.x, pointTwo.y
+        corners = [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+        self._sketch._add_loop(_Loop('polygon', corners))
+        return core.ObjectCollection([SketchLine(self._sketch, corners[i] + (0.0,), corners[(i + 1) % 4] + (0.0,)) for i in range(4)])
+
+    def addCenterPointRectangle(self, centerPoint, cornerPoint):
+        dx, dy = cornerPoint.x - centerPoint.x, cornerPoint.y - centerPoint.y
+        return self.addTwoPointRectangle(core.Point3D(centerPoint.x - dx, centerPoint.y - dy),
+                                         core.Point3D(centerPoint.x + dx, centerPoint.y + dy))
+
+    def addByTwoPoints(self, startPoint, endPoint):
+        """連続して描かれた線分が始点に戻ったところで閉じたループとして扱います。"""
+        start, end = (startPoint.x, startPoint.y), (endPoint.x, endPoint.y)
+        if not self._chain or math.dist(self._chain[-1], start) > 1e-9:
+            self._chain = [start]
+        if math.dist(end, self._chain[0]) <= 1e-9 and len(self._chain) >= 3:
+            self._sketch._add_loop(_Loop('polygon', self._chain))
+            self._chain = []
+        else:
+            self._chain.append(end)
+        return SketchLine(self._sketch, start + (0.0,), end + (0.0,))
+
+class SketchCircles:
+    def __init__(self, sketch):
+        self._sketch = sketch
+
+    def addByCenterRadius(self, centerPoint, radius):
+        self._sketch._add_loop(_Loop('circle', center=(centerPoint.x, centerPoint.y), radius=radius))
+        return SketchCircle(self._sketch, (centerPoint.x, centerPoint.y, 0.0), radius)
+
+class SketchCurves:
+    def __init__(self, sketch):
+        self.sketchLines = SketchLines(sketch)
+        self.sketchCircles = SketchCircles(sketch)
+
+    @property
+    def sketchArcs(self):
+        raise NotImplementedError("fake adsk: sketch arcs are not modelled")
+
+class Profile:
+    objectType = _class_type('Profile')
+
+    def __init__(self, sketch, loop):
+        self.parentSketch = sketch
+        self._loop = loop
+        self.isValid = True
+
+class Sketch:
+    objectType = _class_type('Sketch')
+
+    def __init__(self, component, plane_entity):
+        self.parentComponent = component
+        self.referencePlane = plane_entity
+        frame = plane_entity._sketch_frame
+        self.origin = _point(frame[0])
+        self.xDirection = _vector(frame[1])
+        self.yDirection = _vector(frame[2])
+        self.sketchCurves = SketchCurves(self)
+        self.isComputeDeferred = False
+        self.isVisible = True
+        self.isValid = True
+        self.name = f"Sketch{component._next_sketch_number()}"
+        self._loops = []
+
+    @staticmethod
+    def classType():
+        return Sketch.objectType
+
+    def _add_loop(self, loop):
+        self._loops.append(loop)
+
+    @property
+    def profiles(self):
+        return _EntityList([Profile(self, loop) for loop in self._loops])
+
+    def _frame(self):
+        o, x, y = self.origin, self.xDirection, self.yDirection
+        origin, ex, ey = (o.x, o.y, o.z), (x.x, x.y, x.z), (y.x, y.y, y.z)
+        return origin, ex, ey, _cross(ex, ey)
+
+    def sketchToModelSpace(self, point):
+        origin, ex, ey, n = self._frame()
+        return _point(_add(origin, _add(_add(_scale(ex, point.x), _scale(ey, point.y)), _scale(n, point.z))))
+
+    def modelToSketchSpace(self, point):
+        origin, ex, ey, n = self._frame()
+        d = _sub((point.x, point.y, point.z), origin)
+        return core.Point3D(_dot(d, ex), _dot(d, ey), _dot(d, n))
+
+    def deleteMe(self):
+        if not self.isValid:
+            return False
+        self.isValid = False
+        self.parentComponent.sketches._items.remove(self)
+        self.parentComponent.design.timeline._remove(self)
+        return True
+
+class Sketches(_EntityList):
+    def __init__(self, component):
+        super().__init__([])
+        self._component = component
+
+    def add(self, planarEntity):
+        simulation.simulate('sketch.add')
+        sketch = Sketch(self._component, planarEntity)
+        self._items.append(sketch)
+        self._component.design.timeline._append(sketch)
+        return sketch
+
+# --- 構築平面・軸 ---
+class ConstructionPlane:
+    objectType = _class_type('ConstructionPlane')
+
+    def __init__(self, name, origin, x_direction, y_direction):
+        self.name = name
+        self._sketch_frame = (origin, x_direction, y_direction)
+        self.geometry = core.Plane(_point(origin), _vector(_cross(x_direction, y_direction)))
+        self.isValid = True
+
+class ConstructionAxis:
+    objectType = _class_type('ConstructionAxis')
+
+    def __init__(self, name, direction):
+        self.name = name
+        self.geometry = core.InfiniteLine3D(core.Point3D(), _vector(direction))
+        self.isValid = True
+
+# --- フィーチャー ---
+class _GenericInput:
+    """フィレット・面取りなど、形状をモデル化しないフィーチャーの入力。任意の属性設定・メソッド呼び出しを受け付けます。"""
+    def __init__(self, *args):
+        self.args = args
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: True
+
+class Feature:
+    objectType = _class_type('Feature')
+
+    def __init__(self, component, kind, bodies=()):
+        self.parentComponent = component
+        self.kind = kind
+        self.name = f"{kind}{component._next_feature_number()}"
+        self.bodies = _EntityList(list(bodies))
+        self.isValid = True
+
+    def deleteMe(self):
+        """作成したボディを削除し、タイムラインから取り除きます (移動などの変更は元に戻しません)。"""
+        if not self.isValid:
+            return False
+        self.isValid = False
+        for body in self.bodies:
+            body.deleteMe()
+        self.parentComponent.design.timeline._remove(self)
+        return True
+
+class _FeatureCollection:
+    kind = 'Feature'
+    latency_key = 'feature.add'
+
+    def __init__(self, component):
+        self._component = component
+        self._items = []
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def createInput(self, *args):
+        return _GenericInput(*args)
+
+    def _finish(self, bodies=(), items=1):
+        simulation.simulate(self.latency_key, items)
+        feature = Feature(self._component, self.kind, bodies)
+        self._items.append(feature)
+        self._component.design.timeline._append(feature)
+        return feature
+
+    def add(self, input):
+        return self._finish()
+
+class ExtrudeFeatureInput:
+    def __init__(self, profiles, operation):
+        self.profiles = profiles
+        self.operation = operation
+        self.startExtent = None
+        self.taperAngle = None
+        self.isSolid = True
+        self._distance = None
+        self._direction = ExtentDirections.PositiveExtentDirection
+
+    def setDistanceExtent(self, isSymmetric, distance):
+        self._distance = distance
+        self._direction = ExtentDirections.SymmetricExtentDirection if isSymmetric else ExtentDirections.PositiveExtentDirection
+        return True
+
+    def setOneSideExtent(self, extentDefinition, direction, taperAngle=None):
+        self._distance = extentDefinition.distance
+        self._direction = direction
+        if taperAngle is not None:
+            self.taperAngle = taperAngle
+        return True
+
+class ExtrudeFeatures(_FeatureCollection):
+    kind = 'Extrude'
+    latency_key = 'extrude.add'
+
+    def createInput(self, profile, operation):
+        return ExtrudeFeatureInput(profile, operation)
+
+    def add(self, input):
+        if input.operation != FeatureOperations.NewBodyFeatureOperation:
+            raise NotImplementedError("fake adsk: only new-body extrusions are modelled")
+        if input._distance is None:
+            raise RuntimeError("fake adsk: extent is not defined")
+        profiles = [input.profiles] if isinstance(input.profiles, Profile) else list(input.profiles)
+        distance = input._distance.realValue
+        offset = input.startExtent.offset.realValue if isinstance(input.startExtent, OffsetStartDefinition) else 0.0
+        if input._direction == ExtentDirections.SymmetricExtentDirection:
+            t0, t1 = offset - distance / 2, offset + distance / 2
+        elif input._direction == ExtentDirections.NegativeExtentDirection:
+            t0, t1 = offset, offset - distance
+        else:
+            t0, t1 = offset, offset + distance
+        growth = math.tan(input.taperAngle.realValue) if input.taperAngle is not None else 0.0
+        bodies = []
+        for profile in profiles:
+            origin, ex, ey, n = profile.parentSketch._frame()
+            shape = _Prism(profile._loop, origin, ex, ey, n, t0, t1, growth)
+            bodies.append(self._component._new_body(shape))
+        return self._finish(bodies, len(bodies))
+
+class MoveFeatures(_FeatureCollection):
+    kind = 'Move'
+    latency_key = 'move.add'
+
+    def createInput(self, inputEntities, transform):
+        return _GenericInput(inputEntities, transform)
+
+    def createInput2(self, inputEntities):
+        raise NotImplementedError("fake adsk: use createInput(entities, transform)")
+
+    def add(self, input):
+        entities, transform = input.args
+        for body in entities:
+            body._transform(transform)
+        return self._finish(items=len(entities))
+
+class MirrorFeatures(_FeatureCollection):
+    kind = 'Mirror'
+    latency_key = 'mirror.add'
+
+    def add(self, input):
+        entities, plane_entity = input.args
+        plane = plane_entity.geometry
+        n = (plane.normal.x, plane.normal.y, plane.normal.z)
+        o = (plane.origin.x, plane.origin.y, plane.origin.z)
+        d = 2 * _dot(n, o)
+        reflection = core.Matrix3D([[(1.0 if i == j else 0.0) - 2 * n[i] * n[j] for j in range(3)] + [d * n[i]] for i in range(3)] + [[0.0, 0.0, 0.0, 1.0]])
+        bodies = [self._component._copy_body(body, reflection) for body in entities]
+        return self._finish(bodies, len(bodies))
+
+class RectangularPatternFeatures(_FeatureCollection):
+    kind = 'RectangularPattern'
+    latency_key = 'pattern.add'
+
+    def createInput(self, inputEntities, directionOneEntity, quantityOne, distanceOne, patternDistanceType):
+        return _PatternInput(inputEntities, directionOneEntity, quantityOne, distanceOne, patternDistanceType)
+
+    def add(self, input):
+        def steps(axis, quantity, distance):
+            count = max(1, int(round(quantity.realValue)))
+            spacing = distance.realValue
+            if input.patternDistanceType == PatternDistanceType.ExtentPatternDistanceType and count > 1:
+                spacing /= count - 1
+            direction = axis.geometry.direction
+            return [(direction.x * spacing * i, direction.y * spacing * i, direction.z * spacing * i) for i in range(count)]
+        ones = steps(input.directionOneEntity, input.quantityOne, input.distanceOne)
+        twos = steps(input.directionTwoEntity, input.quantityTwo, input.distanceTwo) if input.directionTwoEntity else [(0.0, 0.0, 0.0)]
+        bodies = []
+        for j, b in enumerate(twos):
+            for i, a in enumerate(ones):
+                if i == 0 and j == 0:
+                    continue
+                matrix = core.Matrix3D()
+                matrix.translation = _vector(_add(a, b))
+                bodies.extend(self._component._copy_body(body, matrix) for body in input.inputEntities)
+        return self._finish(bodies, len(bodies))
+
+class _PatternInput:
+    def __init__(self, inputEntities, directionOneEntity, quantityOne, distanceOne, patternDistanceType):
+        self.inputEntities = inputEntities
+        self.directionOneEntity = directionOneEntity
+        self.quantityOne = quantityOne
+        self.distanceOne = distanceOne
+        self.patternDistanceType = patternDistanceType
+        self.directionTwoEntity = None
+        self.quantityTwo = core.ValueInput.createByReal(1)
+        self.distanceTwo = core.ValueInput.createByReal(0)
+
+    def setDirectionTwo(self, directionTwoEntity, quantityTwo, distanceTwo):
+        self.directionTwoEntity = directionTwoEntity
+        self.quantityTwo = quantityTwo
+        self.distanceTwo = distanceTwo
+        return True
+
+class CircularPatternFeatures(_FeatureCollection):
+    kind = 'CircularPattern'
+    latency_key = 'pattern.add'
+
+    def createInput(self, inputEntities, axis):
+        input = _GenericInput(inputEntities, axis)
+        input.__dict__.update(quantity=core.ValueInput.createByReal(2), isFull=True, totalAngle=None)
+        return input
+
+    def add(self, input):
+        entities, axis = input.args
+        count = max(1, int(round(input.quantity.realValue)))
+        if input.isFull:
+            step = 2 * math.pi / count
+        else:
+            step = input.totalAngle.realValue / max(1, count - 1)
+        bodies = []
+        for k in range(1, count):
+            matrix = core.Matrix3D()
+            matrix.setToRotation(step * k, axis.geometry.direction, axis.geometry.origin)
+            bodies.extend(self._component._copy_body(body, matrix) for body in entities)
+        return self._finish(bodies, len(bodies))
+
+class _UnsupportedFeatures(_FeatureCollection):
+    def add(self, input):
+        raise NotImplementedError(f"fake adsk: {self.kind} features are not modelled")
+
+class RevolveFeatures(_UnsupportedFeatures):
+    kind = 'Revolve'
+
+class SweepFeatures(_UnsupportedFeatures):
+    kind = 'Sweep'
+
+class CombineFeatures(_UnsupportedFeatures):
+    kind = 'Combine'
+
+class FilletFeatures(_FeatureCollection):
+    kind = 'Fillet'
+
+class ChamferFeatures(_FeatureCollection):
+    kind = 'Chamfer'
+
+class Features:
+    def __init__(self, component):
+        self.extrudeFeatures = ExtrudeFeatures(component)
+        self.revolveFeatures = RevolveFeatures(component)
+        self.sweepFeatures = SweepFeatures(component)
+        self.moveFeatures = MoveFeatures(component)
+        self.mirrorFeatures = MirrorFeatures(component)
+        self.rectangularPatternFeatures = RectangularPatternFeatures(component)
+        self.circularPatternFeatures = CircularPatternFeatures(component)
+        self.filletFeatures = FilletFeatures(component)
+        self.chamferFeatures = ChamferFeatures(component)
+        self.combineFeatures = CombineFeatures(component)
+
+# --- コンポーネント・デザイン ---
+_component_ids = itertools.count(1)
+
+class Component:
+    objectType = _class_type('Component')
+
+    def __init__(self, design, name='root'):
+        self.design = design
+        self.id = f"component-{next(_component_ids)}"
+        self.name = name
+        self.bRepBodies = BRepBodies()
+        self.occurrences = Occurrences()
+        self.sketches = Sketches(self)
+        self.features = Features(self)
+        self.xYConstructionPlane = ConstructionPlane('XY', (0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0))
+        self.xZConstructionPlane = ConstructionPlane('XZ', (0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 0.0, -1.0))
+        self.yZConstructionPlane = ConstructionPlane('YZ', (0.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+        self.xConstructionAxis = ConstructionAxis('X', (1.0, 0.0, 0.0))
+        self.yConstructionAxis = ConstructionAxis('Y', (0.0, 1.0, 0.0))
+        self.zConstructionAxis = ConstructionAxis('Z', (0.0, 0.0, 1.0))
+        self._body_numbers = itertools.count(1)
+        self._sketch_numbers = itertools.count(1)
+        self._feature_numbers = itertools.count(1)
+
+    @staticmethod
+    def classType():
+        return Component.objectType
+
+    def _next_sketch_number(self):
+        return next(self._sketch_numbers)
+
+    def _next_feature_number(self):
+        return next(self._feature_numbers)
+
+    def _new_body(self, shape):
+        body = BRepBody(self, shape, f"Body{next(self._body_numbers)}")
+        self.bRepBodies._add(body)
+        self.design._register(body)
+        return body
+
+    def _copy_body(self, body, matrix):
+        combined = body._shape.matrix.copy()
+        combined.transformBy(matrix)
+        return self._new_body(body._shape.copy(combined))
+
+    def findBRepUsingRay(self, *args):
+        raise NotImplementedError("fake adsk: ray casting is not modelled")
+
+class TimelineObject:
+    def __init__(self, entity, index):
+        self.entity = entity
+        self.index = index
+
+class Timeline:
+    def __init__(self):
+        self._entities = []
+
+    @property
+    def count(self):
+        return len(self._entities)
+
+    @property
+    def markerPosition(self):
+        return len(self._entities)
+
+    def item(self, index):
+        return TimelineObject(self._entities[index], index)
+
+    def __iter__(self):
+        return iter([TimelineObject(entity, i) for i, entity in enumerate(self._entities)])
+
+    def _append(self, entity):
+        self._entities.append(entity)
+
+    def _remove(self, entity):
+        if entity in self._entities:
+            self._entities.remove(entity)
+
+class UnitsManager:
+    defaultLengthUnits = 'mm'
+    internalUnits = 'cm'
+
+class Design:
+    objectType = _class_type('Design')
+
+    def __init__(self):
+        self.timeline = Timeline()
+        self.unitsManager = UnitsManager()
+        self._bodies_by_token = {}
+        self.rootComponent = Component(self)
+
+    @staticmethod
+    def classType():
+        return Design.objectType
+
+    def _register(self, body):
+        self._bodies_by_token[body.entityToken] = body
+
+    def findEntityByToken(self, entityToken):
+        """ボディ、またはボディの面 ('<ボディ>/f<番号>')・エッジ ('<ボディ>/e<番号>') のトークンを解決します。"""
+        body_token, _, sub = str(entityToken).partition('/')
+        body = self._bodies_by_token.get(body_token)
+        if body is None or not body.isValid:
+            return []
+        if not sub:
+            return [body]
+        items = body._topology()[0 if sub[0] == 'f' else 1]
+        index = int(sub[1:])
+        return [items[index]] if 0 <= index < len(items) else []
+
+class Document:
+    def __init__(self, design):
+        self.design = design
+        self.name = 'Untitled'
+        self.products = [design]
+
+# --- 計測・一時BRep ---
+def _overlap_bounds(a, b):
+    (lo1, hi1), (lo2, hi2) = a.bounds(), b.bounds()
+    lo = tuple(max(lo1[i], lo2[i]) for i in range(3))
+    hi = tuple(min(hi1[i], hi2[i]) for i in range(3))
+    return lo, hi
+
+def _intersection_volume(a, b):
+    """2つの形状の共通部分の体積。直方体同士は厳密に、それ以外は格子の中点で内外判定して近似します。"""
+    lo, hi = _overlap_bounds(a, b)
+    size = [hi[i] - lo[i] for i in range(3)]
+    if min(size) <= _TOLERANCE:
+        return 0.0
+    if a.is_axis_aligned_box() and b.is_axis_aligned_box():
+        return size[0] * size[1] * size[2]
+    n = _BOOLEAN_GRID
+    step = [size[i] / n for i in range(3)]
+    inside = 0
+    for i, j, k in itertools.product(range(n), repeat=3):
+        p = (lo[0] + (i + 0.5) * step[0], lo[1] + (j + 0.5) * step[1], lo[2] + (k + 0.5) * step[2])
+        if a.contains(p) >= 0 and b.contains(p) >= 0:
+            inside += 1
+    return inside * step[0] * step[1] * step[2]
+
+def _nested_box_distance(outer, inner):
+    """inner が outer の内部にある直方体同士なら、面どうしの最短距離と最近点の組を返します。"""
+    (lo1, hi1), (lo2, hi2) = outer.bounds(), inner.bounds()
+    if not all(lo1[i] < lo2[i] and hi2[i] < hi1[i] for i in range(3)):
+        return None
+    center = [(lo2[i] + hi2[i]) / 2 for i in range(3)]
+    candidates = []
+    for i in range(3):
+        for gap, wall_outer, wall_inner in ((lo2[i] - lo1[i], lo1[i], lo2[i]), (hi1[i] - hi2[i], hi1[i], hi2[i])):
+            candidates.append((gap, i, wall_outer, wall_inner))
+    gap, axis, wall_outer, wall_inner = min(candidates)
+    one, two = list(center), list(center)
+    one[axis], two[axis] = wall_outer, wall_inner
+    return gap, one, two
+
+class MeasureResults:
+    def __init__(self, value, positionOne, positionTwo):
+        self.value = value
+        self.positionOne = positionOne
+        self.positionTwo = positionTwo
+
+class MeasureManager:
+    """
+    最小距離はバウンディングボックス間の距離で近似します。
+    軸に平行な直方体同士では、一方が他方の内部にある場合 (面どうしは離れている) も含めて厳密です。
+    """
+    def measureMinimumDistance(self, geometryOne, geometryTwo):
+        simulation.simulate('measure')
+        shape_one, shape_two = getattr(geometryOne, '_shape', None), getattr(geometryTwo, '_shape', None)
+        if shape_one is not None and shape_two is not None and shape_one.is_axis_aligned_box() and shape_two.is_axis_aligned_box():
+            nested = _nested_box_distance(shape_one, shape_two)
+            if nested is None:
+                nested = _nested_box_distance(shape_two, shape_one)
+                if nested is not None:
+                    nested = (nested[0], nested[2], nested[1])
+            if nested is not None:
+                return MeasureResults(nested[0], _point(nested[1]), _point(nested[2]))
+        def extent(entity):
+            if isinstance(entity, core.Point3D):
+                return (entity.x, entity.y, entity.z), (entity.x, entity.y, entity.z)
+            bbox = entity.boundingBox
+            return ((bbox.minPoint.x, bbox.minPoint.y, bbox.minPoint.z), (bbox.maxPoint.x, bbox.maxPoint.y, bbox.maxPoint.z))
+        (lo1, hi1), (lo2, hi2) = extent(geometryOne), extent(geometryTwo)
+        gaps = [max(0.0, lo2[i] - hi1[i], lo1[i] - hi2[i]) for i in range(3)]
+        one = [min(max((lo2[i] + hi2[i]) / 2, lo1[i]), hi1[i]) for i in range(3)]
+        two = [min(max(one[i], lo2[i]), hi2[i]) for i in range(3)]
+        return MeasureResults(math.sqrt(sum(g * g for g in gaps)), _point(one), _point(two))
+
+class _WireBody:
+    def __init__(self, points, area):
+        self.wires = _EntityList([points])
+        self._area = area
+        self.boundingBox = _bbox(points)
+
+class _SheetFace:
+    def __init__(self, area):
+        self.area = area
+
+class _SheetBody:
+    def __init__(self, area):
+        self.faces = _EntityList([_SheetFace(area)])
+
+class _TemporaryBody:
+    """一時BRepのボディ。積演算の後は形状を持たず、体積だけを保持します。"""
+    def __init__(self, shape):
+        self._shape = shape
+        self.volume = shape.volume_and_axial_centroid()[0]
+
+    @property
+    def boundingBox(self):
+        return _bbox(self._shape.sample_points())
+
+class TemporaryBRepManager:
+    _instance = None
+
+    @staticmethod
+    def get():
+        if TemporaryBRepManager._instance is None:
+            TemporaryBRepManager._instance = TemporaryBRepManager()
+        return TemporaryBRepManager._instance
+
+    def planeIntersection(self, body, plane):
+        """
+        押し出し軸に垂直な平面ではテーパーを含めた正確な断面を返します。
+        それ以外の平面はバウンディングボックスの断面 (長方形) で近似します。
+        """
+        simulation.simulate('planeIntersection')
+        shape = body._shape
+        normal = (plane.normal.x, plane.normal.y, plane.normal.z)
+        origin = (plane.origin.x, plane.origin.y, plane.origin.z)
+        axis = shape.world_direction(shape.n)
+        if abs(abs(_dot(axis, normal)) - 1) < 1e-9:
+            t = shape.world_to_local(origin)[2]
+            if not min(shape.t0, shape.t1) - _TOLERANCE <= t <= max(shape.t0, shape.t1) + _TOLERANCE:
+                return None
+            loop = shape.loop_at(t)
+            return _WireBody([shape.local_to_world(u, v, t) for u, v in loop.samples()], loop.area)
+        bbox = body.boundingBox
+        lo = (bbox.minPoint.x, bbox.minPoint.y, bbox.minPoint.z)
+        hi = (bbox.maxPoint.x, bbox.maxPoint.y, bbox.maxPoint.z)
+        index = max(range(3), key=lambda i: abs(normal[i]))
+        if not lo[index] <= origin[index] <= hi[index]:
+            return None
+        others = [i for i in range(3) if i != index]
+        corners = []
+        for a, b in ((lo, lo), (hi, lo), (hi, hi), (lo, hi)):
+            p = [0.0, 0.0, 0.0]
+            p[index] = origin[index]
+            p[others[0]], p[others[1]] = a[others[0]], b[others[1]]
+            corners.append(tuple(p))
+        return _WireBody(corners, (hi[others[0]] - lo[others[0]]) * (hi[others[1]] - lo[others[1]]))
+
+    def createFaceFromPlanarWires(self, wireBodies):
+        return _SheetBody(sum(wire._area for wire in wireBodies))
+
+    def copy(self, body):
+        simulation.simulate('temporaryCopy')
+        return _TemporaryBody(body._shape.copy())
+
+    def booleanOperation(self, targetBody, toolBody, booleanType):
+        """積 (IntersectionBooleanType) のみ対応します。結果の体積を targetBody に反映します。"""
+        if booleanType != BooleanTypes.IntersectionBooleanType:
+            raise NotImplementedError("fake adsk: only intersection of temporary BReps is modelled")
+        simulation.simulate('booleanOperation')
+        if targetBody._shape is None or toolBody._shape is None:
+            raise ValueError("fake adsk: the boolean result has no shape")
+        targetBody.volume = _intersection_volume(targetBody._shape, toolBody._shape)
+        targetBody._shape = None
+        return True
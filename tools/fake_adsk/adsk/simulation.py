@@ -0,0 +1,61 @@
+"""
+代替 adsk パッケージのシミュレーション設定 (本物の adsk には存在しません)。
+
+- latencies: 操作名 → 擬似的な所要時間 (秒)。'<操作>.per_item' を指定すると要素数に比例した時間も加算します。
+  操作名: 'sketch.add', 'extrude.add', 'move.add', 'pattern.add', 'mirror.add', 'feature.add',
+          'physicalProperties', 'doEvents', 'planeIntersection', 'measure',
+          'temporaryCopy', 'booleanOperation'
+- calls: 操作ごとの呼び出し回数 (ベンチマークでの API 呼び出し数の集計用)
+- reset(): 新しい空のデザインを作成します。
+- pump_events(): fireCustomEvent で積まれたイベントを呼び出し元のスレッドで処理します。
+"""
+import collections
+import threading
+import time
+
+latencies = {}
+calls = collections.Counter()
+_pending_events = collections.deque()
+_pending_lock = threading.Lock()
+
+def configure(values: dict):
+    """configure({'extrude.add': 0.005, 'extrude.add.per_item': 0.001}) のように擬似遅延を設定します。"""
+    for key, seconds in values.items():
+        latencies[key] = float(seconds)
+
+def simulate(operation: str, items: int=1):
+    """操作を1回記録し、設定された擬似遅延だけ待ちます。"""
+    calls[operation] += 1
+    delay = latencies.get(operation, 0.0) + latencies.get(f"{operation}.per_item", 0.0) * items
+    if delay > 0:
+        time.sleep(delay)
+
+def reset():
+    """新しい空のデザインを作成し、呼び出し回数とイベントキューをクリアします。"""
+    from . import core, fusion
+    app = core.Application.get()
+    app._design = fusion.Design()
+    app._document = fusion.Document(app._design)
+    app.userInterface.activeSelections.clear()
+    calls.clear()
+    with _pending_lock:
+        _pending_events.clear()
+    return app._design
+
+def post_event(event_id: str, additional_info: str):
+    with _pending_lock:
+        _pending_events.append((event_id, additional_info))
+
+def pump_events(max_events: int=None) -> int:
+    """積まれたカスタムイベントを順に処理し、処理した件数を返します。"""
+    from . import core
+    app = core.Application.get()
+    handled = 0
+    while max_events is None or handled < max_events:
+        with _pending_lock:
+            if not _pending_events:
+                break
+            event_id, additional_info = _pending_events.popleft()
+        app.dispatch_event(event_id, additional_info)
+        handled += 1
+    return handled